@@ -1,13 +1,40 @@
-from flask import Flask, jsonify, render_template, request, send_from_directory
+from flask import Flask, Response, jsonify, render_template, request, send_file, send_from_directory, stream_with_context
 from flask_cors import CORS
 import subprocess
 import os
-import re
+import json
+import threading
 import io
-import random
-import math
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
+import numpy as np
+
+import chat_router
+import colormaps
+import crop_health
+import demo_render
+import matlab_pool
+import metrics
+import pest_risk
+import pipeline
+import raster_store
+import results_model
+import run_history
+import sensor_cleaning
+import sensor_store
+import shared_rasters
+import soil_condition
+import spectral_indices
+import stream_features
+import tile_pyramid
+from artifact_store import ArtifactStore
+from jobs import SUCCEEDED, JobManager, JobQueueFull
+from result_cache import ResultCache, file_key
+
 try:
     from PIL import Image
 except Exception:
@@ -20,6 +47,144 @@ CORS(app)
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
 os.makedirs(RESULTS_DIR, exist_ok=True)
 
+# Maps are published under content-hash names (results/artifacts/) and served as immutable
+ARTIFACTS = ArtifactStore(os.path.join(RESULTS_DIR, 'artifacts'),
+                          retention=int(os.getenv('ARTIFACT_RETENTION', str(24 * 3600))))
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+# XYZ tiles of the maps in results/: rendered on demand into an LRU, and cut ahead of
+# time into results/tiles/ by a background thread after each run (TILE_PREGENERATE=0 disables)
+TILES = tile_pyramid.TilePyramid(
+    RESULTS_DIR, os.path.join(RESULTS_DIR, 'tiles'),
+    cache=ResultCache(max_entries=int(os.getenv('TILE_CACHE_SIZE', '4096')),
+                      max_bytes=int(os.getenv('TILE_CACHE_MAX_MB', '64')) * 1024 * 1024))
+TILE_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix='tile-pyramid')
+
+# Background analyses. Every run writes into the shared results/ directory,
+# so one worker by default; JOB_MAX_PENDING bounds queued + running jobs.
+MATLAB_TIMEOUT = int(os.getenv('MATLAB_TIMEOUT', '600'))
+
+# Progress lines that start a timed stage: main.m / runWarmAnalysis.m stage markers
+# plus the server's own steps around the MATLAB run and the Python backends
+ANALYSIS_STAGES = {
+    'Starting MATLAB...': 'matlab_startup',
+    'Initializing AI-Powered Agricultural Monitoring System...': 'initialize',
+    'Reusing initialized monitoring session...': 'initialize',
+    'Loading input data...': 'load_data',
+    'Processing multispectral data...': 'spectral_processing',
+    'Analyzing crop health...': 'crop_health',
+    'Assessing soil condition...': 'soil_condition',
+    'Detecting pest risks...': 'pest_risk',
+    'Generating comprehensive report...': 'report',
+    'Displaying results...': 'display_results',
+    'Saving analysis results...': 'save_results',
+    'Reading MATLAB results...': 'read_results',
+    'Generating demo results...': 'demo_maps',
+    'Running crop health, soil and pest analyses...': 'analyses',
+    'Rendering index maps...': 'render_maps',
+}
+
+# Latency, size and cache metrics served at /metrics (METRICS=0 turns recording off)
+ANALYSIS_SECONDS = metrics.REGISTRY.histogram(
+    'analysis_seconds', 'Wall time of analysis jobs from start to finish.', ('backend', 'state'))
+ANALYSIS_STAGE_SECONDS = metrics.REGISTRY.histogram(
+    'analysis_stage_seconds', 'Duration of each analysis stage (MATLAB startup, analyzers, result reading).',
+    ('backend', 'stage'))
+STEP_SECONDS = metrics.REGISTRY.histogram(
+    'request_step_seconds', 'Time spent in server-side steps of result processing and chat.', ('operation', 'step'))
+BYTES_READ = metrics.REGISTRY.histogram(
+    'bytes_read', 'Bytes read per load of result files, input cubes and raster windows.', ('source',),
+    buckets=metrics.SIZE_BUCKETS)
+
+def record_job(job):
+    """JobManager hook: run history entry, job wall time and stage durations."""
+    duration = job.finished_at - job.started_at if job.started_at and job.finished_at else None
+    result = RESULTS.get(job.result.get('result_id')) if isinstance(job.result, dict) else None
+    if job.state == SUCCEEDED and result is not None:
+        get_history().record(result, FIELD_ID, duration=duration, stages=job.stages)
+    if duration is not None:
+        ANALYSIS_SECONDS.observe(duration, job.kind, job.state)
+    for stage in job.stages:
+        if stage['duration'] is not None:
+            ANALYSIS_STAGE_SECONDS.observe(stage['duration'], job.kind, stage['name'])
+
+JOBS = JobManager(max_workers=int(os.getenv('JOB_WORKERS', '1')),
+                  max_pending=int(os.getenv('JOB_MAX_PENDING', '16')),
+                  stage_markers=ANALYSIS_STAGES, on_finish=record_job)
+
+# 'matlab' runs a cold `matlab -batch` per analysis, 'matlab-pool' reuses warm sessions,
+# 'numpy' runs the whole analysis in Python without MATLAB as a stage graph (pipeline.py):
+# spectral indices, crop health, soil and pest analyses, map rendering and the report
+ANALYSIS_BACKEND = os.getenv('ANALYSIS_BACKEND', 'matlab')
+# Backend used when a MATLAB run fails (e.g. no licence): 'numpy' or 'none'
+ANALYSIS_FALLBACK = os.getenv('ANALYSIS_FALLBACK', 'numpy')
+# Pest detectors of the numpy backend; PEST_RULES names a JSON file of extra or replacement rules
+PEST_ENGINE = pest_risk.PestRiskEngine(pest_risk.load_rules(os.getenv('PEST_RULES')))
+# Threads of the numpy backend's stage graph; 1 runs the stages one after another
+PIPELINE_WORKERS = int(os.getenv('PIPELINE_WORKERS', '3'))
+# Worker processes for the numpy backend's analyzers, fed through shared memory; 0 runs them on the pipeline threads
+ANALYZER_PROCESSES = int(os.getenv('ANALYZER_PROCESSES', '0'))
+ANALYZER_POOL = None
+ANALYZER_POOL_LOCK = threading.Lock()
+MATLAB_POOL = None
+MATLAB_POOL_LOCK = threading.Lock()
+
+# .mat inputs and results are converted once into memory-mapped .npy datasets
+RASTERS = raster_store.RasterStore(os.getenv(
+    'RASTER_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'raster_store')))
+RASTER_JSON_MAX_CELLS = 65536
+
+# Structured results of recent runs, referenced by id from the dashboards and /chat
+RESULTS = results_model.ResultStore(history=int(os.getenv('RESULT_HISTORY', '50')))
+
+# Summary metrics of every run in SQLite for trend queries (/api/history); one field per server
+HISTORY_DB = os.getenv('HISTORY_DB', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'run_history.sqlite3'))
+FIELD_ID = os.getenv('FIELD_ID', run_history.DEFAULT_FIELD)
+HISTORY = None
+HISTORY_LOCK = threading.Lock()
+
+# Bulk sensor feeds (dataset.csv columns) in an append-only columnar store (/api/sensors)
+SENSOR_STORE_DIR = os.getenv(
+    'SENSOR_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensor_store'))
+SENSOR_CHUNK_ROWS = int(os.getenv('SENSOR_CHUNK_ROWS', str(sensor_store.DEFAULT_CHUNK_ROWS)))
+SENSOR_QUERY_MAX_ROWS = 100000
+SENSORS = None
+SENSORS_LOCK = threading.Lock()
+# Soil analysis of the numpy backend: ingested readings of the last SOIL_SENSOR_DAYS (sensor_data.mat
+# when the store is empty), plus optional point sensors (CSV: row, col, readings) for the soil map
+SOIL_SENSOR_DAYS = float(os.getenv('SOIL_SENSOR_DAYS', '30'))
+SENSOR_STATIONS = os.getenv('SENSOR_STATIONS')
+# Rolling per-sensor features over the latest readings, updated as rows are ingested
+SENSOR_FEATURES = stream_features.StreamFeatures(
+    window=int(os.getenv('SENSOR_FEATURE_WINDOW', str(stream_features.DEFAULT_WINDOW))),
+    alpha=float(os.getenv('SENSOR_FEATURE_ALPHA', str(stream_features.DEFAULT_ALPHA))))
+
+# Chat lookups: section indexes of posted analysis texts, reply tables of stored results
+SECTION_INDEXES = ResultCache(max_entries=32, max_bytes=32 * 1024 * 1024)
+CHAT_REPLIES = ResultCache(max_entries=RESULTS.history)
+
+# Parsed MATLAB results (struct, analysis text, image list) keyed by result file version
+RESULTS_CACHE = ResultCache(max_entries=int(os.getenv('RESULT_CACHE_SIZE', '8')),
+                            max_bytes=int(os.getenv('RESULT_CACHE_MAX_MB', '64')) * 1024 * 1024)
+
+# Cache and job counters are read from their owners when /metrics is scraped
+def app_caches():
+    return {'results': RESULTS_CACHE, 'section_index': SECTION_INDEXES, 'chat_replies': CHAT_REPLIES}
+
+metrics.REGISTRY.collector(
+    'cache_requests_total', 'counter', 'Lookups in the in-process caches.', ('cache', 'result'),
+    lambda: {(name, result): cache.stats[field] for name, cache in app_caches().items()
+             for result, field in (('hit', 'hits'), ('miss', 'misses'))})
+metrics.REGISTRY.collector(
+    'cache_evictions_total', 'counter', 'Entries evicted from the in-process caches.', ('cache',),
+    lambda: {(name,): cache.stats['evictions'] for name, cache in app_caches().items()})
+metrics.REGISTRY.collector(
+    'cache_bytes', 'gauge', 'Estimated bytes held by the in-process caches.', ('cache',),
+    lambda: {(name,): cache.bytes for name, cache in app_caches().items()})
+metrics.REGISTRY.collector(
+    'jobs', 'gauge', 'Analysis jobs currently registered, by state.', ('state',),
+    lambda: {(state,): count for state, count in JOBS.state_counts().items()})
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -31,38 +196,121 @@ def farmer_dashboard():
 
 @app.route('/run-matlab', methods=['POST'])
 def run_matlab():
+    """Run one analysis and wait for it (kept for scripts; the dashboards use /jobs)."""
+    try:
+        job = JOBS.submit(analysis_kind(), run_analysis)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    job.join()
+    return jsonify(dict(job.result, stages=job.stages))
+
+@app.route('/jobs', methods=['POST'])
+def create_job():
+    """Queue an analysis and return its id immediately."""
+    try:
+        job = JOBS.submit(analysis_kind(), run_analysis)
+    except JobQueueFull as e:
+        return jsonify({'error': str(e)}), 429
+    return jsonify({
+        'id': job.id,
+        'state': job.state,
+        'status_url': f'/jobs/{job.id}',
+        'stream_url': f'/jobs/{job.id}/stream',
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def get_job(job_id):
+    """Job state, stdout lines from ?since=N, and the result payload once finished."""
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id.'}), 404
+    return jsonify(job.to_dict(since=request.args.get('since', 0, type=int)))
+
+@app.route('/jobs/<job_id>/stream')
+def stream_job(job_id):
+    """
+    Server-Sent Events: 'line' per stdout line, 'stage' when an analysis stage
+    starts or ends (timestamps, elapsed time and duration), 'state' on
+    transitions, 'done' with the result and the stage breakdown.
+    """
+    job = JOBS.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Unknown job id.'}), 404
+    since = request.args.get('since', 0, type=int)
+
+    def generate():
+        for event, data in job.events(since=since):
+            if event is None:
+                yield ': keep-alive\n\n'
+            else:
+                yield f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def analysis_kind():
+    return 'demo' if os.getenv('DEMO_MODE', '0') == '1' else ANALYSIS_BACKEND
+
+def run_analysis(emit=None):
+    """
+    Run the demo generator or main.m and return the /run-matlab JSON payload.
+    ``emit`` receives progress/stdout lines as they are produced.
+    """
+    emit = emit or (lambda line: None)
     try:
         # DEMO MODE: generate placeholder results without MATLAB
-        if os.getenv('DEMO_MODE', '0') == '1':
+        if analysis_kind() == 'demo':
+            emit('Generating demo results...')
             demo_output = generate_demo_results(RESULTS_DIR)
             image_files = [f for f in os.listdir(RESULTS_DIR) if f.endswith('.png')]
-            image_urls = [f'/results/{f}' for f in image_files]
-            return jsonify({'output': demo_output, 'images': image_urls, 'full_context': demo_output})
+            image_urls = publish_images(RESULTS_DIR, image_files)
+            emit(f'Demo results ready ({len(image_files)} maps).')
+            return with_result({'output': demo_output, 'images': image_urls, 'full_context': demo_output},
+                               results_model.demo_result(image_urls))
 
-        # MATLAB INTEGRATION MODE: Run actual MATLAB analysis
-        # The main MATLAB script to be executed is 'main.m'
-        matlab_script_path = os.path.dirname(os.path.abspath(__file__))
-        
-        # Use forward slashes for MATLAB compatibility
-        matlab_script_path_for_cd = matlab_script_path.replace('\\', '/')
-
-        # Construct the command to run the main script
-        matlab_cmd = os.getenv('MATLAB_CMD', 'matlab')
-        command = f"{matlab_cmd} -batch \"cd('{matlab_script_path_for_cd}'); main;\""
-        
-        # Execute the command
-        process = subprocess.run(command, shell=True, capture_output=True, text=True, cwd=matlab_script_path, timeout=600)
+        # NUMPY MODE: vegetation indices computed in Python, no MATLAB licence needed
+        if ANALYSIS_BACKEND == 'numpy':
+            return run_numpy_analysis(emit)
 
-        if process.returncode != 0:
+        # MATLAB INTEGRATION MODE: Run actual MATLAB analysis
+        emit('Starting MATLAB...')
+        if ANALYSIS_BACKEND == 'matlab-pool':
+            # Warm session: runWarmAnalysis reuses the path and analyzer objects
+            returncode, matlab_output = get_matlab_pool().run(emit, MATLAB_TIMEOUT)
+        else:
+            # Cold batch run of 'main.m'
+            matlab_script_path = os.path.dirname(os.path.abspath(__file__))
+
+            # Use forward slashes for MATLAB compatibility
+            matlab_script_path_for_cd = matlab_script_path.replace('\\', '/')
+
+            # Construct the command to run the main script
+            matlab_cmd = os.getenv('MATLAB_CMD', 'matlab')
+            command = f"{matlab_cmd} -batch \"cd('{matlab_script_path_for_cd}'); main;\""
+
+            # Execute the command, forwarding stdout line by line
+            returncode, matlab_output = run_streaming(command, matlab_script_path, emit, MATLAB_TIMEOUT)
+
+        if returncode != 0:
+            if ANALYSIS_FALLBACK == 'numpy':
+                # Licence or install problems should not take the dashboards down
+                emit('MATLAB failed; running the Python crop health analysis instead...')
+                payload = run_numpy_analysis(emit)
+                if 'error' not in payload:
+                    payload['warning'] = 'MATLAB script execution failed; results computed by the Python backend.'
+                    payload['details'] = matlab_output
+                    return payload
             # If MATLAB fails, return the error details for debugging
-            return jsonify({'error': 'MATLAB script execution failed.', 'details': process.stdout + process.stderr})
-
-        matlab_output = process.stdout
+            return {'error': 'MATLAB script execution failed.', 'details': matlab_output}
         
         # Process MATLAB results - use the actual MATLAB-generated files
+        emit('Reading MATLAB results...')
         try:
-            analysis_output, image_urls = process_matlab_results()
-            return jsonify({'output': analysis_output, 'images': image_urls, 'full_context': analysis_output})
+            analysis_output, image_urls, matlab_results = process_matlab_results()
+            payload = {'output': analysis_output, 'images': image_urls, 'full_context': analysis_output}
+            if matlab_results is None:
+                return payload
+            return with_result(payload, results_model.from_matlab(matlab_results, image_urls))
         except Exception as e:
             # Fallback: look for MATLAB-generated PNG files in results directory
             results_dir = 'results'  # MATLAB saves to 'results' directory in same folder
@@ -73,89 +321,397 @@ def run_matlab():
                 image_files = []
                 image_urls = []
             
-            return jsonify({
+            return {
                 'output': matlab_output, 
                 'images': image_urls, 
                 'full_context': matlab_output, 
                 'warning': f'Result processing failed: {str(e)}',
                 'matlab_files_found': len(image_files)
-            })
+            }
 
     except Exception as e:
-        return jsonify({'error': str(e)})
+        return {'error': str(e)}
+
+def with_result(payload, result):
+    """Register a structured result and reference it from the /run-matlab payload."""
+    RESULTS.add(result)
+    payload['result_id'] = result.id
+    payload['summary'] = result.to_dict()
+    return payload
+
+def publish_images(results_dir, image_files):
+    """Publish result images under their content-hash names; returns their URLs."""
+    hashed = ARTIFACTS.publish_all([os.path.join(results_dir, f) for f in image_files], image_files)
+    if (tile_pyramid.Image is not None and os.getenv('TILE_PREGENERATE', '1') == '1'
+            and os.path.abspath(results_dir) == os.path.abspath(TILES.source_dir)):
+        TILE_EXECUTOR.submit(TILES.generate_all, [os.path.splitext(f)[0] for f in image_files])
+    return [f'/results/{f}' for f in hashed]
+
+def get_history():
+    """Open the run history database on first use."""
+    global HISTORY
+    with HISTORY_LOCK:
+        if HISTORY is None:
+            HISTORY = run_history.RunHistory(HISTORY_DB)
+        return HISTORY
+
+def get_sensors():
+    """Open the sensor store on first use."""
+    global SENSORS
+    with SENSORS_LOCK:
+        if SENSORS is None:
+            SENSORS = sensor_store.SensorStore(SENSOR_STORE_DIR)
+        return SENSORS
+
+def get_matlab_pool():
+    """Create the warm MATLAB session pool on first use."""
+    global MATLAB_POOL
+    with MATLAB_POOL_LOCK:
+        if MATLAB_POOL is None:
+            factory = matlab_pool.session_factory(
+                os.getenv('MATLAB_POOL_SESSION', 'process'),
+                os.path.dirname(os.path.abspath(__file__)),
+                os.getenv('MATLAB_POOL_CMD', 'matlab -nodesktop -nosplash -nodisplay'))
+            MATLAB_POOL = matlab_pool.MatlabPool(
+                factory,
+                size=int(os.getenv('MATLAB_POOL_SIZE', '1')),
+                max_jobs=int(os.getenv('MATLAB_POOL_MAX_JOBS', '20')),
+                health_interval=float(os.getenv('MATLAB_POOL_HEALTH_INTERVAL', '60')))
+        return MATLAB_POOL
+
+def run_streaming(command, cwd, emit, timeout):
+    """Run a shell command, passing each stdout/stderr line to emit; returns (returncode, output)."""
+    process = subprocess.Popen(command, shell=True, cwd=cwd, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, text=True, bufsize=1)
+    timed_out = threading.Event()
+
+    def kill():
+        timed_out.set()
+        process.kill()
+
+    timer = threading.Timer(timeout, kill)
+    timer.start()
+    lines = []
+    try:
+        for line in process.stdout:
+            lines.append(line)
+            emit(line)
+        process.wait()
+    finally:
+        timer.cancel()
+        process.stdout.close()
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(command, timeout, output=''.join(lines))
+    return process.returncode, ''.join(lines)
 
 @app.route('/results/<filename>')
 def serve_matlab_results(filename):
-    """Serve MATLAB-generated result files (PNG images, etc.)"""
-    return send_from_directory(RESULTS_DIR, filename)
+    """
+    Serve MATLAB-generated result files (PNG images, etc.). Content-hash names
+    never change content: strong ETag, immutable, 304 on If-None-Match.
+    Plain names are overwritten by each run, so clients must revalidate them.
+    """
+    artifact = ARTIFACTS.resolve(filename)
+    if artifact is not None:
+        path, digest = artifact
+        response = send_file(path, etag=digest, max_age=IMMUTABLE_MAX_AGE, conditional=True)
+        response.cache_control.immutable = True
+        return response
+    response = send_from_directory(RESULTS_DIR, filename)
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/tiles/<name>')
+def tile_info(name):
+    """Size and zoom range of a map's tile pyramid"""
+    if tile_pyramid.Image is None:
+        return jsonify({'error': 'Map tiles require Pillow.'}), 503
+    try:
+        return jsonify(TILES.info(name))
+    except tile_pyramid.TileNotFound as e:
+        return jsonify({'error': str(e)}), 404
+
+@app.route('/tiles/<name>/<int:z>/<int:x>/<int:y>.png')
+def map_tile(name, z, x, y):
+    """
+    One 256x256 tile of a result map. Tiles are revalidated by ETag; a request
+    carrying the map's current ?v=version may be cached as immutable.
+    """
+    if tile_pyramid.Image is None:
+        return jsonify({'error': 'Map tiles require Pillow.'}), 503
+    try:
+        data, version = TILES.tile(name, z, x, y)
+    except tile_pyramid.TileNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    response = Response(data, mimetype='image/png')
+    response.set_etag(f'{version}-{z}-{x}-{y}')
+    if request.args.get('v') == version:
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/artifacts')
+def artifact_manifest():
+    """Logical result file names mapped to their current content-hash copies"""
+    return jsonify({name: dict(entry, url=f"/results/{entry['file']}")
+                    for name, entry in ARTIFACTS.manifest.items()})
+
+@app.route('/api/rasters')
+def list_rasters():
+    """Datasets in the raster store"""
+    return jsonify({'datasets': RASTERS.names()})
+
+@app.route('/api/rasters/<name>')
+def raster_dataset(name):
+    """Scalar fields and raster index of one dataset"""
+    try:
+        dataset = RASTERS.open(name)
+    except (ValueError, OSError):
+        return jsonify({'error': f"Dataset '{name}' not found"}), 404
+    return jsonify({'name': name, 'attrs': dataset.attrs, 'rasters': dataset.rasters})
+
+@app.route('/api/rasters/<name>/<path:key>')
+def raster_data(name, key):
+    """
+    One raster, band or window without loading the rest of the dataset.
+    Query: band=N, window=r0,r1,c0,c1, format=json|npy.
+    """
+    try:
+        dataset = RASTERS.open(name)
+        if key not in dataset.rasters:
+            raise KeyError(key)
+    except (ValueError, OSError, KeyError):
+        return jsonify({'error': f"Raster '{key}' not found in '{name}'"}), 404
+
+    band = request.args.get('band', type=int)
+    try:
+        height, width = dataset.rasters[key]['shape'][:2]
+        r0, r1, c0, c1 = ([int(v) for v in request.args['window'].split(',')]
+                          if 'window' in request.args else (0, height, 0, width))
+        if not (0 <= r0 < r1 <= height and 0 <= c0 < c1 <= width):
+            raise ValueError
+        if band is None:
+            values = dataset.window(key, r0, r1, c0, c1)
+        else:
+            values = np.array(dataset.band(key, band)[r0:r1, c0:c1])
+    except (ValueError, IndexError):
+        return jsonify({'error': 'Invalid band or window (expected window=r0,r1,c0,c1 inside the raster)'}), 400
+    BYTES_READ.observe(values.nbytes, 'raster_window')
+
+    if request.args.get('format') == 'npy':
+        buf = io.BytesIO()
+        np.save(buf, values)
+        return Response(buf.getvalue(), mimetype='application/octet-stream')
+    if values.size > RASTER_JSON_MAX_CELLS:
+        return jsonify({'error': f'{values.size} values exceed the JSON limit of {RASTER_JSON_MAX_CELLS}; '
+                                 'request a band/window or format=npy'}), 413
+    return jsonify({'shape': list(values.shape), 'dtype': str(values.dtype), 'values': values.tolist()})
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Latency histograms, bytes read and cache counters in the Prometheus text format"""
+    return Response(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
+
+@app.route('/api/results/latest')
+def latest_result():
+    """Structured result of the most recent analysis"""
+    result = RESULTS.latest()
+    if result is None:
+        return jsonify({'error': 'No analysis results yet. Run an analysis first.'}), 404
+    return jsonify(result.to_dict())
+
+@app.route('/api/results/<result_id>')
+def get_result(result_id):
+    """Structured result of one analysis run"""
+    result = RESULTS.get(result_id)
+    if result is None:
+        return jsonify({'error': 'Unknown or expired result id'}), 404
+    return jsonify(result.to_dict())
+
+@app.route('/api/history')
+def history():
+    """
+    Trend of one metric: ?metric=ndvi_mean[&field=][&days=30 | &since=&until=][&points=200]
+    (epoch seconds), averaged into time buckets. Without metric: the fields,
+    metric names and recent runs on record.
+    """
+    field = request.args.get('field', FIELD_ID)
+    metric = request.args.get('metric')
+    until = request.args.get('until', type=float)
+    since = request.args.get('since', type=float)
+    days = request.args.get('days', type=float)
+    if since is None and days is not None:
+        since = (until or time.time()) - days * 86400
+    points = request.args.get('points', 200, type=int)
+    store = get_history()
+    if not metric:
+        return jsonify({'field': field, 'fields': store.fields(), 'metrics': store.metric_names(field),
+                        'runs': store.runs(field, since, until, limit=points)})
+    return jsonify({'field': field, 'metric': metric, 'since': since, 'until': until,
+                    'points': store.series(metric, field, since, until, points)})
+
+@app.route('/api/sensors/ingest', methods=['POST'])
+def ingest_sensors():
+    """
+    Append a CSV (text/csv, header row first) or NDJSON (application/x-ndjson)
+    body of sensor rows. The body is parsed as it streams in, chunk by chunk.
+    """
+    fmt = request.args.get('format') or ('ndjson' if 'json' in (request.mimetype or '') else 'csv')
+    if fmt not in sensor_store.READERS:
+        return jsonify({'error': f"Unsupported format '{fmt}' (expected csv or ndjson)"}), 415
+    store = get_sensors()
+    read = [0]  # bytes actually read; chunked uploads have no Content-Length
+
+    def lines():
+        for line in request.stream:
+            read[0] += len(line)
+            yield line.decode('utf-8', errors='replace')
+
+    try:
+        totals = store.ingest(lines(), fmt, SENSOR_CHUNK_ROWS, on_chunk=update_sensor_features)
+    except sensor_store.IngestError as e:
+        return jsonify({'error': str(e)}), 400
+    finally:
+        BYTES_READ.observe(read[0], 'sensor_ingest')
+    return jsonify(dict(totals, total=store.rows))
+
+def update_sensor_features(chunk):
+    """Feed the readings of an ingested chunk into the rolling sensor features."""
+    for name, values in chunk.items():
+        if sensor_store.COLUMN_TYPES[name] == 'float':
+            SENSOR_FEATURES.extend(name, values)
+
+@app.route('/api/sensors/features')
+def sensor_features():
+    """
+    Rolling features (mean, std, min, max, range, trend per reading, EWMA) of each
+    sensor over its latest SENSOR_FEATURE_WINDOW readings; format=struct gives
+    the flat 'mean_soil_moisture' naming of the MATLAB detectors.
+    """
+    if request.args.get('format') == 'struct':
+        return jsonify(SENSOR_FEATURES.as_struct())
+    return jsonify(SENSOR_FEATURES.per_stream())
+
+@app.route('/api/sensors')
+def query_sensors():
+    """
+    Sensor rows in a time window: ?since=&until= (ISO 8601 or epoch seconds)
+    [&columns=soil_moisture,ph][&limit=1000]. Timestamps are epoch milliseconds.
+    With clean=1 outliers and gaps are interpolated over, readings smoothed and
+    quality scores of the raw and cleaned rows added.
+    """
+    store = get_sensors()
+    try:
+        since = sensor_store.parse_time_arg(request.args.get('since'))
+        until = sensor_store.parse_time_arg(request.args.get('until'))
+        columns = [c for c in request.args.get('columns', '').split(',') if c] or None
+        rows = store.query(since, until, columns,
+                           min(request.args.get('limit', 1000, type=int), SENSOR_QUERY_MAX_ROWS))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except KeyError as e:
+        return jsonify({'error': f'Unknown column {e}'}), 400
+    response = {'stats': store.stats(), 'count': len(rows[sensor_store.TIME])}
+    if request.args.get('clean') == '1':
+        with STEP_SECONDS.time('sensors', 'clean'):
+            processed = sensor_cleaning.process(rows)
+        rows = processed['columns']
+        response.update(quality=processed['quality'], final_quality=processed['final_quality'],
+                        cleaning=processed['report'])
+    response['rows'] = {name: [None if isinstance(v, float) and v != v else v for v in values.tolist()]
+                        for name, values in rows.items()}
+    return jsonify(response)
 
 @app.route('/chat', methods=['POST'])
 def chat():
     data = request.get_json()
     message = data.get('message')
+    result_id = data.get('result_id')
+    
+    # Older clients, and runs without a stored result, post the analysis text itself
     context = data.get('analysis_context', '')
+    if result_id:
+        result = RESULTS.get(result_id)
+        if result is not None:
+            with STEP_SECONDS.time('chat', 'reply_by_result_id'):
+                reply = get_result_response(message, result)
+            return jsonify({'reply': reply})
+        if not context:
+            return jsonify({'reply': 'Those analysis results have expired. Please run the analysis again.'})
     
-    reply = get_ai_response(message, context)
+    with STEP_SECONDS.time('chat', 'reply_by_context'):
+        reply = get_ai_response(message, context)
     
     return jsonify({'reply': reply})
 
+CHAT_HELP = "I can answer questions about crop health, soil conditions, pest risk, and potential profit. What would you like to know?"
+SECTION_MISSING = {
+    'crop_health': "I couldn't find the Crop Health section in the analysis.",
+    'soil': "I couldn't find the Soil Condition section in the analysis.",
+    'pest': "I couldn't find the Pest Risk section in the analysis.",
+    'recommendations': "I couldn't find any recommendations in the analysis.",
+}
+
+def estimate_profit(health_status, pest_status):
+    """Potential profit per unit area from crop health status and pest risk level."""
+    base_profit = 1000  # Base profit in USD per unit area
+    
+    # Adjust profit based on health
+    if health_status == "good":
+        base_profit *= 1.2
+    elif health_status == "moderate":
+        base_profit *= 0.9
+    elif health_status == "poor":
+        base_profit *= 0.6
+        
+    # Adjust profit based on pest risk
+    if pest_status == "low":
+        base_profit *= 1.1
+    elif pest_status == "medium":
+        base_profit *= 0.8
+    elif pest_status == "high":
+        base_profit *= 0.5
+
+    return f"Based on the analysis, the estimated potential profit is around ${int(base_profit)} per unit area. This is an estimate based on crop health and pest risk."
+
+def get_result_response(message, result):
+    """Answer a chat message from a structured result (replies are built once per result)."""
+    intent = chat_router.match_intent(message)
+    if intent is None:
+        return CHAT_HELP
+    replies = CHAT_REPLIES.get(result.id)
+    if replies is None:
+        replies = {section: results_model.section_text(result, section) for section in results_model.SECTIONS}
+        replies['profit'] = estimate_profit((result.health.status or "unknown").lower(),
+                                            (result.pest.level or "unknown").lower())
+        CHAT_REPLIES.put(result.id, replies)
+    return replies[intent]
+
 def get_ai_response(message, context):
     """
     A simple AI response generator that parses the analysis context.
+    The context is indexed once per distinct text; replies are lookups in that index.
     """
-    message = message.lower()
+    intent = chat_router.match_intent(message)
     
     if not context:
-        if "profit" in message:
+        if intent == "profit":
             return "I can only calculate potential profit after an analysis has been run. Please run the analysis first."
         return "I don't have any analysis results to work with yet. Please click 'Run Analysis' first."
 
-    # Basic keyword matching
-    if "profit" in message:
-        # Extract key metrics to estimate profit
-        health_match = re.search(r"Overall Crop Health Status:\s*(\w+)", context, re.IGNORECASE)
-        pest_match = re.search(r"Overall Pest Risk Level:\s*(\w+)", context, re.IGNORECASE)
-        
-        health_status = health_match.group(1).lower() if health_match else "unknown"
-        pest_status = pest_match.group(1).lower() if pest_match else "unknown"
-
-        base_profit = 1000  # Base profit in USD per unit area
-        
-        # Adjust profit based on health
-        if health_status == "good":
-            base_profit *= 1.2
-        elif health_status == "moderate":
-            base_profit *= 0.9
-        elif health_status == "poor":
-            base_profit *= 0.6
-            
-        # Adjust profit based on pest risk
-        if pest_status == "low":
-            base_profit *= 1.1
-        elif pest_status == "medium":
-            base_profit *= 0.8
-        elif pest_status == "high":
-            base_profit *= 0.5
-
-        return f"Based on the analysis, the estimated potential profit is around ${int(base_profit)} per unit area. This is an estimate based on crop health and pest risk."
-
-    if "crop health" in message:
-        match = re.search(r"CROP HEALTH ANALYSIS\s*====================([\s\S]*?)SOIL CONDITION ANALYSIS", context)
-        return match.group(1).strip() if match else "I couldn't find the Crop Health section in the analysis."
-
-    if "soil" in message or "moisture" in message:
-        match = re.search(r"SOIL CONDITION ANALYSIS\s*=======================([\s\S]*?)PEST RISK ANALYSIS", context)
-        return match.group(1).strip() if match else "I couldn't find the Soil Condition section in the analysis."
+    index = SECTION_INDEXES.get(context)
+    if index is None:
+        index = SECTION_INDEXES.put(context, chat_router.SectionIndex(context), size=sys.getsizeof(context))
 
-    if "pest" in message:
-        match = re.search(r"PEST RISK ANALYSIS\s*==================([\s\S]*?)RECOMMENDATIONS", context)
-        return match.group(1).strip() if match else "I couldn't find the Pest Risk section in the analysis."
-
-    if "recommendations" in message:
-        match = re.search(r"RECOMMENDATIONS\s*===============([\s\S]*)", context)
-        return match.group(1).strip() if match else "I couldn't find any recommendations in the analysis."
-
-    return "I can answer questions about crop health, soil conditions, pest risk, and potential profit. What would you like to know?"
+    if intent == "profit":
+        return estimate_profit(index.statuses['health_status'], index.statuses['pest_status'])
+    if intent is None:
+        return CHAT_HELP
+    section = index.section(intent)
+    return section if section is not None else SECTION_MISSING[intent]
 
 if __name__ == '__main__':
     port = int(os.getenv('PORT', '5001'))
@@ -167,52 +723,91 @@ if __name__ == '__main__':
 # MATLAB Integration Functions
 # ------------------------------
 def process_matlab_results():
-    """Process MATLAB results and use actual MATLAB-generated visualizations"""
-    
+    """
+    Process MATLAB results and use actual MATLAB-generated visualizations.
+    Returns (analysis text, image URLs, combined_results as nested dicts or None).
+    """
+    with STEP_SECONDS.time('process_matlab_results', 'total'):
+        return _process_matlab_results()
+
+def _process_matlab_results():
     results_dir = 'results'
     
     # Check if MATLAB results directory exists
     if not os.path.exists(results_dir):
         raise Exception("MATLAB results directory not found. Please ensure MATLAB analysis completed successfully.")
     
-    # Find the most recent MATLAB results files
-    mat_files = [f for f in os.listdir(results_dir) if f.startswith('combined_results_') and f.endswith('.mat')]
-    
-    if not mat_files:
-        raise Exception("No MATLAB combined_results file found. Please ensure MATLAB analysis completed successfully.")
-    
-    # Get the most recent results file
-    latest_file = max(mat_files, key=lambda x: os.path.getctime(os.path.join(results_dir, x)))
-    
-    # Try to read MATLAB results using scipy for analysis text
-    try:
-        import scipy.io
-        mat_data = scipy.io.loadmat(os.path.join(results_dir, latest_file))
-        matlab_results = mat_data['combined_results']
+    with STEP_SECONDS.time('process_matlab_results', 'find_results'):
+        # Find the most recent MATLAB results files
+        mat_files = [f for f in os.listdir(results_dir) if f.startswith('combined_results_') and f.endswith('.mat')]
         
-        # Generate analysis output from MATLAB data
-        analysis_output = generate_analysis_output_from_matlab(matlab_results)
+        if not mat_files:
+            raise Exception("No MATLAB combined_results file found. Please ensure MATLAB analysis completed successfully.")
         
-    except ImportError:
-        # If scipy not available, create basic output
-        analysis_output = generate_basic_matlab_output(latest_file)
-    except Exception as e:
-        # If reading MATLAB data fails, create basic output
-        analysis_output = generate_basic_matlab_output(latest_file, str(e))
-    
-    # Use actual MATLAB-generated PNG files (not Python-generated ones)
-    image_files = [f for f in os.listdir(results_dir) if f.endswith('.png')]
+        # Get the most recent results file
+        latest_file = max(mat_files, key=lambda x: os.path.getctime(os.path.join(results_dir, x)))
+        
+        # Reuse the parsed results until MATLAB writes a new (or rewrites this) results file.
+        # PNGs are saved after combined_results, so the image list also checks the directory mtime.
+        key = file_key(os.path.join(results_dir, latest_file))
+        images_mtime = os.stat(results_dir).st_mtime_ns
+        cached = RESULTS_CACHE.get(key)
+    if cached is not None and cached['images_mtime'] == images_mtime:
+        return cached['output'], list(cached['images']), cached['struct']
     
-    # Sort by timestamp to get consistent ordering
-    image_files.sort()
+    if cached is not None:
+        matlab_results, analysis_output = cached['struct'], cached['output']
+    else:
+        # Read MATLAB results for analysis text; the .mat is converted to the raster
+        # store on first use, later calls only read its JSON summary
+        matlab_results = None
+        try:
+            with STEP_SECONDS.time('process_matlab_results', 'load'):
+                dataset = convert_combined_results(os.path.join(results_dir, latest_file))
+                matlab_results = dataset.attrs['combined_results']
+            BYTES_READ.observe(dataset.bytes_read, 'combined_results')
+            
+            # Generate analysis output from MATLAB data
+            with STEP_SECONDS.time('process_matlab_results', 'format'):
+                analysis_output = generate_analysis_output_from_matlab(matlab_results)
+            
+        except ImportError:
+            # If scipy not available, create basic output
+            analysis_output = generate_basic_matlab_output(latest_file)
+        except Exception as e:
+            # If reading MATLAB data fails, create basic output
+            analysis_output = generate_basic_matlab_output(latest_file, str(e))
     
-    # Create URLs for the MATLAB-generated images
-    image_urls = [f'/results/{f}' for f in image_files]
+    with STEP_SECONDS.time('process_matlab_results', 'list_images'):
+        # Use actual MATLAB-generated PNG files (not Python-generated ones)
+        image_files = [f for f in os.listdir(results_dir) if f.endswith('.png')]
+        
+        # Sort by timestamp to get consistent ordering
+        image_files.sort()
+        
+        # URLs of content-hash copies, so unchanged maps stay in browser caches
+        image_urls = publish_images(results_dir, image_files)
     
     # Debug info
     print(f"Found {len(image_files)} MATLAB-generated images: {image_files}")
     
-    return analysis_output, image_urls
+    # Only successfully parsed results are cached; failures are retried next time
+    if matlab_results is not None:
+        RESULTS_CACHE.put(key, {'struct': matlab_results, 'output': analysis_output,
+                                'images': image_urls, 'images_mtime': images_mtime})
+    return analysis_output, list(image_urls), matlab_results
+
+def convert_combined_results(path):
+    """
+    Convert the latest combined_results_<timestamp>.mat into the one
+    'combined_results' dataset, replacing the previous run's rasters instead
+    of keeping a dataset per run (datasets named per run are pruned).
+    """
+    dataset = RASTERS.convert(path, name='combined_results')
+    for name in RASTERS.names():
+        if name.startswith('combined_results_'):
+            RASTERS.remove(name)
+    return dataset
 
 def generate_basic_matlab_output(latest_file, error_msg=None):
     """Generate basic output when MATLAB data reading fails"""
@@ -241,14 +836,19 @@ Check the maps for detailed agricultural insights from your MATLAB analysis.
 """
     return output.strip()
 
-def generate_analysis_output_from_matlab(matlab_results):
-    """Generate formatted analysis output from MATLAB results"""
+def generate_analysis_output_from_matlab(matlab_results, backend='MATLAB'):
+    """Generate formatted analysis output from MATLAB results (combined_results as nested dicts)"""
     
+    def first(value):
+        # MATLAB fields read as [0,0] may hold vectors; report the first element
+        return value[0] if isinstance(value, list) and value else value
+
     try:
         # Extract data from MATLAB structure (this may need adjustment based on actual structure)
-        crop_health = matlab_results['crop_health'][0,0] if 'crop_health' in matlab_results else None
-        soil_condition = matlab_results['soil_condition'][0,0] if 'soil_condition' in matlab_results else None
-        pest_risks = matlab_results['pest_risks'][0,0] if 'pest_risks' in matlab_results else None
+        crop_health = matlab_results.get('crop_health')
+        soil_condition = matlab_results.get('soil_condition')
+        pest_risks = matlab_results.get('pest_risks')
+        overall_risk = pest_risks.get('overall_risk') if pest_risks else None
         
         # Format output similar to demo but with real data
         output = f"""
@@ -257,28 +857,28 @@ Analysis completed: {datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')}
 
 CROP HEALTH ANALYSIS
 ====================
-Overall Health Score: {crop_health['overall_health'][0,0]['score'][0,0] if crop_health else 'N/A'}
-Health Status: {crop_health['overall_health'][0,0]['status'][0] if crop_health else 'N/A'}
+Overall Health Score: {first(crop_health['overall_health']['score']) if crop_health else 'N/A'}
+Health Status: {first(crop_health['overall_health']['status']) if crop_health else 'N/A'}
 
 Vegetation Indices:
-• NDVI Mean: {crop_health['ndvi_analysis'][0,0]['mean'][0,0] if crop_health else 'N/A'}
-• GNDVI Mean: {crop_health['gndvi_analysis'][0,0]['mean'][0,0] if crop_health else 'N/A'}
-• NDRE Mean: {crop_health['ndre_analysis'][0,0]['mean'][0,0] if crop_health else 'N/A'}
+• NDVI Mean: {first(crop_health['ndvi_analysis']['mean']) if crop_health else 'N/A'}
+• GNDVI Mean: {first(crop_health['gndvi_analysis']['mean']) if crop_health else 'N/A'}
+• NDRE Mean: {first(crop_health['ndre_analysis']['mean']) if crop_health else 'N/A'}
 
 SOIL CONDITION ANALYSIS
 =======================
-Overall Soil Score: {soil_condition['health_assessment'][0,0]['overall_score'][0,0] if soil_condition else 'N/A'}
-Soil Moisture: {soil_condition['moisture_analysis'][0,0]['sensor_moisture_mean'][0,0] if soil_condition else 'N/A'}
-Soil Temperature: {soil_condition['temperature_analysis'][0,0]['mean_temperature'][0,0] if soil_condition else 'N/A'}
+Overall Soil Score: {first(soil_condition['health_assessment']['overall_score']) if soil_condition else 'N/A'}
+Soil Moisture: {first(soil_condition['moisture_analysis']['sensor_moisture_mean']) if soil_condition else 'N/A'}
+Soil Temperature: {first(soil_condition['temperature_analysis']['mean_temperature']) if soil_condition else 'N/A'}
 
 PEST RISK ANALYSIS
 ==================
-Overall Risk Score: {pest_risks['overall_risk'][0,0]['score'][0,0] if pest_risks else 'N/A'}
-Risk Level: {pest_risks['overall_risk'][0,0]['level'][0] if pest_risks else 'N/A'}
+Overall Risk Score: {first(overall_risk['score']) if overall_risk else 'N/A'}
+Risk Level: {first(overall_risk['level']) if overall_risk else 'N/A'}
 
 RECOMMENDATIONS
 ===============
-Based on MATLAB analysis results:
+Based on {backend} analysis results:
 • Monitor areas with low vegetation indices
 • Check soil moisture levels in dry zones
 • Implement pest management in high-risk areas
@@ -299,122 +899,190 @@ Please check the generated visualization maps for analysis results.
 === END OF RESULTS ===
 """
 
+# ------------------------------
+# Python analysis backend (no MATLAB)
+# ------------------------------
+INDEX_MAPS = ('ndvi', 'gndvi', 'ndre', 'savi', 'evi')
+HEALTH_INDICES = INDEX_MAPS + ('ndwi', 'ci')  # ndwi and ci feed the stress patterns
+
+def run_numpy_analysis(emit):
+    """
+    Run the Python counterpart of main.m as a stage graph (pipeline.py): load
+    and correct the multispectral cube and compute its indices, then analyze
+    crop health (crop_health.py), soil condition (soil_condition.py) and pest
+    risks (pest_risk.py) concurrently on the shared arrays (in ANALYZER_PROCESSES
+    worker processes attached to one shared-memory copy, when set), render the
+    index, health, soil and pest risk maps and build the report.
+    """
+    base_dir = os.path.dirname(os.path.abspath(__file__))
+    cube_path = os.getenv('SPECTRAL_DATA') or spectral_indices.find_cube(base_dir)
+    if cube_path is None:
+        return {'error': 'No multispectral_data.mat found for the numpy backend.'}
+    shares = []
+    try:
+        results = numpy_pipeline(cube_path, base_dir, emit, shares).run(
+            workers=PIPELINE_WORKERS, emit=emit, timer=lambda name: STEP_SECONDS.time('run_numpy_analysis', name))
+    finally:
+        # Normally released by the analyzers already; this covers a failed run
+        for share in shares:
+            share.close()
+    return results['report']
+
+def get_analyzer_pool():
+    """Process pool for the analyzers, kept alive between runs like the demo render pool."""
+    global ANALYZER_POOL
+    with ANALYZER_POOL_LOCK:
+        if ANALYZER_POOL is None:
+            # spawn: forking the multi-threaded server could copy held locks
+            ANALYZER_POOL = ProcessPoolExecutor(max_workers=ANALYZER_PROCESSES,
+                                                mp_context=multiprocessing.get_context('spawn'))
+        return ANALYZER_POOL
+
+def numpy_pipeline(cube_path, base_dir, emit, shares):
+    def load():
+        cube = RASTERS.convert(cube_path).raster('multispectral_data')
+        BYTES_READ.observe(cube.nbytes, 'spectral_cube')
+        emit('Loaded multispectral data: %dx%dx%d' % cube.shape)
+        return cube
+
+    def spectral(cube):
+        corrected = spectral_indices.radiometric_correction(cube)
+        names = tuple(dict.fromkeys(HEALTH_INDICES + PEST_ENGINE.index_names + pest_risk.MAP_INDICES))
+        indices = spectral_indices.compute_indices(corrected, names=names)
+        if not ANALYZER_PROCESSES:
+            return corrected, indices, None
+        # Published once for the analyzer processes, one reference per analyzer stage
+        share = shared_rasters.RasterShare(dict(indices, cube=corrected), refs=3)
+        shares.append(share)
+        return corrected, indices, share
+
+    def analyze(spectral, func, *args, **kwargs):
+        """
+        Call func on this thread, or in the analyzer pool with the shared
+        rasters (args take them from rasters()); releases the stage's reference.
+        """
+        share = spectral[2]
+        if share is None:
+            return func(*args, **kwargs)
+        try:
+            return get_analyzer_pool().submit(shared_rasters.run_attached, func, *args, **kwargs).result()
+        finally:
+            share.release()
+
+    def rasters(spectral):
+        """(cube, index maps) as arrays, or as shared handles for the analyzer pool."""
+        corrected, indices, share = spectral
+        if share is None:
+            return corrected, indices
+        handles = dict(share.handles)
+        return handles.pop('cube'), handles
+
+    def health(spectral):
+        _, indices = rasters(spectral)
+        return analyze(spectral, crop_health.analyze_health, indices, include_maps=False)
+
+    def soil(spectral, sensor_data):
+        if sensor_data is None:
+            if spectral[2] is not None:
+                spectral[2].release()
+            return None
+        cube, indices = rasters(spectral)
+        stations = soil_condition.load_stations(SENSOR_STATIONS) if SENSOR_STATIONS else None
+        return analyze(spectral, soil_condition.assess_condition, cube, indices['ndwi'], sensor_data, stations,
+                       include_maps=False)
+
+    def pests(spectral):
+        cube, indices = rasters(spectral)
+        return analyze(spectral, PEST_ENGINE.analyze, indices, cube)
+
+    def render(spectral, health, soil, pests):
+        indices = spectral[1]
+        image_files = []
+        for name in INDEX_MAPS:
+            filename = f'{name}_map.png'
+            demo_render.save_rgb(colormaps.colorize(indices[name], 'jet', vmin=-1, vmax=1),
+                                 os.path.join(RESULTS_DIR, filename))
+            image_files.append(filename)
+        demo_render.save_rgb(crop_health.health_map(indices['ndvi'])['rgb'],
+                             os.path.join(RESULTS_DIR, 'crop_health_map.png'))
+        image_files.append('crop_health_map.png')
+        if soil is not None:
+            demo_render.save_rgb(soil['moisture_map']['rgb'], os.path.join(RESULTS_DIR, 'soil_condition_map.png'))
+            image_files.append('soil_condition_map.png')
+        demo_render.save_rgb(pests['risk_map']['rgb'], os.path.join(RESULTS_DIR, 'pest_risk_map.png'))
+        demo_render.save_rgb(colormaps.colorize(pests['risk_map']['score'], 'jet', vmin=0, vmax=1),
+                             os.path.join(RESULTS_DIR, 'pest_risk_score_map.png'))
+        image_files += ['pest_risk_map.png', 'pest_risk_score_map.png']
+        return image_files
+
+    def report(health, soil, pests, image_files):
+        # Same layout as MATLAB's combined_results, so both backends share the formatting
+        combined = {'crop_health': health, 'pest_risks': pests}
+        if soil is not None:
+            combined['soil_condition'] = soil
+        analysis_output = generate_analysis_output_from_matlab(combined, backend='Python')
+        image_urls = publish_images(RESULTS_DIR, image_files)
+        return with_result({'output': analysis_output, 'images': image_urls, 'full_context': analysis_output},
+                           results_model.from_matlab(combined, image_urls, source='numpy'))
+
+    return pipeline.Pipeline([
+        pipeline.Stage('load', load, message='Loading input data...'),
+        pipeline.Stage('sensors', lambda: soil_sensor_data(base_dir)),
+        pipeline.Stage('spectral', spectral, ['load'], message='Processing multispectral data...'),
+        # The analyzers only read the shared cube and index maps, so they run side by side
+        pipeline.Stage('crop_health', health, ['spectral'], message='Running crop health, soil and pest analyses...'),
+        pipeline.Stage('soil_condition', soil, ['spectral', 'sensors']),
+        pipeline.Stage('pest_risk', pests, ['spectral']),
+        pipeline.Stage('render', render, ['spectral', 'crop_health', 'soil_condition', 'pest_risk'],
+                       message='Rendering index maps...'),
+        pipeline.Stage('report', report, ['crop_health', 'soil_condition', 'pest_risk', 'render'],
+                       message='Generating comprehensive report...'),
+    ])
+
+def soil_sensor_data(base_dir):
+    """
+    Sensor series for the soil analysis: the ingested readings of the last
+    SOIL_SENSOR_DAYS (the newest SENSOR_QUERY_MAX_ROWS of them), or
+    sensor_data.mat as main.m loads it; None without either.
+    """
+    store = get_sensors()
+    last = store.stats()['last']
+    if last is not None:
+        since = last - int(SOIL_SENSOR_DAYS * 86400 * 1000)
+        rows = store.query(since=since, columns=list(soil_condition.SOIL_SENSORS), limit=SENSOR_QUERY_MAX_ROWS,
+                           newest=True)
+        if all(np.isfinite(rows[name]).any() for name in soil_condition.SOIL_SENSORS):
+            return rows
+    path = soil_condition.find_sensor_mat(base_dir)
+    return soil_condition.load_sensor_mat(path) if path else None
+
 # Note: Python visualization creation functions removed
 # Now using actual MATLAB-generated PNG files directly
 
 # ------------------------------
 # Demo utilities (no MATLAB)
 # ------------------------------
-def generate_demo_results(results_dir: str) -> str:
+def generate_demo_results(results_dir: str, size: int = None) -> str:
+    with STEP_SECONDS.time('generate_demo_results', 'total'):
+        return _generate_demo_results(results_dir, size)
+
+def _generate_demo_results(results_dir, size):
     os.makedirs(results_dir, exist_ok=True)
-    # Create simple synthetic maps if Pillow is available; otherwise just return text
+    # Create synthetic maps if Pillow is available; otherwise just return text
     if Image is not None:
-        # sizes
-        w, h = 256, 256
-        # Helpers
-        def save_colormap(name, seed=0):
-            rnd = random.Random(seed)
-            img = Image.new('RGB', (w, h))
-            
-            # Create realistic field patterns based on map type
-            for y in range(h):
-                for x in range(w):
-                    # Create field-like patterns with some randomness
-                    field_x = (x // 32) * 32 + 16  # Create field boundaries
-                    field_y = (y // 32) * 32 + 16
-                    
-                    # Base value with field variation
-                    base_val = 0.3 + 0.4 * (field_x + field_y) / (w + h)
-                    
-                    # Add crop row patterns
-                    if name in ['ndvi_map', 'gndvi_map', 'ndre_map']:
-                        # Vegetation indices - show crop rows
-                        row_pattern = 0.1 * abs(math.sin(y * 0.2)) if y % 8 < 4 else 0
-                        base_val += row_pattern
-                        # Healthy areas (green-yellow), stressed areas (red-orange)
-                        if base_val > 0.6:
-                            color = (int(50 + base_val * 100), int(150 + base_val * 105), 50)
-                        else:
-                            color = (int(150 + base_val * 105), int(100 + base_val * 100), 50)
-                            
-                    elif name == 'soil_condition_map':
-                        # Soil moisture - brown to blue gradient
-                        soil_noise = 0.1 * rnd.random()
-                        base_val += soil_noise
-                        color = (int(139 - base_val * 100), int(69 + base_val * 100), int(19 + base_val * 200))
-                        
-                    elif name in ['evi_map', 'savi_map']:
-                        # Enhanced vegetation - similar to NDVI but different scaling
-                        base_val = base_val * 0.8 + 0.1
-                        color = (int(34 + base_val * 150), int(139 + base_val * 116), int(34 + base_val * 50))
-                        
-                    else:  # pest_risk_score_map
-                        # Pest risk - cooler colors for low risk, warmer for high risk
-                        risk_val = base_val + 0.2 * rnd.random()
-                        if risk_val < 0.4:
-                            color = (50, int(100 + risk_val * 200), 200)  # Blue-green (low risk)
-                        elif risk_val < 0.7:
-                            color = (int(100 + risk_val * 155), int(150 + risk_val * 105), 100)  # Yellow (medium)
-                        else:
-                            color = (int(150 + risk_val * 105), int(50 + risk_val * 50), 50)  # Red (high risk)
-                    
-                    # Ensure valid RGB values
-                    color = (max(0, min(255, color[0])), max(0, min(255, color[1])), max(0, min(255, color[2])))
-                    img.putpixel((x, y), color)
-                    
-            img.save(os.path.join(results_dir, f'{name}.png'))
-
-        def save_discrete_rgb(name):
-            img = Image.new('RGB', (w, h))
-            rnd = random.Random(42)
-            
-            for y in range(h):
-                for x in range(w):
-                    # Create realistic field patches instead of simple bands
-                    patch_size = 40
-                    patch_x = (x // patch_size) * patch_size
-                    patch_y = (y // patch_size) * patch_size
-                    
-                    # Determine patch health/risk based on position with some randomness
-                    patch_val = ((patch_x + patch_y) % 120) / 120.0 + 0.1 * rnd.random()
-                    
-                    if name == 'crop_health_map':
-                        if patch_val < 0.33:
-                            color = (50, 200, 50)     # Healthy (green)
-                        elif patch_val < 0.66:
-                            color = (255, 255, 50)   # Stressed (yellow)  
-                        else:
-                            color = (220, 50, 50)    # Unhealthy (red)
-                    else:  # pest_risk_map
-                        if patch_val < 0.33:
-                            color = (100, 200, 100)  # Low risk (light green)
-                        elif patch_val < 0.66:
-                            color = (255, 200, 50)   # Medium risk (orange-yellow)
-                        else:
-                            color = (200, 50, 50)    # High risk (red)
-                    
-                    # Add some texture within patches
-                    texture = rnd.randint(-20, 20)
-                    color = (max(0, min(255, color[0] + texture)), 
-                           max(0, min(255, color[1] + texture)), 
-                           max(0, min(255, color[2] + texture)))
-                    
-                    img.putpixel((x, y), color)
-            
-            img.save(os.path.join(results_dir, f'{name}.png'))
-
-        # Save maps
-        save_colormap('ndvi_map', seed=1)
-        save_colormap('gndvi_map', seed=2)
-        save_colormap('ndre_map', seed=3)
-        save_colormap('savi_map', seed=4)
-        save_colormap('evi_map', seed=5)
-        save_colormap('soil_condition_map', seed=6)
-        save_discrete_rgb('crop_health_map')
-        save_discrete_rgb('pest_risk_map')
-        save_colormap('pest_risk_score_map', seed=7)
-
-    # Compose console-like output expected by the UI regex
+        if size is None:
+            size = int(os.getenv('DEMO_MAP_SIZE', str(demo_render.DEFAULT_MAP_SIZE)))
+        workers = os.getenv('DEMO_RENDER_WORKERS')
+        with STEP_SECONDS.time('generate_demo_results', 'render_maps'):
+            demo_render.render_demo_maps(results_dir, size, int(workers) if workers else None)
+
+    # Compose console-like output from the same values the structured result reports
+    demo = results_model.demo_result()
+    health, soil, pest = demo.health, demo.soil, demo.pest
+    indices = '\n'.join(f'  {name.upper()}: {stats.mean:.3f} ({stats.status})' for name, stats in demo.indices.items())
+    pests = '\n'.join(f'  {name.replace("_", " ").title()}: {score:.2f} ({results_model.pest_label(score)})'
+                      for name, score in pest.pests.items())
+    recommendations = {key: '\n'.join(f'• {text}' for text in texts) for key, texts in demo.recommendations.items()}
     now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
     output = f"""
 === AGRICULTURAL MONITORING RESULTS ===
@@ -424,60 +1092,52 @@ EXECUTIVE SUMMARY
 Report ID: DEMO-{int(time_time_safe())}
 Analysis Date: {now}
 Overall Assessment: Good (Score: 0.82)
-Risk Level: Medium
+Risk Level: {pest.level}
 
 CROP HEALTH ANALYSIS
 ====================
-Overall Health: Good (Score: 0.78)
-Confidence: 0.85
+Overall Health: {health.status} (Score: {health.score:.2f})
+Confidence: {health.confidence:.2f}
 
 Vegetation Indices:
-  NDVI: 0.612 (Healthy)
-  GNDVI: 0.488 (Healthy)
-  NDRE: 0.212 (Moderate)
-  SAVI: 0.365 (Moderate)
-  EVI: 0.304 (Moderate)
+{indices}
 
 Health Distribution:
-  Healthy: 62.5%
-  Stressed: 25.0%
-  Unhealthy: 12.5%
+  Healthy: {health.healthy_percentage:.1f}%
+  Stressed: {health.stressed_percentage:.1f}%
+  Unhealthy: {health.unhealthy_percentage:.1f}%
 
 SOIL CONDITION ANALYSIS
 =======================
-Overall Health: Good (Score: 0.81)
+Overall Health: {soil.status} (Score: {soil.score:.2f})
 
 Soil Parameters:
-  Moisture: 0.18 (Adequate)
-  Temperature: 22.1°C (Optimal)
-  pH: 6.7 (Optimal)
-  EC: 1.35 dS/m (Normal)
+  Moisture: {soil.moisture:.2f} ({soil.parameter_status['moisture']})
+  Temperature: {soil.temperature:.1f}°C ({soil.parameter_status['temperature']})
+  pH: {soil.ph:.1f} ({soil.parameter_status['ph']})
+  EC: {soil.ec:.2f} dS/m ({soil.parameter_status['ec']})
 
 PEST RISK ANALYSIS
 ==================
-Overall Risk: Medium (Score: 0.46)
-Confidence: 0.77
+Overall Risk: {pest.level} (Score: {pest.score:.2f})
+Confidence: {pest.confidence:.2f}
 
 Specific Pest Risks:
-  Aphids: 0.42 (Medium Risk)
-  Whiteflies: 0.28 (Low Risk)
-  Thrips: 0.31 (Medium Risk)
-  Spider Mites: 0.22 (Low Risk)
-  Caterpillars: 0.18 (Low Risk)
+{pests}
 
 RECOMMENDATIONS
 ===============
 Crop Health Recommendations:
-• Maintain current irrigation; spot-check yellow areas.
+{recommendations['crop']}
 
 Soil Condition Recommendations:
-• If moisture < 0.2, apply 10–20 mm irrigation.
+{recommendations['soil']}
 
 Pest Management Recommendations:
-• Medium pest pressure; scout hotspots before spraying.
+{recommendations['pest']}
 
 Integrated Recommendations:
-• Prioritize scouting in medium/high-risk patches, then re-check indices in 3 days.
+{recommendations['integrated']}
 
 === END OF RESULTS ===
 """
@@ -485,31 +1145,14 @@ Integrated Recommendations:
 
 
 def apply_jet_palette(gray_img):
-    # Simple jet-like palette mapping without numpy
-    w, h = gray_img.size
-    out = Image.new('RGB', (w, h))
-    for y in range(h):
-        for x in range(w):
-            v = gray_img.getpixel((x, y)) / 255.0
-            r, g, b = jet_rgb(v)
-            out.putpixel((x, y), (int(r*255), int(g*255), int(b*255)))
-    return out
+    # Jet palette applied through a precomputed 256-entry LUT in palette mode
+    return colormaps.get_colormap('jet').apply_image(gray_img)
 
 
 def jet_rgb(v):
-    # piecewise jet colormap 0..1
-    if v < 0.25:
-        r, g, b = 0.0, 4*v, 1.0
-    elif v < 0.5:
-        r, g, b = 0.0, 1.0, 1.0 - 4*(v-0.25)
-    elif v < 0.75:
-        r, g, b = 4*(v-0.5), 1.0, 0.0
-    else:
-        r, g, b = 1.0, 1.0 - 4*(v-0.75), 0.0
-    r = max(0.0, min(1.0, r))
-    g = max(0.0, min(1.0, g))
-    b = max(0.0, min(1.0, b))
-    return r, g, b
+    # piecewise jet colormap 0..1 (scalar form of colormaps.jet_channels)
+    r, g, b = colormaps.jet_channels(v)
+    return float(r), float(g), float(b)
 
 
 def time_time_safe():
@@ -0,0 +1,120 @@
+"""
+Content-addressed copies of result artifacts (maps and other files under results/).
+
+MATLAB and the demo renderer overwrite the same file names every run. Each
+published file is copied once to ``<stem>.<hash><ext>``, named by the first
+16 hex digits of its SHA-256, and a manifest maps the logical name to the
+current hashed copy. A hashed URL always refers to the same bytes, so it can
+be served with a strong ETag and ``Cache-Control: immutable``; files with
+identical content share one copy. The hash is only recomputed when the
+source file's size or mtime changes.
+"""
+
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+
+MANIFEST_FILE = 'manifest.json'
+HASH_LENGTH = 16
+HASHED_NAME_RE = re.compile(r'^(?P<stem>.+)\.(?P<hash>[0-9a-f]{%d})(?P<ext>\.[A-Za-z0-9]+)$' % HASH_LENGTH)
+
+
+def file_digest(path, chunk_size=1024 * 1024):
+    """Hex SHA-256 of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hashed_name(name, digest):
+    stem, ext = os.path.splitext(name)
+    return f'{stem}.{digest[:HASH_LENGTH]}{ext}'
+
+
+class ArtifactStore:
+    """Hashed copies of result files in ``root`` plus a manifest of the current ones."""
+
+    def __init__(self, root, retention=24 * 3600):
+        self.root = root
+        self.retention = retention  # seconds an unreferenced copy is kept for clients still holding its URL
+        self._lock = threading.Lock()
+        self._manifest = self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.root, MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        # Caller holds the lock
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp, os.path.join(self.root, MANIFEST_FILE))
+
+    @property
+    def manifest(self):
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._manifest.items()}
+
+    def publish(self, path, name=None):
+        """Make the current content of ``path`` available under its hashed name; returns that name."""
+        return self.publish_all([path], [name] if name else None)[0]
+
+    def publish_all(self, paths, names=None):
+        """Publish several files with one manifest write; returns their hashed names in order."""
+        names = names or [os.path.basename(p) for p in paths]
+        published = []
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            changed = False
+            for path, name in zip(paths, names):
+                st = os.stat(path)
+                entry = self._manifest.get(name)
+                if entry is None or entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns:
+                    digest = file_digest(path)
+                    target = hashed_name(name, digest)
+                    if not os.path.exists(os.path.join(self.root, target)):
+                        # Copy (not link): the source is overwritten in place by the next run
+                        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+                        os.close(fd)
+                        shutil.copyfile(path, tmp)
+                        os.replace(tmp, os.path.join(self.root, target))
+                    entry = {'file': target, 'sha256': digest, 'size': st.st_size,
+                             'mtime_ns': st.st_mtime_ns, 'published_at': time.time()}
+                    self._manifest[name] = entry
+                    changed = True
+                published.append(entry['file'])
+            if changed:
+                self._save()
+                self._prune()
+        return published
+
+    def _prune(self):
+        # Caller holds the lock: drop unreferenced copies older than the retention period
+        current = {entry['file'] for entry in self._manifest.values()}
+        cutoff = time.time() - self.retention
+        for filename in os.listdir(self.root):
+            if HASHED_NAME_RE.match(filename) and filename not in current:
+                path = os.path.join(self.root, filename)
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+
+    def resolve(self, filename):
+        """(path, strong ETag value) of a hashed file name, or None if it is not a stored artifact."""
+        match = HASHED_NAME_RE.match(filename)
+        if match is None:
+            return None
+        path = os.path.join(self.root, filename)
+        if not os.path.isfile(path):
+            return None
+        return path, match.group('hash')
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-message cost of answering /chat from a large analysis text.
+
+Compares the original get_ai_response (keyword chain plus a regex scan of
+the context per message) with the intent router and section index.
+
+Usage:
+    python bench_chat.py [--context-kb 512] [--messages 2000]
+"""
+
+import argparse
+import re
+import tempfile
+import time
+
+import app
+
+MESSAGES = ('What about crop health?', 'How is the soil moisture?', 'Any pest problems?',
+            'Give me recommendations', 'What is my profit?', 'hello')
+
+
+def legacy_response(message, context):
+    """get_ai_response before the section index, kept as the benchmark baseline."""
+    message = message.lower()
+    if not context:
+        return "I don't have any analysis results to work with yet. Please click 'Run Analysis' first."
+    if "profit" in message:
+        health_match = re.search(r"Overall Crop Health Status:\s*(\w+)", context, re.IGNORECASE)
+        pest_match = re.search(r"Overall Pest Risk Level:\s*(\w+)", context, re.IGNORECASE)
+        health_status = health_match.group(1).lower() if health_match else "unknown"
+        pest_status = pest_match.group(1).lower() if pest_match else "unknown"
+        return app.estimate_profit(health_status, pest_status)
+    if "crop health" in message:
+        match = re.search(r"CROP HEALTH ANALYSIS\s*====================([\s\S]*?)SOIL CONDITION ANALYSIS", context)
+        return match.group(1).strip() if match else "I couldn't find the Crop Health section in the analysis."
+    if "soil" in message or "moisture" in message:
+        match = re.search(r"SOIL CONDITION ANALYSIS\s*=======================([\s\S]*?)PEST RISK ANALYSIS", context)
+        return match.group(1).strip() if match else "I couldn't find the Soil Condition section in the analysis."
+    if "pest" in message:
+        match = re.search(r"PEST RISK ANALYSIS\s*==================([\s\S]*?)RECOMMENDATIONS", context)
+        return match.group(1).strip() if match else "I couldn't find the Pest Risk section in the analysis."
+    if "recommendations" in message:
+        match = re.search(r"RECOMMENDATIONS\s*===============([\s\S]*)", context)
+        return match.group(1).strip() if match else "I couldn't find any recommendations in the analysis."
+    return app.CHAT_HELP
+
+
+def large_context(size_kb):
+    """Demo analysis text with its MATLAB console log padded in front, as /run-matlab returns it."""
+    text = app.generate_demo_results(tempfile.mkdtemp(), size=8)
+    log_line = 'Processing multispectral data... band statistics computed for tile\n'
+    padding = log_line * max(0, size_kb * 1024 // len(log_line))
+    return padding + text + '\nOverall Crop Health Status: Good\nOverall Pest Risk Level: Medium\n'
+
+
+def per_message_us(fn, context, count, fresh=False):
+    """Mean microseconds per reply. fresh: a new copy of the text per message, as
+    each /chat request decodes its own (the copy itself is not counted)."""
+    elapsed = 0.0
+    for i in range(count):
+        text = (context + ' ')[:-1] if fresh else context
+        start = time.perf_counter()
+        fn(MESSAGES[i % len(MESSAGES)], text)
+        elapsed += time.perf_counter() - start
+    return elapsed / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--context-kb', type=int, default=512)
+    parser.add_argument('--messages', type=int, default=2000)
+    args = parser.parse_args()
+
+    context = large_context(args.context_kb)
+    for message in MESSAGES:
+        assert app.get_ai_response(message, context) == legacy_response(message, context), message
+
+    legacy = per_message_us(legacy_response, context, args.messages)
+    routed = per_message_us(app.get_ai_response, context, args.messages)
+    posted = per_message_us(app.get_ai_response, context, args.messages, fresh=True)
+    result = app.RESULTS.add(app.results_model.demo_result())
+    by_id = per_message_us(lambda message, _: app.get_result_response(message, result), None, args.messages)
+    print(f'context: {len(context) / 1024:.0f} KB, {args.messages} messages')
+    print(f'regex chain:                  {legacy:10.1f} us/message')
+    print(f'router, same text object:     {routed:10.1f} us/message  ({legacy / routed:.0f}x)')
+    print(f'router, text posted per call: {posted:10.1f} us/message  ({legacy / posted:.0f}x, hashes the text)')
+    print(f'router, result_id:            {by_id:10.1f} us/message  ({legacy / by_id:.0f}x)')
+
+
+if __name__ == '__main__':
+    main()
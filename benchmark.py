@@ -0,0 +1,406 @@
+#!/usr/bin/env python3
+"""
+Benchmark harness for the Python side of the analysis server.
+
+Times demo map generation, parsing of MATLAB results (cold and cached), chat
+replies, the NumPy analysis backend, the Python crop health and pest risk
+analyses, soil sensor interpolation and sensor cleaning (of size x size
+rows, batch and streamed) on fixed-seed inputs at several raster sizes. Each
+case reports p50/p95/p99 latency and its memory high-water mark (tracemalloc
+peak of one extra run, so tracing does not slow the timed runs). Results can
+be written as JSON or CSV and compared against a stored JSON baseline; the
+exit status is 1 when a case regresses or misses the latency target.
+
+Usage:
+    python benchmark.py --sizes 128 256 512 --repeats 20 --json baseline.json
+    python benchmark.py --baseline baseline.json --tolerance 0.25 --target-ms 500
+    python benchmark.py --cases crop_health --sizes 256 --matlab-history run_history.sqlite3
+"""
+
+import argparse
+import csv
+import functools
+import io
+import itertools
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime
+
+import numpy as np
+import scipy.io
+
+import app
+import crop_health
+import pest_risk
+import raster_store
+import results_model
+import sensor_cleaning
+import sensor_store
+import soil_condition
+from artifact_store import ArtifactStore
+from result_cache import ResultCache
+from run_history import RunHistory
+
+try:
+    import resource
+except ImportError:
+    resource = None  # Windows: no ru_maxrss
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED = 1234
+DEFAULT_SIZES = (128, 256, 512)
+TARGET_MS = 500  # the sub-500ms latency target
+MIN_REGRESSION_MS = 1.0  # differences below this are treated as noise
+CHAT_MESSAGES = ('What about crop health?', 'How is the soil moisture?', 'Any pest problems?',
+                 'Give me recommendations', 'What is my profit?', 'hello')
+STREAM_CHUNK_ROWS = 50000
+IDW_STATIONS = 10000  # point sensors interpolated by the soil_idw case
+FIELDS = ('case', 'size', 'repeats', 'p50_ms', 'p95_ms', 'p99_ms', 'mean_ms', 'min_ms', 'max_ms', 'peak_mem_mb')
+
+
+@contextmanager
+def _patched(module, **attrs):
+    saved = {name: getattr(module, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(module, name, value)
+
+
+@contextmanager
+def _env(**values):
+    saved = {name: os.environ.get(name) for name in values}
+    os.environ.update(values)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+
+
+@contextmanager
+def _cwd(path):
+    saved = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(saved)
+
+
+# ------------------------------
+# Cases: context managers yielding (run, reset); reset runs untimed before each run
+# ------------------------------
+@contextmanager
+def demo_maps_case(size, workdir):
+    results_dir = os.path.join(workdir, 'demo')
+    yield (lambda: app.generate_demo_results(results_dir, size=size)), None
+
+
+def write_combined_results(path, size, seed=SEED):
+    """combined_results with the sample crop_health struct and a size x size health map."""
+    crop_health = scipy.io.loadmat(os.path.join(BASE_DIR, 'crop_health_20250925_225918.mat'))['crop_health'][0, 0]
+    health_map = np.random.default_rng(seed).random((size, size))
+    scipy.io.savemat(path, {'combined_results': {'crop_health': crop_health, 'health_map': health_map}})
+
+
+@contextmanager
+def results_parsing_case(size, workdir, cold):
+    os.makedirs(os.path.join(workdir, 'results'), exist_ok=True)
+    write_combined_results(os.path.join(workdir, 'results', 'combined_results_bench.mat'), size)
+    store_dir = os.path.join(workdir, 'store')
+    with _patched(app, RASTERS=raster_store.RasterStore(store_dir), RESULTS_CACHE=ResultCache(),
+                  ARTIFACTS=ArtifactStore(os.path.join(workdir, 'artifacts'))), _cwd(workdir):
+        def reset():
+            # Cold: nothing parsed or converted yet, as after a fresh MATLAB run
+            app.RESULTS_CACHE.clear()
+            shutil.rmtree(store_dir, ignore_errors=True)
+        yield app.process_matlab_results, (reset if cold else None)
+
+
+def write_cube(path, size, bands=8, seed=SEED):
+    """Fixed-seed 16-bit multispectral cube."""
+    cube = np.random.default_rng(seed).integers(0, 65535, size=(size, size, bands), dtype=np.uint16)
+    scipy.io.savemat(path, {'multispectral_data': cube})
+
+
+@contextmanager
+def numpy_backend_case(size, workdir):
+    cube_path = os.path.join(workdir, 'multispectral_data.mat')
+    write_cube(cube_path, size)
+    results_dir = os.path.join(workdir, 'results')
+    os.makedirs(results_dir, exist_ok=True)
+    with _patched(app, RASTERS=raster_store.RasterStore(os.path.join(workdir, 'store')), RESULTS_DIR=results_dir,
+                  ARTIFACTS=ArtifactStore(os.path.join(workdir, 'artifacts'))), _env(SPECTRAL_DATA=cube_path):
+        yield (lambda: app.run_numpy_analysis(lambda line: None)), None
+
+
+@contextmanager
+def chat_case(size, workdir, by_id):
+    messages = itertools.cycle(CHAT_MESSAGES)
+    if by_id:
+        result = results_model.demo_result()
+        yield (lambda: app.get_result_response(next(messages), result)), None
+    else:
+        context = app.generate_demo_results(os.path.join(workdir, 'demo'), size=8)
+        yield (lambda: app.get_ai_response(next(messages), context)), None
+
+
+@contextmanager
+def crop_health_case(size, workdir):
+    cube = np.random.default_rng(SEED).random((size, size, 8), dtype=np.float32)
+    indices = app.spectral_indices.compute_indices(cube, names=app.HEALTH_INDICES)
+    yield (lambda: crop_health.analyze_health(indices)), None
+
+
+@contextmanager
+def pest_risk_case(size, workdir):
+    cube = np.random.default_rng(SEED).random((size, size, 8), dtype=np.float32)
+    engine = pest_risk.PestRiskEngine()
+    indices = app.spectral_indices.compute_indices(cube, names=engine.index_names)
+    yield (lambda: engine.evaluate(indices)), None
+
+
+@contextmanager
+def soil_idw_case(size, workdir):
+    rng = np.random.default_rng(SEED)
+    points = rng.uniform(0, size, (IDW_STATIONS, 2))
+    values = {name: rng.random(IDW_STATIONS) for name in soil_condition.SOIL_SENSORS}
+    yield (lambda: soil_condition.interpolate(points, values, (size, size))), None
+
+
+def sensor_table(rows, seed=SEED):
+    """dataset.csv-like readings with 1% missing values and 0.1% spikes."""
+    rng = np.random.default_rng(seed)
+    table = {sensor_store.TIME: 1700000000000 + np.arange(rows, dtype=np.int64) * 60000}
+    for name, kind in sensor_store.COLUMNS[1:]:
+        if kind == 'float':
+            values = 20 + np.cumsum(rng.normal(0, 0.1, rows))
+            values[rng.random(rows) < 0.01] = np.nan
+            spikes = rng.random(rows) < 0.001
+            values[spikes] += rng.normal(0, 50, spikes.sum())
+            table[name] = values
+    return table
+
+
+@contextmanager
+def sensor_cleaning_case(size, workdir, streaming):
+    # size x size rows, so --sizes 1024 cleans about a million rows
+    table = sensor_table(size * size)
+    if not streaming:
+        yield (lambda: sensor_cleaning.process(table)), None
+        return
+
+    def run():
+        cleaner = sensor_cleaning.SlidingCleaner()
+        for start in range(0, size * size, STREAM_CHUNK_ROWS):
+            cleaner.update({name: values[start:start + STREAM_CHUNK_ROWS] for name, values in table.items()})
+        cleaner.flush()
+    yield run, None
+
+
+# name -> (case factory, whether it is run once per raster size)
+CASES = {
+    'demo_maps': (demo_maps_case, True),
+    'results_parsing_cold': (functools.partial(results_parsing_case, cold=True), True),
+    'results_parsing_cached': (functools.partial(results_parsing_case, cold=False), True),
+    'numpy_backend': (numpy_backend_case, True),
+    'chat_result_id': (functools.partial(chat_case, by_id=True), False),
+    'chat_context': (functools.partial(chat_case, by_id=False), False),
+    'crop_health': (crop_health_case, True),
+    'pest_risk': (pest_risk_case, True),
+    'soil_idw': (soil_idw_case, True),
+    'sensor_cleaning': (functools.partial(sensor_cleaning_case, streaming=False), True),
+    'sensor_cleaning_stream': (functools.partial(sensor_cleaning_case, streaming=True), True),
+}
+
+
+# ------------------------------
+# Measurement
+# ------------------------------
+def summarize(times):
+    """Latency statistics in milliseconds."""
+    ms = np.asarray(times) * 1000
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {'p50_ms': float(p50), 'p95_ms': float(p95), 'p99_ms': float(p99), 'mean_ms': float(ms.mean()),
+            'min_ms': float(ms.min()), 'max_ms': float(ms.max())}
+
+
+def measure(name, size=None, repeats=20, warmup=2):
+    """Time one case; returns a result row (see FIELDS)."""
+    factory, sized = CASES[name]
+    workdir = tempfile.mkdtemp(prefix='bench-')
+    try:
+        # The measured code paths print debug lines; keep them out of the report
+        with redirect_stdout(io.StringIO()), factory(size if sized else None, workdir) as (run, reset):
+            for _ in range(warmup):
+                if reset:
+                    reset()
+                run()
+            times = []
+            for _ in range(repeats):
+                if reset:
+                    reset()
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+            if reset:
+                reset()
+            tracemalloc.start()
+            try:
+                run()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return dict(case=name, size=size if sized else None, repeats=repeats, **summarize(times),
+                peak_mem_mb=peak / 2 ** 20)
+
+
+def max_rss_mb():
+    """Process memory high-water mark, or None where unavailable."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / 2 ** 20 if sys.platform == 'darwin' else rss / 1024  # bytes on macOS, KiB elsewhere
+
+
+def run_benchmarks(cases=None, sizes=DEFAULT_SIZES, repeats=20, warmup=2, log=None):
+    """Run cases (all by default) at each size; returns the report dict."""
+    results = []
+    for name in cases or CASES:
+        for size in (sizes if CASES[name][1] else (None,)):
+            row = measure(name, size, repeats, warmup)
+            results.append(row)
+            if log:
+                log(format_row(row))
+    return {
+        'meta': {
+            'timestamp': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seed': SEED,
+        },
+        'results': results,
+        'max_rss_mb': max_rss_mb(),
+    }
+
+
+def format_row(row):
+    size = f"{row['size']}px" if row['size'] else '-'
+    return (f"{row['case']:<24} {size:>7}  p50 {row['p50_ms']:9.3f} ms  p95 {row['p95_ms']:9.3f} ms  "
+            f"p99 {row['p99_ms']:9.3f} ms  peak {row['peak_mem_mb']:8.1f} MB")
+
+
+# ------------------------------
+# Baseline comparison
+# ------------------------------
+# Benchmark case -> run history metric of the MATLAB stage doing the same work
+MATLAB_STAGES = {'crop_health': 'stage_crop_health_seconds'}
+
+
+def matlab_reference(history, field=None):
+    """Mean recorded duration (ms) of the MATLAB stage behind each case, from the run history."""
+    reference = {}
+    for case, metric in MATLAB_STAGES.items():
+        points = history.series(metric, field or app.FIELD_ID, points=1)
+        if points:
+            reference[case] = points[0]['mean'] * 1000
+    return reference
+
+
+def compare_matlab(report, reference):
+    """One line per measured case with a MATLAB reference time."""
+    lines = []
+    for row in report['results']:
+        if row['case'] in reference:
+            label = f"{row['case']}@{row['size']}" if row['size'] else row['case']
+            matlab_ms = reference[row['case']]
+            lines.append(f"{label}: Python p50 {row['p50_ms']:.2f} ms vs MATLAB {matlab_ms:.2f} ms "
+                         f"({matlab_ms / row['p50_ms']:.1f}x)")
+    return lines
+
+
+def compare(report, baseline, tolerance=0.25, target_ms=None):
+    """
+    Problems in report: p95 slower than the baseline's by more than tolerance
+    (and MIN_REGRESSION_MS), or above target_ms. Returns a list of messages.
+    """
+    previous = {(row['case'], row['size']): row for row in baseline.get('results', [])}
+    problems = []
+    for row in report['results']:
+        old = previous.get((row['case'], row['size']))
+        label = f"{row['case']}@{row['size']}" if row['size'] else row['case']
+        if old is not None:
+            limit = max(old['p95_ms'] * (1 + tolerance), old['p95_ms'] + MIN_REGRESSION_MS)
+            if row['p95_ms'] > limit:
+                problems.append(f"{label}: p95 {row['p95_ms']:.2f} ms vs baseline {old['p95_ms']:.2f} ms "
+                                f"(+{(row['p95_ms'] / old['p95_ms'] - 1) * 100:.0f}%)")
+        if target_ms is not None and row['p95_ms'] > target_ms:
+            problems.append(f"{label}: p95 {row['p95_ms']:.2f} ms exceeds the {target_ms:g} ms target")
+    return problems
+
+
+def write_csv(report, path):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in report['results']:
+            writer.writerow(row)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), help='cases to run (default: all)')
+    parser.add_argument('--sizes', nargs='+', type=int, default=list(DEFAULT_SIZES), help='raster side lengths')
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--json', help='write the report as JSON (usable as a baseline)')
+    parser.add_argument('--csv', help='write the result rows as CSV')
+    parser.add_argument('--baseline', help='JSON report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed p95 slowdown vs baseline')
+    parser.add_argument('--target-ms', type=float, help=f'fail cases whose p95 exceeds this (e.g. {TARGET_MS})')
+    parser.add_argument('--matlab-history', help='run history database with MATLAB stage timings to compare with')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.cases, args.sizes, args.repeats, args.warmup, log=print)
+    if report['max_rss_mb'] is not None:
+        print(f"max RSS: {report['max_rss_mb']:.1f} MB")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    if args.csv:
+        write_csv(report, args.csv)
+
+    if args.matlab_history:
+        for line in compare_matlab(report, matlab_reference(RunHistory(args.matlab_history))):
+            print(f'MATLAB {line}')
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    problems = compare(report, baseline, args.tolerance, args.target_ms)
+    for problem in problems:
+        print(f'REGRESSION {problem}')
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
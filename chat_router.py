@@ -0,0 +1,75 @@
+"""
+Intent routing and section lookup for the chatbot.
+
+A chat message is matched against every intent keyword with one compiled
+alternation regex; the highest-priority intent found wins, as in the
+original chain of ``in`` checks. The analysis text is scanned once per
+distinct text into a SectionIndex (an offset table keyed by section), so
+answering a message is a dictionary lookup instead of a regex scan of the
+whole context.
+"""
+
+import re
+
+# Intents in priority order with their keywords (matched as substrings of the lowercased message)
+INTENTS = (
+    ('profit', ('profit',)),
+    ('crop_health', ('crop health',)),
+    ('soil', ('soil', 'moisture')),
+    ('pest', ('pest',)),
+    ('recommendations', ('recommendations',)),
+)
+
+_KEYWORD_INTENT = {keyword: (priority, intent)
+                   for priority, (intent, keywords) in enumerate(INTENTS) for keyword in keywords}
+# Longest keywords first so a longer keyword is never shadowed by a prefix of it
+_INTENT_RE = re.compile('|'.join(re.escape(k) for k in sorted(_KEYWORD_INTENT, key=len, reverse=True)))
+
+# Section bodies as delimited in the analysis text: header, underline, body up to the next header
+SECTION_PATTERNS = {
+    'crop_health': re.compile(r"CROP HEALTH ANALYSIS\s*====================([\s\S]*?)SOIL CONDITION ANALYSIS"),
+    'soil': re.compile(r"SOIL CONDITION ANALYSIS\s*=======================([\s\S]*?)PEST RISK ANALYSIS"),
+    'pest': re.compile(r"PEST RISK ANALYSIS\s*==================([\s\S]*?)RECOMMENDATIONS"),
+    'recommendations': re.compile(r"RECOMMENDATIONS\s*===============([\s\S]*)"),
+}
+STATUS_PATTERNS = {
+    'health_status': re.compile(r"Overall Crop Health Status:\s*(\w+)", re.IGNORECASE),
+    'pest_status': re.compile(r"Overall Pest Risk Level:\s*(\w+)", re.IGNORECASE),
+}
+
+
+def match_intent(message):
+    """Intent of a chat message, or None. One regex scan of the message."""
+    best = None
+    for match in _INTENT_RE.finditer(message.lower()):
+        candidate = _KEYWORD_INTENT[match.group(0)]
+        if best is None or candidate < best:
+            best = candidate
+            if best[0] == 0:
+                break
+    return best[1] if best else None
+
+
+class SectionIndex:
+    """Offsets of each section body and the status words in one analysis text."""
+
+    def __init__(self, text):
+        self.text = text
+        self.offsets = {}  # section -> (start, end) of the stripped body
+        for name, pattern in SECTION_PATTERNS.items():
+            match = pattern.search(text)
+            if match:
+                start, end = match.span(1)
+                body = text[start:end]
+                start += len(body) - len(body.lstrip())
+                end -= len(body) - len(body.rstrip())
+                self.offsets[name] = (start, max(start, end))
+        self.statuses = {}
+        for name, pattern in STATUS_PATTERNS.items():
+            match = pattern.search(text)
+            self.statuses[name] = match.group(1).lower() if match else 'unknown'
+
+    def section(self, name):
+        """Body text of a section, or None if the text has no such section."""
+        span = self.offsets.get(name)
+        return self.text[span[0]:span[1]] if span else None
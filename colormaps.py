@@ -0,0 +1,144 @@
+"""
+Lookup-table colormaps for result rasters.
+
+Each palette is defined once as a vectorized function of a scalar value and
+sampled into a LUT. 8-bit images are colorized through Pillow palette mode,
+float rasters (e.g. NDVI in [-1, 1]) through a NumPy gather into a
+high-resolution LUT, so neither path touches individual pixels in Python.
+"""
+
+from functools import lru_cache
+
+import numpy as np
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None  # Pillow optional; only needed for apply_image
+
+# LUT resolution used for float rasters when none is requested
+FLOAT_LUT_SIZE = 4096
+
+
+# ------------------------------
+# Palette definitions (value -> float RGB channels, 0..255 unless noted)
+# ------------------------------
+def jet_channels(v):
+    """Piecewise jet colormap on 0..1, returning channels in 0..1."""
+    v = np.asarray(v, dtype=np.float64)
+    r = np.select([v < 0.5, v < 0.75], [0.0, 4 * (v - 0.5)], 1.0)
+    g = np.select([v < 0.25, v < 0.75], [4 * v, 1.0], 1.0 - 4 * (v - 0.75))
+    b = np.select([v < 0.25, v < 0.5], [1.0, 1.0 - 4 * (v - 0.25)], 0.0)
+    return np.clip(r, 0.0, 1.0), np.clip(g, 0.0, 1.0), np.clip(b, 0.0, 1.0)
+
+
+def health_channels(v):
+    """Vegetation health: green-yellow above 0.6, red-orange below."""
+    v = np.asarray(v, dtype=np.float64)
+    healthy = v > 0.6
+    r = np.where(healthy, 50 + v * 100, 150 + v * 105)
+    g = np.where(healthy, 150 + v * 105, 100 + v * 100)
+    return r, g, np.full_like(v, 50.0)
+
+
+def vigor_channels(v):
+    """Enhanced vegetation (EVI/SAVI): dark to bright green."""
+    v = np.asarray(v, dtype=np.float64)
+    return 34 + v * 150, 139 + v * 116, 34 + v * 50
+
+
+def soil_channels(v):
+    """Soil moisture: brown (dry) to blue (wet)."""
+    v = np.asarray(v, dtype=np.float64)
+    return 139 - v * 100, 69 + v * 100, 19 + v * 200
+
+
+def pest_channels(v):
+    """Pest risk: blue-green below 0.4, yellow below 0.7, red above."""
+    v = np.asarray(v, dtype=np.float64)
+    low = v < 0.4
+    medium = ~low & (v < 0.7)
+    r = np.select([low, medium], [50.0, 100 + v * 155], 150 + v * 105)
+    g = np.select([low, medium], [100 + v * 200, 150 + v * 105], 50 + v * 50)
+    b = np.select([low, medium], [200.0, 100.0], 50.0)
+    return r, g, b
+
+
+def to_rgb8(r, g, b):
+    """Truncate float channels like int(), clamp to 0..255 and stack to (..., 3) uint8."""
+    shape = np.broadcast(r, g, b).shape
+    planes = [np.broadcast_to(np.trunc(c), shape) for c in (r, g, b)]
+    return np.clip(np.stack(planes, axis=-1), 0, 255).astype(np.uint8)
+
+
+# name -> (channel function, channel scale, default value range)
+PALETTES = {
+    'jet': (jet_channels, 255.0, (0.0, 1.0)),
+    'health': (health_channels, 1.0, (0.0, 1.0)),
+    'vigor': (vigor_channels, 1.0, (0.0, 1.0)),
+    'soil': (soil_channels, 1.0, (0.0, 1.0)),
+    'pest': (pest_channels, 1.0, (0.0, 1.0)),
+}
+
+
+class Colormap:
+    """A palette sampled into an (N, 3) uint8 lookup table over [vmin, vmax]."""
+
+    def __init__(self, name, size=256, vmin=None, vmax=None):
+        if name not in PALETTES:
+            raise ValueError(f"Unknown colormap '{name}'. Available: {', '.join(sorted(PALETTES))}")
+        channels, scale, (default_min, default_max) = PALETTES[name]
+        self.name = name
+        self.size = int(size)
+        self.vmin = default_min if vmin is None else float(vmin)
+        self.vmax = default_max if vmax is None else float(vmax)
+        # lo + span * (i / (N - 1)) so 8-bit entries land exactly on g / 255
+        samples = self.vmin + (self.vmax - self.vmin) * (np.arange(self.size) / (self.size - 1))
+        r, g, b = channels(samples)
+        self.lut = to_rgb8(r * scale, g * scale, b * scale)
+        self.lut.setflags(write=False)
+        # Same table packed as little-endian RGBX words: one 4-byte gather per pixel
+        packed = np.zeros((self.size, 4), dtype=np.uint8)
+        packed[:, :3] = self.lut
+        self._packed = packed.view('<u4').ravel()
+
+    def apply(self, values, vmin=None, vmax=None, nan_color=(0, 0, 0)):
+        """Colorize a float raster with one gather; returns an (..., 3) uint8 view."""
+        lo = self.vmin if vmin is None else vmin
+        hi = self.vmax if vmax is None else vmax
+        values = np.asarray(values)
+        if values.dtype != np.float32:
+            values = values.astype(np.float64)
+        scale = (self.size - 1) / (hi - lo) if hi != lo else 0.0
+        idx = np.asarray(values - values.dtype.type(lo))
+        idx *= scale
+        nan_mask = np.isnan(idx)
+        has_nan = nan_mask.any()
+        if has_nan:
+            idx[nan_mask] = 0
+        np.rint(idx, out=idx)
+        np.clip(idx, 0, self.size - 1, out=idx)
+        words = np.atleast_1d(self._packed[idx.astype(np.intp)])
+        rgb = words.view(np.uint8).reshape(idx.shape + (4,))[..., :3]
+        if has_nan:
+            rgb[nan_mask] = nan_color
+        return rgb
+
+    def apply_image(self, gray_img):
+        """Colorize an 8-bit grayscale PIL image through palette mode (needs a 256-entry LUT)."""
+        if self.size != 256:
+            raise ValueError('apply_image requires a 256-entry colormap')
+        indexed = gray_img.convert('L')
+        indexed.putpalette(self.lut.tobytes())
+        return indexed.convert('RGB')
+
+
+@lru_cache(maxsize=None)
+def get_colormap(name, size=256, vmin=None, vmax=None):
+    """Return a cached Colormap; LUTs are built once per (name, size, range)."""
+    return Colormap(name, size, vmin, vmax)
+
+
+def colorize(values, name='jet', vmin=None, vmax=None, size=FLOAT_LUT_SIZE):
+    """Colorize a float raster (e.g. NDVI with vmin=-1, vmax=1) without 8-bit quantization."""
+    return get_colormap(name, size).apply(values, vmin, vmax)
@@ -0,0 +1,24 @@
+"""
+Shared pytest fixtures.
+"""
+
+import pytest
+
+
+@pytest.fixture
+def numpy_app(tmp_path, monkeypatch):
+    """
+    The app module on the numpy backend, with its sensor, artifact and raster
+    stores and its results directory under tmp_path (the sensor store is empty,
+    so the soil analysis reads sensor_data.mat).
+    """
+    import app as app_module
+    import raster_store
+    from artifact_store import ArtifactStore
+    from sensor_store import SensorStore
+    monkeypatch.setattr(app_module, 'ANALYSIS_BACKEND', 'numpy')
+    monkeypatch.setattr(app_module, 'SENSORS', SensorStore(str(tmp_path / 'sensors')))
+    monkeypatch.setattr(app_module, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'ARTIFACTS', ArtifactStore(str(tmp_path / 'artifacts')))
+    monkeypatch.setattr(app_module, 'RASTERS', raster_store.RasterStore(str(tmp_path / 'rasters')))
+    return app_module
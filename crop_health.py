@@ -0,0 +1,194 @@
+"""
+NumPy port of CropHealthAnalyzer.analyzeHealth.
+
+Takes vegetation index maps (spectral_indices.compute_indices) and returns
+the crop_health struct main.m saves, as nested dicts in the layout
+raster_store produces for .mat files, so generate_analysis_output_from_matlab
+and results_model.from_matlab read it unchanged. Each index map is reduced
+into its statistics, the pixel counts of its health classes and a
+fixed-range histogram (a bincount).
+
+calculateOverallHealth multiplies a row of weights by a column of scores,
+so MATLAB stores ``overall_health.score`` as the 5-vector weights * sum(scores)
+and picks the status with all-elements comparisons. That is reproduced
+here so Python and MATLAB runs report the same numbers; the intended scalar
+weighted sum is added as ``weighted_score``.
+"""
+
+import numpy as np
+
+# (healthy, stressed) thresholds per index, as in the CropHealthAnalyzer constructor / analyzeSAVI / analyzeEVI
+THRESHOLDS = {
+    'ndvi': (0.6, 0.3),
+    'gndvi': (0.4, 0.2),
+    'ndre': (0.3, 0.15),
+    'savi': (0.4, 0.2),
+    'evi': (0.3, 0.15),
+}
+WEIGHTS = np.array([0.3, 0.25, 0.2, 0.15, 0.1])  # NDVI, GNDVI, NDRE, SAVI, EVI
+STATUS_SCORES = {'Healthy': 1.0, 'Stressed': 0.6, 'Unhealthy': 0.2}
+OVERALL_LEVELS = ((0.8, 'Excellent'), (0.6, 'Good'), (0.4, 'Fair'), (0.2, 'Poor'))
+# identifyStressPatterns: (index, threshold) below which a pixel is stressed
+STRESS_THRESHOLDS = {'water': ('ndwi', -0.1), 'nutrient': ('ndre', 0.1), 'chlorophyll': ('ci', 0.1)}
+HISTOGRAM_RANGE = (-1.0, 1.0)  # values outside fall into the end bins
+HISTOGRAM_BINS = 20
+OUTLIER_SIGMAS = 3
+SPATIAL_WINDOW = 5
+SPATIAL_SIGMAS = 2
+HEALTH_LABELS = ['Unhealthy', 'Stressed', 'Healthy']
+HEALTH_COLORS = [[1, 0, 0], [1, 1, 0], [0, 1, 0]]  # red, yellow, green
+
+
+def health_classes(values, healthy, stressed):
+    """0 unhealthy (< stressed), 1 stressed, 2 healthy (>= healthy) per pixel, as uint8."""
+    classes = (values >= stressed).view(np.uint8)
+    classes += values >= healthy
+    return classes
+
+
+def histogram(values, bins=HISTOGRAM_BINS, value_range=HISTOGRAM_RANGE):
+    """Counts of values in equal bins over value_range, with out-of-range values in the end bins."""
+    lo, hi = value_range
+    slots = ((values - lo) * (bins / (hi - lo))).astype(np.int64)
+    np.clip(slots, 0, bins - 1, out=slots)
+    return {'edges': np.linspace(lo, hi, bins + 1).tolist(),
+            'counts': np.bincount(slots, minlength=bins).tolist()}
+
+
+def analyze_index(values, healthy, stressed):
+    """Statistics, class percentages and health status of one index map (analyzeNDVI and friends)."""
+    flat = np.asarray(values).reshape(-1)
+    n = flat.size
+    mean = float(flat.mean(dtype=np.float64))
+    healthy_count = np.count_nonzero(flat >= healthy)
+    stressed_count = np.count_nonzero(flat >= stressed) - healthy_count
+    if mean >= healthy:
+        status = 'Healthy'
+    elif mean >= stressed:
+        status = 'Stressed'
+    else:
+        status = 'Unhealthy'
+    return {
+        'mean': mean,
+        'std': float(flat.std(dtype=np.float64, ddof=1)) if n > 1 else 0.0,  # MATLAB std normalizes by n - 1
+        'min': float(flat.min()),
+        'max': float(flat.max()),
+        'median': float(np.median(flat)),
+        'healthy_percentage': healthy_count / n * 100,
+        'stressed_percentage': stressed_count / n * 100,
+        'unhealthy_percentage': (n - healthy_count - stressed_count) / n * 100,
+        'health_status': status,
+        'health_score': STATUS_SCORES[status],
+        'histogram': histogram(flat),
+    }
+
+
+def overall_health(analyses):
+    """calculateOverallHealth, including the vector-valued score of the MATLAB code (see module docstring)."""
+    scores = np.array([analyses[name]['health_score'] for name in THRESHOLDS])
+    score = WEIGHTS * scores.sum()
+    status = next((label for threshold, label in OVERALL_LEVELS if (score >= threshold).all()), 'Critical')
+    confidence = 1 - scores.std(ddof=1) / scores.mean()
+    return {'score': score.tolist(), 'status': status, 'confidence': float(min(1, max(0, confidence))),
+            'weighted_score': float(WEIGHTS @ scores)}
+
+
+def stress_patterns(indices):
+    """Percentages of pixels under water, nutrient and chlorophyll stress and under any of them."""
+    patterns = {}
+    overall = None
+    for kind, (name, threshold) in STRESS_THRESHOLDS.items():
+        if name not in indices:
+            continue
+        mask = np.asarray(indices[name]) < threshold
+        patterns[f'{kind}_stress_percentage'] = mask.mean() * 100
+        overall = mask if overall is None else overall | mask
+    if overall is not None:
+        patterns['overall_stress_percentage'] = overall.mean() * 100
+    return patterns
+
+
+def health_statistics(crop_health):
+    ndvi = crop_health['ndvi_analysis']
+    height, width = crop_health['image_size']
+    distribution = [ndvi['healthy_percentage'], ndvi['stressed_percentage'], ndvi['unhealthy_percentage']]
+    return {
+        'total_area_pixels': height * width,
+        'healthy_area_percentage': distribution[0],
+        'stressed_area_percentage': distribution[1],
+        'unhealthy_area_percentage': distribution[2],
+        'ndvi_mean': ndvi['mean'],
+        'gndvi_mean': crop_health['gndvi_analysis']['mean'],
+        'ndre_mean': crop_health['ndre_analysis']['mean'],
+        'health_distribution': distribution,
+    }
+
+
+def health_map(ndvi):
+    """generateHealthMap: 1 unhealthy, 2 stressed, 3 healthy per pixel, plus its RGB rendering."""
+    data = health_classes(np.asarray(ndvi), *THRESHOLDS['ndvi']) + np.uint8(1)
+    return {'data': data, 'rgb': health_rgb(data), 'labels': HEALTH_LABELS, 'colors': HEALTH_COLORS}
+
+
+def health_rgb(data):
+    """createHealthRGB as uint8 0/255: red unhealthy, yellow stressed, green healthy."""
+    return (np.array([[0, 0, 0]] + HEALTH_COLORS, dtype=np.uint8) * 255)[data]
+
+
+def _box_mean(values, size):
+    # conv2(values, ones(size)/size^2, 'same'): zero padding, so border windows average in zeros
+    pad = size // 2
+    padded = np.pad(values, pad)
+    sums = padded.cumsum(axis=0).cumsum(axis=1)
+    sums = np.pad(sums, ((1, 0), (1, 0)))
+    h, w = values.shape
+    return (sums[size:size + h, size:size + w] - sums[:h, size:size + w]
+            - sums[size:size + h, :w] + sums[:h, :w]) / (size * size)
+
+
+def spatial_anomalies(values, sigmas=SPATIAL_SIGMAS):
+    """Pixels more than ``sigmas`` local stds from their 5x5 neighbourhood mean, as MATLAB reports them."""
+    values = np.asarray(values, dtype=np.float64)
+    local_mean = _box_mean(values, SPATIAL_WINDOW)
+    # MATLAB takes the real part of sqrt of a (rounding-)negative variance, i.e. 0
+    local_std = np.sqrt(np.maximum(_box_mean(values ** 2, SPATIAL_WINDOW) - local_mean ** 2, 0))
+    mask = np.abs(values - local_mean) > sigmas * local_std
+    return {
+        'anomaly_percentage': mask.mean() * 100,
+        # find(mask): 1-based, column-major linear indices
+        'anomaly_locations': (np.flatnonzero(mask.T) + 1).tolist(),
+    }
+
+
+def anomalies(ndvi):
+    """detectAnomalies: global 3-sigma outliers and pixels far from their 5x5 neighbourhood."""
+    ndvi = np.asarray(ndvi, dtype=np.float64)
+    flat = ndvi.reshape(-1)
+    std = flat.std(ddof=1) if flat.size > 1 else 0.0
+    outliers = np.abs(flat - flat.mean()) > OUTLIER_SIGMAS * std
+    return {
+        'ndvi_outliers_percentage': outliers.mean() * 100,
+        'spatial_anomalies': spatial_anomalies(ndvi),
+        'temporal_anomalies': {'detected': False, 'description': 'Temporal analysis requires historical data'},
+    }
+
+
+def analyze_health(indices, include_maps=True):
+    """
+    crop_health struct for a dict of index maps (ndvi, gndvi, ndre, savi, evi;
+    ndwi and ci for the stress patterns). ``include_maps`` adds the health map
+    and the index maps as main.m saves them.
+    """
+    ndvi = indices['ndvi']
+    crop_health = {'image_size': list(np.shape(ndvi))}
+    for name, (healthy, stressed) in THRESHOLDS.items():
+        crop_health[f'{name}_analysis'] = analyze_index(indices[name], healthy, stressed)
+    crop_health['overall_health'] = overall_health({name: crop_health[f'{name}_analysis'] for name in THRESHOLDS})
+    crop_health['stress_patterns'] = stress_patterns(indices)
+    crop_health['health_statistics'] = health_statistics(crop_health)
+    crop_health['anomalies'] = anomalies(ndvi)
+    if include_maps:
+        crop_health['health_map'] = health_map(ndvi)
+        for name in THRESHOLDS:
+            crop_health[f'{name}_map'] = indices[name]
+    return crop_health
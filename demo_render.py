@@ -0,0 +1,215 @@
+"""
+Array-backed renderer for the DEMO_MODE result maps.
+
+Each map is built as a handful of NumPy operations over the whole raster and
+handed to Pillow with ``Image.fromarray``. The random texture reproduces the
+exact ``random.Random(seed)`` sequence the original per-pixel renderer drew,
+so a given seed and size always produces the same PNG bytes.
+
+Maps are independent, so render_demo_maps renders and PNG-encodes them as
+separate tasks on a process pool; every map has its own fixed seed, so the
+output does not depend on scheduling.
+"""
+
+import math
+import multiprocessing
+import os
+import random
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from colormaps import health_channels, pest_channels, soil_channels, to_rgb8, vigor_channels
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None  # Pillow optional; required to write PNGs
+
+DEFAULT_MAP_SIZE = 256
+
+# (map name, renderer kind, seed) in the order the demo writes them
+DEMO_MAPS = [
+    ('ndvi_map', 'colormap', 1),
+    ('gndvi_map', 'colormap', 2),
+    ('ndre_map', 'colormap', 3),
+    ('savi_map', 'colormap', 4),
+    ('evi_map', 'colormap', 5),
+    ('soil_condition_map', 'colormap', 6),
+    ('crop_health_map', 'discrete', 42),
+    ('pest_risk_map', 'discrete', 42),
+    ('pest_risk_score_map', 'colormap', 7),
+]
+
+VEGETATION_MAPS = ('ndvi_map', 'gndvi_map', 'ndre_map')
+ENHANCED_MAPS = ('evi_map', 'savi_map')
+
+# Traffic-light palettes for the discrete maps: (low, medium, high)
+DISCRETE_PALETTES = {
+    'crop_health_map': ((50, 200, 50), (255, 255, 50), (220, 50, 50)),
+    'pest_risk_map': ((100, 200, 100), (255, 200, 50), (200, 50, 50)),
+}
+
+
+# ------------------------------
+# random.Random compatible streams
+# ------------------------------
+def _mt_words(seed, count):
+    """Return the next ``count`` raw 32-bit MT19937 outputs of random.Random(seed)."""
+    _, internal, _ = random.Random(seed).getstate()
+    bitgen = np.random.MT19937()
+    bitgen.state = {
+        'bit_generator': 'MT19937',
+        'state': {'key': np.array(internal[:-1], dtype=np.uint32), 'pos': internal[-1]},
+    }
+    return bitgen.random_raw(count)
+
+
+def _words_to_random(hi, lo):
+    """Combine word pairs into doubles exactly like random.Random.random()."""
+    return ((hi >> 5) * 67108864.0 + (lo >> 6)) * (1.0 / 9007199254740992.0)
+
+
+def seeded_random(seed, count):
+    """Vector equivalent of ``[random.Random(seed).random() for _ in range(count)]``."""
+    words = _mt_words(seed, 2 * count)
+    return _words_to_random(words[0::2], words[1::2])
+
+
+def seeded_random_randint(seed, count, low, high):
+    """
+    Vector equivalent of ``count`` interleaved ``(rnd.random(), rnd.randint(low, high))``
+    draws from ``random.Random(seed)``.
+
+    randint() uses rejection sampling, so the word offset of every pair depends
+    on the draws before it. The chain of offsets is resolved with pointer
+    doubling instead of a per-pixel loop.
+    """
+    width = high - low + 1
+    bits = width.bit_length()
+    pool = 4 * count + 64
+    while True:
+        words = _mt_words(seed, pool)
+        accept = (words >> (32 - bits)) < width
+        # next_accept[j]: first accepted word at or after j (pool if none)
+        idx = np.where(accept, np.arange(pool), pool)
+        next_accept = np.minimum.accumulate(idx[::-1])[::-1]
+
+        # step[p]: offset of the pair following a pair that starts at p
+        sentinel = pool
+        step = np.full(pool + 1, sentinel, dtype=np.int64)
+        step[:pool - 2] = next_accept[2:] + 1
+        step[step > pool] = sentinel
+
+        starts = np.zeros(1, dtype=np.int64)
+        jump = step
+        while len(starts) < count:
+            starts = np.concatenate([starts, jump[starts]])
+            jump = jump[jump]
+        starts = starts[:count]
+        if starts[-1] + 2 < pool and next_accept[starts[-1] + 2] < pool:
+            break
+        pool *= 2
+
+    rand = _words_to_random(words[starts], words[starts + 1])
+    ints = low + (words[next_accept[starts + 2]] >> (32 - bits)).astype(np.int64)
+    return rand, ints
+
+
+# ------------------------------
+# Map renderers
+# ------------------------------
+def render_colormap(name, seed=0, width=DEFAULT_MAP_SIZE, height=DEFAULT_MAP_SIZE):
+    """Render a continuous demo map (vegetation, soil or pest score) as an HxWx3 array."""
+    x = np.arange(width)
+    y = np.arange(height)[:, None]
+    # Field blocks of 32 px with a diagonal gradient across the scene
+    field_x = (x // 32) * 32 + 16
+    field_y = (y // 32) * 32 + 16
+    base_val = 0.3 + 0.4 * (field_x + field_y) / (width + height)
+
+    if name in VEGETATION_MAPS:
+        # Crop rows; math.sin keeps the per-row values identical to the scalar renderer
+        rows = np.array([0.1 * abs(math.sin(v * 0.2)) if v % 8 < 4 else 0.0 for v in range(height)])
+        return to_rgb8(*health_channels(base_val + rows[:, None]))
+
+    if name == 'soil_condition_map':
+        noise = seeded_random(seed, width * height).reshape(height, width)
+        return to_rgb8(*soil_channels(base_val + 0.1 * noise))
+
+    if name in ENHANCED_MAPS:
+        return to_rgb8(*vigor_channels(base_val * 0.8 + 0.1))
+
+    # pest_risk_score_map: cool colours for low risk, warm for high risk
+    noise = seeded_random(seed, width * height).reshape(height, width)
+    return to_rgb8(*pest_channels(base_val + 0.2 * noise))
+
+
+def render_discrete(name, seed=42, width=DEFAULT_MAP_SIZE, height=DEFAULT_MAP_SIZE):
+    """Render a three-class patch map (crop health or pest risk) as an HxWx3 array."""
+    patch_size = 40
+    x = np.arange(width)
+    y = np.arange(height)[:, None]
+    patch_sum = (x // patch_size) * patch_size + (y // patch_size) * patch_size
+
+    noise, texture = seeded_random_randint(seed, width * height, -20, 20)
+    patch_val = (patch_sum % 120) / 120.0 + 0.1 * noise.reshape(height, width)
+
+    palette = np.array(DISCRETE_PALETTES.get(name, DISCRETE_PALETTES['pest_risk_map']), dtype=np.int64)
+    classes = (patch_val >= 0.33).astype(np.intp) + (patch_val >= 0.66)
+    rgb = palette[classes] + texture.reshape(height, width, 1)
+    return np.clip(rgb, 0, 255).astype(np.uint8)
+
+
+def render_map(name, kind, seed, width=DEFAULT_MAP_SIZE, height=DEFAULT_MAP_SIZE):
+    """Dispatch to the renderer for one entry of DEMO_MAPS."""
+    if kind == 'discrete':
+        return render_discrete(name, seed, width, height)
+    return render_colormap(name, seed, width, height)
+
+
+def save_rgb(rgb, path):
+    """Encode an HxWx3 uint8 array as PNG."""
+    Image.fromarray(rgb, 'RGB').save(path)
+
+
+def render_and_save(name, kind, seed, size, path):
+    """One pool task: render a map and encode its PNG."""
+    save_rgb(render_map(name, kind, seed, size, size), path)
+    return path
+
+
+_POOL = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def get_pool(workers):
+    """Shared render pool, kept alive between runs so workers are not re-spawned per request."""
+    global _POOL, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is None or _POOL_WORKERS != workers:
+            if _POOL is not None:
+                _POOL.shutdown()
+            # spawn: the web server is multi-threaded, and forking it could copy held locks
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _POOL_WORKERS = workers
+        return _POOL
+
+
+def render_demo_maps(results_dir, size=DEFAULT_MAP_SIZE, workers=None):
+    """
+    Render and save every demo map into results_dir; returns the written paths
+    in DEMO_MAPS order. workers=None uses one process per core (at most one per
+    map); 0 or 1 renders in this process.
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(DEMO_MAPS))
+    tasks = [(name, kind, seed, size, os.path.join(results_dir, f'{name}.png'))
+             for name, kind, seed in DEMO_MAPS]
+    if workers <= 1:
+        return [render_and_save(*task) for task in tasks]
+    # map() yields in submission order regardless of which map finishes first
+    return list(get_pool(workers).map(render_and_save, *zip(*tasks)))
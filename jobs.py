@@ -0,0 +1,239 @@
+"""
+In-process job queue for long-running analyses.
+
+A bounded thread pool runs analysis callables in the background so web
+requests return immediately. Each job keeps its state, stdout lines and
+final payload; callers can poll a snapshot or block on updates to stream
+progress.
+
+Output lines that match a stage marker (e.g. main.m's "Analyzing crop
+health...") start a new stage. Stage start/end records carry wall-clock
+timestamps, the time since the job started and, on end, the stage duration.
+
+Job state lives in the web process, so the server must run as a single
+worker process (use threads for request concurrency).
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+
+class JobQueueFull(Exception):
+    """Raised when too many jobs are already queued or running."""
+
+
+class Job:
+    """State, stdout lines and result of one background analysis."""
+
+    def __init__(self, kind, stage_markers=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.state = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.lines = []
+        self.line_times = []
+        self.stage_markers = stage_markers or {}
+        self.stage_log = []  # start/end records; 'line' is the line index they precede
+        self.result = None
+        self.error = None
+        self._stage = None  # (index, name, monotonic start) of the open stage
+        self._cond = threading.Condition()
+
+    @property
+    def done(self):
+        return self.state in FINISHED_STATES
+
+    def emit(self, line):
+        """Append one stdout/progress line (starting a stage on a marker) and wake any waiting streams."""
+        line = line.rstrip('\r\n')
+        with self._cond:
+            now = time.time()
+            stage = self.stage_markers.get(line.strip())
+            if stage is not None:
+                self._end_stage(now)
+                index = sum(1 for record in self.stage_log if record['event'] == 'start')
+                self._stage = (index, stage, time.monotonic())
+                self._log_stage('start', now)
+            self.lines.append(line)
+            self.line_times.append(now)
+            self._cond.notify_all()
+
+    def _log_stage(self, event, now, duration=None):
+        # Caller holds the condition
+        index, name, _ = self._stage
+        record = {'event': event, 'index': index, 'name': name, 'line': len(self.lines),
+                  'time': now, 'elapsed': now - (self.started_at or self.created_at)}
+        if event == 'end':
+            record['duration'] = duration
+        self.stage_log.append(record)
+
+    def _end_stage(self, now):
+        if self._stage is not None:
+            self._log_stage('end', now, time.monotonic() - self._stage[2])
+            self._stage = None
+
+    @property
+    def stages(self):
+        """Finished and running stages: name, start time and duration (None while running)."""
+        with self._cond:
+            stages = []
+            for record in self.stage_log:
+                if record['event'] == 'start':
+                    stages.append({'name': record['name'], 'started_at': record['time'],
+                                   'elapsed': record['elapsed'], 'duration': None})
+                else:
+                    stages[record['index']]['duration'] = record['duration']
+            return stages
+
+    def _transition(self, state, **fields):
+        with self._cond:
+            if state in FINISHED_STATES:
+                self._end_stage(time.time())
+            self.state = state
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self._cond.notify_all()
+
+    def start(self):
+        self._transition(RUNNING, started_at=time.time())
+
+    def finish(self, result):
+        """Store the payload; a payload carrying an 'error' key marks the job failed."""
+        failed = isinstance(result, dict) and bool(result.get('error'))
+        self._transition(FAILED if failed else SUCCEEDED, result=result,
+                         error=result.get('error') if failed else None, finished_at=time.time())
+
+    def fail(self, error):
+        self._transition(FAILED, result={'error': error}, error=error, finished_at=time.time())
+
+    def wait(self, seen_lines, seen_state, timeout):
+        """Block until new lines arrive, the state changes or timeout elapses."""
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.lines) > seen_lines or self.state != seen_state, timeout)
+
+    def join(self, timeout=None):
+        """Block until the job finishes; returns True if it did within timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self.done, timeout)
+
+    def to_dict(self, since=0):
+        """JSON-ready snapshot; ``lines`` holds only the lines from index ``since``."""
+        stages = self.stages
+        with self._cond:
+            snapshot = {
+                'id': self.id,
+                'kind': self.kind,
+                'state': self.state,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+                'lines': self.lines[since:],
+                'next': len(self.lines),
+                'stages': stages,
+                'error': self.error,
+            }
+            if self.done:
+                snapshot['result'] = self.result
+            return snapshot
+
+    def events(self, since=0, heartbeat=15.0):
+        """
+        Yield ``(event, data)`` pairs until the job finishes: one 'line' per stdout
+        line, 'stage' when a stage starts or ends, 'state' on every transition,
+        None as a keep-alive, then 'done'.
+        """
+        seen_state = None
+        logged = None  # stage_log records already yielded
+        while True:
+            with self._cond:
+                new_lines = list(zip(self.lines[since:], self.line_times[since:]))
+                stage_log = self.stage_log[:]
+                state = self.state
+            if logged is None:
+                logged = sum(1 for record in stage_log if record['line'] < since)
+            for offset, (text, at) in enumerate(new_lines):
+                index = since + offset
+                while logged < len(stage_log) and stage_log[logged]['line'] <= index:
+                    yield 'stage', stage_log[logged]
+                    logged += 1
+                yield 'line', {'index': index, 'text': text, 'time': at}
+            since += len(new_lines)
+            # Stage ends logged after the last line (the job finished)
+            while logged < len(stage_log) and stage_log[logged]['line'] <= since:
+                yield 'stage', stage_log[logged]
+                logged += 1
+            if state != seen_state:
+                seen_state = state
+                yield 'state', {'state': state}
+            if state in FINISHED_STATES:
+                yield 'done', self.to_dict(since)
+                return
+            self.wait(since, state, heartbeat)
+            if len(self.lines) == since and self.state == state:
+                yield None, None
+
+
+class JobManager:
+    """Bounded worker pool plus a registry of recent jobs."""
+
+    def __init__(self, max_workers=2, max_pending=16, history=100, stage_markers=None, on_finish=None):
+        self.max_pending = max_pending
+        self.history = history
+        self.stage_markers = stage_markers or {}
+        self.on_finish = on_finish  # called with each job once it has finished
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn):
+        """
+        Queue ``fn(emit)`` and return its Job immediately. ``fn`` receives the job's
+        emit callback and returns the result payload.
+        """
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job.done)
+            if active >= self.max_pending:
+                raise JobQueueFull(f'{active} analyses are already queued or running. Please retry shortly.')
+            job = Job(kind, self.stage_markers)
+            self._jobs[job.id] = job
+            self._prune()
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def state_counts(self):
+        """Number of registered jobs in each state."""
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.state] = counts.get(job.state, 0) + 1
+            return counts
+
+    def _run(self, job, fn):
+        job.start()
+        try:
+            job.finish(fn(job.emit))
+        except Exception as e:
+            job.fail(str(e))
+        if self.on_finish is not None:
+            self.on_finish(job)
+
+    def _prune(self):
+        # Drop the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self._jobs.items() if job.done]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
@@ -0,0 +1,295 @@
+"""
+Pool of long-lived MATLAB sessions for the web server.
+
+Starting MATLAB and building its path dominates the latency of a cold
+``matlab -batch`` run. The pool keeps sessions alive between analyses; each
+one runs ``runWarmAnalysis``, which keeps its analyzer objects in persistent
+variables. Sessions are health-checked before reuse and recycled after a
+fixed number of jobs.
+
+Two session backends are provided:
+
+- ``engine``: the MATLAB Engine API for Python (``matlab.engine``)
+- ``process``: a MATLAB REPL driven over stdin/stdout. Any command that
+  speaks the same line protocol (e.g. a fake-MATLAB stub) can stand in.
+"""
+
+import io
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+
+try:
+    import matlab.engine
+except Exception:
+    matlab = None  # MATLAB Engine API optional; only the 'engine' backend needs it
+
+ANALYSIS_COMMAND = 'runWarmAnalysis'
+DONE_MARKER = '__POOL_DONE__'
+PING_MARKER = '__POOL_PING__'
+
+
+class SessionError(Exception):
+    """Raised when a MATLAB session cannot start, answer or finish a job."""
+
+
+class ProcessSession:
+    """
+    A MATLAB REPL on stdin/stdout. Each job is sent as one command line that
+    prints ``__POOL_DONE__ <status>`` when it finishes, so the session never
+    has to exit between jobs.
+    """
+
+    def __init__(self, command, cwd, startup_timeout=120):
+        self.command = command
+        self.cwd = cwd
+        self.startup_timeout = startup_timeout
+        self._process = None
+        self._lines = queue.Queue()
+
+    def start(self):
+        args = shlex.split(self.command, posix=(os.name != 'nt'))
+        self._process = subprocess.Popen(args, cwd=self.cwd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         stderr=subprocess.STDOUT, text=True, bufsize=1)
+        threading.Thread(target=self._pump, daemon=True).start()
+        self._send(f"cd('{self.cwd.replace(chr(92), '/')}');")
+        if not self.ping(self.startup_timeout):
+            self.close()
+            raise SessionError('MATLAB session did not become ready.')
+
+    def _pump(self):
+        # Reader thread: forward every stdout line, then None at EOF
+        for line in self._process.stdout:
+            self._lines.put(line.rstrip('\r\n'))
+        self._lines.put(None)
+
+    def _send(self, command):
+        try:
+            self._process.stdin.write(command + '\n')
+            self._process.stdin.flush()
+        except (OSError, ValueError) as e:
+            raise SessionError(f'MATLAB session is not accepting commands: {e}')
+
+    def _read_until(self, marker, timeout, emit=None):
+        """Read lines until one contains marker; returns (marker line, lines before it)."""
+        deadline = time.monotonic() + timeout
+        lines = []
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SessionError(f'MATLAB session timed out after {timeout} seconds.')
+            try:
+                line = self._lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            if line is None:
+                raise SessionError('MATLAB session exited unexpectedly.')
+            # Strip REPL prompts echoed between commands
+            line = line.lstrip('> ') if line.startswith('>>') else line
+            if marker in line:
+                return line, lines
+            if line:
+                lines.append(line)
+                if emit:
+                    emit(line)
+
+    def alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def ping(self, timeout=10):
+        if not self.alive():
+            return False
+        try:
+            self._send(f"disp('{PING_MARKER}')")
+            self._read_until(PING_MARKER, timeout)
+            return True
+        except SessionError:
+            return False
+
+    def run(self, emit, timeout):
+        self._send(f"try, {ANALYSIS_COMMAND}; disp('{DONE_MARKER} 0'); "
+                   f"catch err, disp(getReport(err)); disp('{DONE_MARKER} 1'); end")
+        marker, lines = self._read_until(DONE_MARKER, timeout, emit)
+        status = marker.split(DONE_MARKER, 1)[1].strip()
+        return (0 if status == '0' else 1), '\n'.join(lines) + '\n'
+
+    def close(self):
+        if self._process is None:
+            return
+        if self._process.poll() is None:
+            try:
+                self._send('exit')
+                self._process.wait(timeout=10)
+            except (SessionError, subprocess.TimeoutExpired):
+                self._process.kill()
+        self._process = None
+
+
+class EngineSession:
+    """A MATLAB Engine API session; stdout is forwarded by polling while the job runs."""
+
+    def __init__(self, cwd, startup_timeout=120):
+        if matlab is None:
+            raise SessionError('matlab.engine is not installed; use MATLAB_POOL_SESSION=process instead.')
+        self.cwd = cwd
+        self.startup_timeout = startup_timeout
+        self._engine = None
+
+    def start(self):
+        future = matlab.engine.start_matlab(background=True)
+        try:
+            self._engine = future.result(timeout=self.startup_timeout)
+        except Exception as e:
+            raise SessionError(f'MATLAB engine failed to start: {e}')
+        self._engine.cd(self.cwd, nargout=0)
+
+    def alive(self):
+        return self._engine is not None
+
+    def ping(self, timeout=10):
+        if self._engine is None:
+            return False
+        try:
+            return self._engine.eval('1+1', nargout=1, background=True).result(timeout=timeout) == 2
+        except Exception:
+            return False
+
+    def run(self, emit, timeout):
+        out, err = io.StringIO(), io.StringIO()
+        future = self._engine.eval(ANALYSIS_COMMAND, nargout=0, stdout=out, stderr=err, background=True)
+        deadline = time.monotonic() + timeout
+        sent = 0
+        returncode = 0
+        while True:
+            try:
+                future.result(timeout=0.5)
+                break
+            except matlab.engine.TimeoutError:
+                if time.monotonic() > deadline:
+                    future.cancel()
+                    raise SessionError(f'MATLAB session timed out after {timeout} seconds.')
+            except Exception as e:
+                err.write(str(e) + '\n')
+                returncode = 1
+                break
+            finally:
+                text = out.getvalue()
+                complete = text.rfind('\n') + 1
+                for line in text[sent:complete].splitlines():
+                    emit(line)
+                sent = max(sent, complete)
+        for line in out.getvalue()[sent:].splitlines():
+            emit(line)
+        return returncode, out.getvalue() + err.getvalue()
+
+    def close(self):
+        if self._engine is not None:
+            try:
+                self._engine.quit()
+            except Exception:
+                pass
+            self._engine = None
+
+
+class _Slot:
+    """A pooled session plus its usage counters."""
+
+    def __init__(self, session):
+        self.session = session
+        self.jobs = 0
+        self.last_used = time.monotonic()
+
+
+class MatlabPool:
+    """
+    Fixed-size pool of warm sessions. Sessions start lazily (or via warm()),
+    are pinged before reuse when idle longer than health_interval, and are
+    replaced after max_jobs analyses or any session error.
+    """
+
+    def __init__(self, session_factory, size=1, max_jobs=20, health_interval=60.0):
+        self.session_factory = session_factory
+        self.size = size
+        self.max_jobs = max_jobs
+        self.health_interval = health_interval
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(None)  # placeholder: start on first use
+        self._lock = threading.Lock()
+        self.stats = {'started': 0, 'recycled': 0, 'failed_health_checks': 0, 'jobs': 0}
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _new_slot(self):
+        session = self.session_factory()
+        session.start()
+        self._count('started')
+        return _Slot(session)
+
+    def _healthy(self, slot):
+        if not slot.session.alive():
+            return False
+        if time.monotonic() - slot.last_used < self.health_interval:
+            return True
+        if slot.session.ping():
+            return True
+        self._count('failed_health_checks')
+        return False
+
+    def warm(self):
+        """Start every session now instead of on first use."""
+        slots = [self._idle.get() for _ in range(self.size)]
+        try:
+            slots = [slot or self._new_slot() for slot in slots]
+        finally:
+            for slot in slots:
+                self._idle.put(slot)
+
+    def run(self, emit, timeout):
+        """Run one analysis on a pooled session; returns (returncode, output) like a batch run."""
+        slot = self._idle.get()
+        try:
+            if slot is not None and not self._healthy(slot):
+                slot.session.close()
+                slot = None
+            if slot is None:
+                slot = self._new_slot()
+            try:
+                result = slot.session.run(emit, timeout)
+            except SessionError:
+                # A hung or crashed session is never returned to the pool
+                slot.session.close()
+                slot = None
+                raise
+            slot.jobs += 1
+            slot.last_used = time.monotonic()
+            self._count('jobs')
+            if slot.jobs >= self.max_jobs:
+                slot.session.close()
+                slot = None
+                self._count('recycled')
+            return result
+        finally:
+            self._idle.put(slot)
+
+    def close(self):
+        for _ in range(self.size):
+            slot = self._idle.get()
+            if slot is not None:
+                slot.session.close()
+        for _ in range(self.size):
+            self._idle.put(None)
+
+
+def session_factory(backend, cwd, matlab_cmd='matlab'):
+    """Return a zero-argument callable building sessions for the named backend."""
+    if backend == 'engine':
+        return lambda: EngineSession(cwd)
+    if backend == 'process':
+        return lambda: ProcessSession(matlab_cmd, cwd)
+    raise ValueError(f"Unknown MATLAB pool session backend '{backend}'. Use 'engine' or 'process'.")
@@ -0,0 +1,197 @@
+"""
+In-process metrics served in the Prometheus text exposition format.
+
+Counters and fixed-bucket histograms keep one small record per label
+combination; recording is a dict lookup, a bisect and a few additions under
+a lock. Values that already live elsewhere (cache hit counters, pool state)
+are read by collectors only when /metrics is scraped, so they cost nothing
+on the request path.
+
+With METRICS=0 (or ``metrics.ENABLED = False``) every recording call returns
+immediately and ``timer`` hands back a shared no-op context manager.
+"""
+
+import bisect
+import math
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+ENABLED = os.getenv('METRICS', '1') != '0'
+
+# Seconds: sub-millisecond chat lookups up to the MATLAB timeout
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+# Bytes: 1 KiB .. 1 GiB in powers of 4
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(11))
+
+_NULL_TIMER = nullcontext()
+
+
+class Counter:
+    """Monotonic count per label combination."""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, labels, value) for labels, value in self._values.items()]
+
+
+class Histogram:
+    """Observation counts per bucket (upper bounds inclusive), with sum and count."""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            record = self._values.get(labels)
+            if record is None:
+                record = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            record[0][index] += 1
+            record[1] += value
+            record[2] += 1
+
+    def time(self, *labels):
+        """Context manager observing the seconds spent inside it."""
+        return _Timer(self, labels) if ENABLED else _NULL_TIMER
+
+    def snapshot(self, *labels):
+        """(cumulative bucket counts, sum, count) for one label combination."""
+        with self._lock:
+            counts, total, count = self._values.get(labels, [[0] * (len(self.buckets) + 1), 0.0, 0])
+            counts = list(counts)
+        cumulative, running = [], 0
+        for n in counts:
+            running += n
+            cumulative.append(running)
+        return cumulative, total, count
+
+    def samples(self):
+        with self._lock:
+            keys = list(self._values)
+        samples = []
+        for labels in keys:
+            cumulative, total, count = self.snapshot(*labels)
+            for bound, n in zip(self.buckets + (math.inf,), cumulative):
+                samples.append((self.name + '_bucket', labels + (_format_value(bound),), n))
+            samples.append((self.name + '_sum', labels, total))
+            samples.append((self.name + '_count', labels, count))
+        return samples
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class _Collected:
+    """Metric whose samples are produced by a function at scrape time."""
+
+    def __init__(self, name, type, help, labelnames, fn):
+        self.name = name
+        self.type = type
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+
+    def samples(self):
+        return [(self.name, tuple(labels), value) for labels, value in self.fn().items()]
+
+
+class Registry:
+    """Named metrics rendered together for /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric '{metric.name}' is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()):
+        return self._register(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def collector(self, name, type, help, labelnames, fn):
+        """Register ``fn() -> {label values tuple: value}`` read on every scrape."""
+        return self._register(_Collected(name, type, help, labelnames, fn))
+
+    def render(self):
+        """All metrics in the text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {_escape_help(metric.help)}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            names = metric.labelnames + (('le',) if metric.type == 'histogram' else ())
+            for sample, labels, value in metric.samples():
+                label_text = ','.join(f'{n}="{_escape_label(str(v))}"' for n, v in zip(names, labels))
+                lines.append(f'{sample}{{{label_text}}} {_format_value(value)}' if label_text
+                             else f'{sample} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+REGISTRY = Registry()
+
+
+def _escape_help(text):
+    return text.replace('\\', '\\\\').replace('\n', '\\n')
+
+
+def _escape_label(text):
+    return text.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value) if isinstance(value, float) else str(value)
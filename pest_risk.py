@@ -0,0 +1,314 @@
+"""
+Batched port of PestRiskDetector.detectSpecificPests.
+
+Each pest detector of the MATLAB class is a rule: a list of (index,
+threshold) terms whose risk is the mean of max(0, (threshold - index) /
+threshold) over the terms (calculatePestRisk), the index and threshold
+whose pixels below count as the affected area, and a fixed confidence. The
+rules of all pests are packed into (pest x term) arrays, so one pass over
+the stacked index rasters yields every pest's score, affected area and
+per-pixel risk map at once. The index rasters are gathered into the stack
+one pixel chunk at a time, so the rasters are read in place (never copied
+whole) and each chunk stays in cache; new pests are added by rules
+(``load_rules``), not code.
+
+Rule files are JSON lists of rules; a rule with the name of a built-in pest
+replaces it:
+
+    [{"name": "Leafhoppers", "terms": [["ndre", 0.25], ["ci", 0.2]],
+      "affected": ["ndre", 0.25], "confidence": 0.5}]
+"""
+
+import json
+
+import numpy as np
+
+from spectral_indices import BANDS, INDEX_NAMES
+
+# detectAphids, detectWhiteflies, detectThrips, detectSpiderMites, detectCaterpillars
+DEFAULT_RULES = [
+    {'name': 'Aphids', 'terms': [['ndvi', 0.4], ['gndvi', 0.3]], 'confidence': 0.7},
+    {'name': 'Whiteflies', 'terms': [['ndvi', 0.3], ['ndwi', 0.1]], 'confidence': 0.6},
+    {'name': 'Thrips', 'terms': [['ndvi', 0.35], ['ndre', 0.2]], 'confidence': 0.5},
+    {'name': 'Spider Mites', 'terms': [['ndvi', 0.3], ['gndvi', 0.25]], 'confidence': 0.6},
+    {'name': 'Caterpillars', 'terms': [['ndvi', 0.25], ['savi', 0.2]], 'confidence': 0.8},
+]
+HIGH_RISK = 0.6
+MEDIUM_RISK = 0.3
+# pest_thresholds.medium_risk / high_risk: the levels of the pixel-wise risk map and the overall risk
+MAP_MEDIUM_RISK = 0.6
+MAP_HIGH_RISK = 0.8
+# generateRiskMap: stress deficit thresholds and the stress, anomaly, moisture and light weights
+STRESS_THRESHOLDS = (('ndvi', 0.35), ('gndvi', 0.30), ('ndre', 0.20))
+MAP_WEIGHTS = (0.4, 0.2, 0.2, 0.2)
+# analyzeStressIndicators: (low, high) mean thresholds of each stress index
+STRESS_LEVELS = (('ndvi', 0.3, 0.6), ('gndvi', 0.2, 0.4), ('ndre', 0.15, 0.3))
+# calculateEnvironmentalRisk: temperature, humidity, moisture and light weights
+ENVIRONMENT_WEIGHTS = (0.3, 0.3, 0.2, 0.2)
+# pest_thresholds: temperature (C) and humidity (%) ranges that favor pests
+PEST_TEMPERATURE = (20, 30)
+PEST_HUMIDITY = (60, 80)
+# calculateOverallRisk: spectral, environmental and pest presence weights
+OVERALL_WEIGHTS = (0.3, 0.3, 0.4)
+# Index maps the risk map and overall risk read besides the rules' own
+MAP_INDICES = ('ndvi', 'gndvi', 'ndre', 'ndwi')
+# createRiskRGB: green, yellow, red for risk levels 1..3
+RISK_LABELS = ['Low Risk', 'Medium Risk', 'High Risk']
+RISK_COLORS = np.array([[0, 255, 0], [255, 255, 0], [255, 0, 0]], dtype=np.uint8)
+CHUNK_PIXELS = 1 << 14
+
+
+class PestRuleError(Exception):
+    """Raised for a malformed pest rule."""
+
+
+def field_name(name):
+    """Struct field of a pest, as detectSpecificPests names it ('Spider Mites' -> 'spider_mites')."""
+    return name.lower().replace(' ', '_')
+
+
+def risk_status(score):
+    if score > HIGH_RISK:
+        return 'High Risk'
+    return 'Medium Risk' if score > MEDIUM_RISK else 'Low Risk'
+
+
+def check_rule(rule):
+    """Normalized copy of one rule; ``affected`` defaults to the first term."""
+    try:
+        name = str(rule['name'])
+        terms = [(str(index), float(threshold)) for index, threshold in rule['terms']]
+        affected = rule.get('affected') or terms[0]
+        affected = (str(affected[0]), float(affected[1]))
+        confidence = float(rule.get('confidence', 0.5))
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        raise PestRuleError(f'Invalid pest rule {rule!r}: {e}')
+    for index, threshold in terms + [affected]:
+        if index not in INDEX_NAMES:
+            raise PestRuleError(f'Pest rule {name!r} uses unknown index {index!r}')
+        if threshold == 0:
+            raise PestRuleError(f'Pest rule {name!r} has a zero threshold for {index!r}')
+    return {'name': name, 'terms': terms, 'affected': affected, 'confidence': confidence}
+
+
+def load_rules(path=None):
+    """The built-in rules, updated from the JSON rule file at path (if any)."""
+    rules = {field_name(rule['name']): rule for rule in DEFAULT_RULES}
+    if path:
+        with open(path) as f:
+            extra = json.load(f)
+        if not isinstance(extra, list):
+            raise PestRuleError(f'{path}: expected a JSON list of pest rules')
+        for rule in extra:
+            rule = check_rule(rule)
+            rules[field_name(rule['name'])] = rule
+    return list(rules.values())
+
+
+class PestRiskEngine:
+    """Evaluates a fixed set of pest rules against index maps."""
+
+    def __init__(self, rules=DEFAULT_RULES, chunk_pixels=CHUNK_PIXELS):
+        self.rules = [check_rule(rule) for rule in rules]
+        self.chunk_pixels = chunk_pixels
+        # Rasters the rules read, each stacked once
+        self.index_names = tuple(dict.fromkeys(index for rule in self.rules
+                                               for index, _ in rule['terms'] + [rule['affected']]))
+        rows = {name: i for i, name in enumerate(self.index_names)}
+        width = max(len(rule['terms']) for rule in self.rules)
+        shape = (len(self.rules), width)
+        # Rules with fewer terms are padded with zero-weight terms
+        self.rows = np.zeros(shape, dtype=np.intp)
+        self.inverse = np.ones(shape)  # 1 / threshold
+        self.weights = np.zeros(shape)
+        for p, rule in enumerate(self.rules):
+            for t, (index, threshold) in enumerate(rule['terms']):
+                self.rows[p, t] = rows[index]
+                self.inverse[p, t] = 1 / threshold
+                self.weights[p, t] = 1 / len(rule['terms'])
+        self.affected_rows = np.array([rows[rule['affected'][0]] for rule in self.rules], dtype=np.intp)
+        self.affected_thresholds = np.array([rule['affected'][1] for rule in self.rules])
+
+    def risk_scores(self, means):
+        """calculatePestRisk of every pest from the index means (in index_names order)."""
+        deficits = np.maximum(0, 1 - np.asarray(means)[self.rows] * self.inverse)
+        return (self.weights * deficits).sum(axis=1)
+
+    def evaluate(self, indices, include_maps=True):
+        """
+        pest_detection struct (one entry per pest plus overall_pest_presence)
+        for a dict of equally shaped index maps. ``include_maps`` adds each
+        pest's per-pixel risk map (the mean of its per-pixel term deficits).
+        """
+        shape = np.shape(indices[self.index_names[0]])
+        # Flat views where possible; chunks are gathered into a float32 buffer below
+        flat = [np.asarray(indices[name]).reshape(-1) for name in self.index_names]
+        n = flat[0].size
+        stack = np.empty((len(flat), min(n, self.chunk_pixels)), dtype=np.float32)
+        sums = np.zeros(len(self.index_names))
+        affected = np.zeros(len(self.rules), dtype=np.int64)
+        maps = np.empty((len(self.rules), n), dtype=np.float32) if include_maps else None
+        scratch = np.empty((len(self.rules), min(n, self.chunk_pixels)), dtype=np.float32)
+        # weight * (1 - x / threshold) = weight + x * (-weight / threshold); max(0, .) keeps the weight outside
+        slopes = (-self.weights * self.inverse).astype(np.float32)
+        weights = self.weights.astype(np.float32)
+        below = self.affected_thresholds[:, None].astype(np.float32)
+        for start in range(0, n, self.chunk_pixels):
+            size = min(self.chunk_pixels, n - start)
+            block = stack[:, :size]
+            for row, values in zip(block, flat):
+                row[...] = values[start:start + size]
+            sums += block.sum(axis=1, dtype=np.float64)
+            affected += np.count_nonzero(block[self.affected_rows] < below, axis=1)
+            if not include_maps:
+                continue
+            out = maps[:, start:start + block.shape[1]]
+            term = scratch[:, :block.shape[1]]
+            for t in range(self.rows.shape[1]):
+                np.take(block, self.rows[:, t], axis=0, out=term)
+                term *= slopes[:, t, None]
+                term += weights[:, t, None]
+                if t == 0:
+                    np.maximum(term, 0, out=out)
+                else:
+                    np.maximum(term, 0, out=term)
+                    out += term
+
+        scores = self.risk_scores(sums / n)
+        detection = {}
+        for p, rule in enumerate(self.rules):
+            info = {
+                'type': rule['name'],
+                'risk_score': float(scores[p]),
+                'confidence': rule['confidence'],
+                'affected_area_percentage': affected[p] / n * 100,
+                'status': risk_status(scores[p]),
+            }
+            if include_maps:
+                info['risk_map'] = maps[p].reshape(shape)
+            detection[field_name(rule['name'])] = info
+        detection['overall_pest_presence'] = overall_presence(scores)
+        return detection
+
+    def analyze(self, indices, cube):
+        """
+        pest_risks struct of detectRisks: the spectral stress, environmental
+        conditions, pest_detection and overall_risk, and the pixel-wise
+        risk_map, from the index maps (rules' and MAP_INDICES) and the
+        (corrected) cube.
+        """
+        detection = self.evaluate(indices, include_maps=False)
+        stress = stress_indicators(indices)
+        environment = environmental_conditions(indices, cube)
+        return {
+            'spectral_analysis': {'stress_indicators': stress},
+            'environmental_analysis': environment,
+            'pest_detection': detection,
+            'overall_risk': overall_risk(stress['overall_stress'], environment['overall_risk']['score'],
+                                         detection['overall_pest_presence']['mean_risk']),
+            'risk_map': risk_map(indices, cube),
+        }
+
+
+def _mean(values):
+    return float(np.mean(values, dtype=np.float64))
+
+
+def risk_level(score):
+    """Level of the overall risks, from the pest_thresholds medium and high risk."""
+    if score >= MAP_HIGH_RISK:
+        return 'High'
+    return 'Medium' if score >= MAP_MEDIUM_RISK else 'Low'
+
+
+def stress_indicators(indices):
+    """analyzeStressIndicators: calculateStressLevel of each index mean, and their mean."""
+    stress = {}
+    for name, low, high in STRESS_LEVELS:
+        mean = _mean(indices[name])
+        stress[f'{name}_stress'] = 0.2 if mean >= high else 0.6 if mean >= low else 1.0
+    stress['overall_stress'] = float(np.mean(list(stress.values())))
+    return stress
+
+
+def environmental_conditions(indices, cube):
+    """
+    analyzeEnvironmentalConditions: temperature (from the SWIR band as a
+    thermal proxy), humidity and moisture (from ndwi) and light (from the
+    visible bands) risk levels, and their weighted overall risk.
+    """
+    cube = np.asarray(cube)
+    temperature = 20 + 10 * _mean(cube[:, :, BANDS.index('swir1')])
+    ndwi = _mean(indices['ndwi'])
+    humidity = 50 + 30 * ndwi
+    light = _mean(cube[:, :, :3])
+    environment = {
+        'temperature_analysis': {'mean_temperature': temperature,
+                                 'risk_level': 0.8 if PEST_TEMPERATURE[0] <= temperature <= PEST_TEMPERATURE[1] else 0.3},
+        'humidity_analysis': {'estimated_humidity': humidity,
+                              'risk_level': 0.8 if PEST_HUMIDITY[0] <= humidity <= PEST_HUMIDITY[1] else 0.3},
+        'moisture_analysis': {'moisture_level': ndwi, 'risk_level': 0.7 if ndwi > 0.1 else 0.5 if ndwi > -0.1 else 0.2},
+        'light_analysis': {'light_intensity': light, 'risk_level': 0.8 if light < 0.3 else 0.3},
+    }
+    score = float(np.dot(ENVIRONMENT_WEIGHTS, [info['risk_level'] for info in environment.values()]))
+    environment['overall_risk'] = {'score': score, 'level': risk_level(score)}
+    return environment
+
+
+def overall_risk(spectral_risk, environmental_risk, pest_presence_risk):
+    """calculateOverallRisk: weighted score, level and agreement of the three components."""
+    scores = np.array([spectral_risk, environmental_risk, pest_presence_risk])
+    score = float(np.dot(OVERALL_WEIGHTS, scores))
+    confidence = 1 - scores.std(ddof=1) / scores.mean() if scores.mean() > 0 else 0.0  # MATLAB std normalizes by n - 1
+    return {'score': score, 'level': risk_level(score), 'confidence': float(np.clip(confidence, 0, 1))}
+
+
+def spectral_anomalies(cube):
+    """
+    calculateSpectralAnomalies: 1 - the cosine similarity of each pixel's
+    spectrum with the mean spectrum (0 where either spectrum is all zero).
+    """
+    cube = np.asarray(cube, dtype=np.float32)
+    reference = cube.reshape(-1, cube.shape[-1]).mean(axis=0, dtype=np.float64)
+    reference_norm = np.sqrt(reference @ reference)
+    dots = cube @ reference.astype(np.float32)
+    norms = np.sqrt(np.einsum('ijk,ijk->ij', cube, cube))
+    anomaly = np.zeros(cube.shape[:2], dtype=np.float32)
+    if reference_norm > 0:
+        valid = norms > 0
+        anomaly[valid] = 1 - dots[valid] / (norms[valid] * np.float32(reference_norm))
+    return anomaly
+
+
+def risk_map(indices, cube):
+    """
+    generateRiskMap (score, data levels 1..3, rgb): a pixel's score combines
+    its mean ndvi/gndvi/ndre deficit, spectral anomaly, moisture (ndwi) and
+    low-light (visible bands) favorability, clipped to [0, 1].
+    """
+    cube = np.asarray(cube, dtype=np.float32)
+    stress = sum(np.maximum(0, (threshold - np.asarray(indices[name], dtype=np.float32)) / np.float32(threshold))
+                 for name, threshold in STRESS_THRESHOLDS) / np.float32(len(STRESS_THRESHOLDS))
+    anomaly = np.clip(spectral_anomalies(cube), 0, 1)
+    moisture = np.clip((np.asarray(indices['ndwi'], dtype=np.float32) + np.float32(0.1)) / np.float32(0.4), 0, 1)
+    light = np.clip((np.float32(0.3) - cube[:, :, :3].mean(axis=2)) / np.float32(0.3), 0, 1)
+    w_stress, w_anomaly, w_moisture, w_light = (np.float32(w) for w in MAP_WEIGHTS)
+    score = w_stress * stress + w_anomaly * anomaly + w_moisture * moisture + w_light * light
+    np.clip(score, 0, 1, out=score)
+    levels = 1 + (score >= MAP_MEDIUM_RISK).astype(np.uint8) + (score >= MAP_HIGH_RISK)
+    return {'score': score, 'data': levels, 'rgb': RISK_COLORS[levels - 1],
+            'labels': RISK_LABELS, 'colors': RISK_COLORS / 255}
+
+
+def overall_presence(scores):
+    """calculateOverallPestPresence."""
+    scores = np.asarray(scores)
+    max_risk, mean_risk = float(scores.max()), float(scores.mean())
+    if max_risk > HIGH_RISK:
+        status = 'High Pest Pressure'
+    elif mean_risk > MEDIUM_RISK:
+        status = 'Medium Pest Pressure'
+    else:
+        status = 'Low Pest Pressure'
+    return {'max_risk': max_risk, 'mean_risk': mean_risk,
+            'high_risk_pests': int((scores > HIGH_RISK).sum()), 'status': status}
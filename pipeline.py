@@ -0,0 +1,123 @@
+"""
+DAG runner for the Python analysis backend (the orchestration of main.m).
+
+A pipeline is a set of named stages, each a callable taking the results of
+the stages it depends on (in ``deps`` order) and returning its own result.
+Stages run on a thread pool as soon as their dependencies have finished, so
+independent stages (the crop health, soil and pest analyzers after the
+spectral stage) run concurrently; NumPy releases the GIL in its array loops.
+Results are handed to dependent stages by reference, never copied, so a
+raster produced once (the corrected cube, the index maps) is shared by
+every stage that reads it.
+
+The first failing stage stops the run: stages not yet started are skipped,
+running ones are waited for, and StageError (chained to the original
+exception) names the stage.
+"""
+
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+
+
+class PipelineError(Exception):
+    """Raised for an invalid stage graph (unknown dependency, cycle, duplicate name)."""
+
+
+class StageError(Exception):
+    """Raised when a stage fails; ``stage`` is its name."""
+
+    def __init__(self, stage, error):
+        super().__init__(f'{stage} stage failed: {error}')
+        self.stage = stage
+
+
+class Stage:
+    """One step: ``func(*results of deps)``; ``message`` is emitted when it starts."""
+
+    def __init__(self, name, func, deps=(), message=None):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.message = message
+
+
+class Pipeline:
+    def __init__(self, stages):
+        self.stages = {}
+        for stage in stages:
+            if stage.name in self.stages:
+                raise PipelineError(f'Duplicate stage {stage.name!r}')
+            self.stages[stage.name] = stage
+        self.order = self._topological_order()
+
+    def _topological_order(self):
+        order, state = [], {}  # state: 1 visiting, 2 done
+
+        def visit(name, path):
+            if state.get(name) == 2:
+                return
+            if state.get(name) == 1:
+                raise PipelineError('Stage cycle: ' + ' -> '.join(path + [name]))
+            if name not in self.stages:
+                raise PipelineError(f'Stage {path[-1]!r} depends on unknown stage {name!r}')
+            state[name] = 1
+            for dep in self.stages[name].deps:
+                visit(dep, path + [name])
+            state[name] = 2
+            order.append(name)
+
+        for name in self.stages:
+            visit(name, [])
+        return order
+
+    def run(self, workers=None, emit=None, timer=None):
+        """
+        Run every stage and return {stage name: result}. ``emit`` receives the
+        stage messages; ``timer(name)`` returns a context manager wrapped
+        around each stage (e.g. a metrics timer). Per-stage wall-clock seconds
+        are left in ``self.durations``.
+        """
+        emit = emit or (lambda line: None)
+        timer = timer or (lambda name: nullcontext())
+        results = {}
+        self.durations = {}
+        lock = threading.Lock()
+
+        def run_stage(stage, args):
+            if stage.message:
+                emit(stage.message)
+            start = time.perf_counter()
+            with timer(stage.name):
+                result = stage.func(*args)
+            with lock:
+                self.durations[stage.name] = time.perf_counter() - start
+            return result
+
+        pending = list(self.order)
+        running = {}
+        failure = None
+        with ThreadPoolExecutor(max_workers=workers or len(self.order),
+                                thread_name_prefix='pipeline') as executor:
+            while pending or running:
+                if failure is None:
+                    # Submit in topological order, so with one worker the run is sequential and deterministic
+                    for name in [n for n in pending if all(d in results for d in self.stages[n].deps)]:
+                        stage = self.stages[name]
+                        running[executor.submit(run_stage, stage, [results[d] for d in stage.deps])] = name
+                        pending.remove(name)
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name] = future.result()
+                    except Exception as e:
+                        if failure is None:
+                            failure = (name, e)
+        if failure is not None:
+            name, error = failure
+            raise StageError(name, error) from error
+        return results
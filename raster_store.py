@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+On-disk raster store for multispectral cubes and MATLAB result files.
+
+A ``.mat`` file is converted once into a dataset directory:
+
+- ``meta.json`` holds the scalar and string fields of the MATLAB structs as
+  nested JSON, with ``{"$raster": key}`` in place of every raster field.
+- Each raster is a ``.npy`` file. HxWxB cubes are stored band-major
+  (BxHxW), so one band is a contiguous block of the file.
+
+Datasets are opened with ``np.load(mmap_mode='r')``: reading a band or a
+window touches only those pages instead of deserializing the whole struct.
+A dataset records the size and mtime of its source file and is rebuilt
+when they change.
+
+Usage:
+    python raster_store.py results/crop_health_*.mat [--store raster_store]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+
+META_FILE = 'meta.json'
+MIN_RASTER_SIZE = 64  # smaller numeric arrays are kept inline in meta.json
+
+# One lock per dataset directory, shared by every RasterStore on the same root
+_LOCKS = {}
+_LOCKS_LOCK = threading.Lock()
+
+
+def _lock(path):
+    with _LOCKS_LOCK:
+        return _LOCKS.setdefault(os.path.abspath(path), threading.RLock())
+
+
+class Dataset:
+    """A converted dataset: JSON attributes plus memory-mapped rasters."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'rb') as f:
+            raw = f.read()
+        meta = json.loads(raw.decode('utf-8'))
+        # Bytes read to open it: meta.json, plus the source file when convert() rebuilt it
+        self.bytes_read = len(raw)
+        self.attrs = meta['attrs']
+        self.rasters = meta['rasters']  # key -> {'file', 'shape', 'dtype', 'band_major'}
+        self.source = meta.get('source')
+        self._arrays = {}
+
+    def array(self, key):
+        """The raster as stored (band-major for cubes), memory-mapped read-only."""
+        if key not in self.rasters:
+            raise KeyError(f"No raster '{key}' in {self.path}")
+        if key not in self._arrays:
+            self._arrays[key] = np.load(os.path.join(self.path, self.rasters[key]['file']), mmap_mode='r')
+        return self._arrays[key]
+
+    def raster(self, key):
+        """The raster in its original HxW or HxWxB orientation (a view, nothing is read)."""
+        data = self.array(key)
+        return np.moveaxis(data, 0, -1) if self.rasters[key]['band_major'] else data
+
+    def band(self, key, band):
+        """One HxW band of a cube (or the map itself for 2-D rasters)."""
+        data = self.array(key)
+        if not self.rasters[key]['band_major']:
+            if data.ndim != 2 or band != 0:
+                raise IndexError(f"'{key}' has no band {band}")
+            return data
+        return data[band]
+
+    def window(self, key, r0, r1, c0, c1, bands=None):
+        """Copy of rows r0:r1, cols c0:c1 (and the given bands) in HxW(xB) orientation."""
+        data = self.array(key)
+        if not self.rasters[key]['band_major']:
+            return np.array(data[r0:r1, c0:c1])
+        index = slice(None) if bands is None else list(bands)
+        return np.moveaxis(np.array(data[index, r0:r1, c0:c1]), 0, -1)
+
+
+class RasterStore:
+    """Directory of datasets, one subdirectory per converted file."""
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, name):
+        if not name or name != os.path.basename(name) or name.startswith('.'):
+            raise ValueError(f"Invalid dataset name '{name}'")
+        return os.path.join(self.root, name)
+
+    def names(self):
+        if not os.path.isdir(self.root):
+            return []
+        # Dot directories are datasets being written or replaced
+        return sorted(n for n in os.listdir(self.root)
+                      if not n.startswith('.') and os.path.exists(os.path.join(self.root, n, META_FILE)))
+
+    def exists(self, name):
+        with _lock(self.path(name)):
+            return os.path.exists(os.path.join(self.path(name), META_FILE))
+
+    def open(self, name):
+        with _lock(self.path(name)):
+            return Dataset(self.path(name))
+
+    def remove(self, name):
+        """Delete a dataset (renamed aside first, so readers never see half of it)."""
+        target = self.path(name)
+        with _lock(target):
+            if not os.path.exists(target):
+                return
+            old = tempfile.mkdtemp(prefix=f'.{name}.', dir=self.root) + '.old'
+            os.rename(target, old)
+        shutil.rmtree(old, ignore_errors=True)
+        shutil.rmtree(old[:-len('.old')], ignore_errors=True)
+
+    def write(self, name, rasters, attrs=None, source=None):
+        """
+        Write a dataset from a dict of arrays. 3-D arrays are stored band-major.
+        The dataset is built in a temporary directory and swapped in under the
+        dataset's lock (the old version is renamed aside, then deleted), so
+        readers of this process never see a partial or missing dataset.
+        Arrays already opened from the old version stay readable.
+        """
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f'.{name}.', dir=self.root)
+        try:
+            index = {}
+            for key, values in rasters.items():
+                values = np.asarray(values)
+                band_major = values.ndim == 3
+                stored = np.ascontiguousarray(np.moveaxis(values, -1, 0) if band_major else values)
+                filename = key.replace('/', '.') + '.npy'
+                np.save(os.path.join(tmp, filename), stored)
+                index[key] = {'file': filename, 'shape': list(values.shape),
+                              'dtype': str(values.dtype), 'band_major': band_major}
+            with open(os.path.join(tmp, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'attrs': attrs or {}, 'rasters': index, 'source': source}, f)
+            target = self.path(name)
+            with _lock(target):
+                old = tmp + '.old'
+                if os.path.exists(target):
+                    os.rename(target, old)
+                try:
+                    os.replace(tmp, target)
+                except OSError:
+                    if os.path.exists(old):
+                        os.rename(old, target)
+                    raise
+                dataset = self.open(name)
+            shutil.rmtree(old, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        return dataset
+
+    def is_current(self, name, source_path):
+        """True if the dataset exists and was converted from source_path as it is now."""
+        with _lock(self.path(name)):
+            if not self.exists(name):
+                return False
+            with open(os.path.join(self.path(name), META_FILE), encoding='utf-8') as f:
+                source = json.load(f).get('source')
+        return source == _source_info(source_path)
+
+    def convert(self, mat_path, name=None):
+        """
+        Convert a .mat file (unless already current) and return the dataset.
+        Concurrent converts of one name are serialized: the later ones find it current.
+        """
+        name = name or os.path.splitext(os.path.basename(mat_path))[0]
+        with _lock(self.path(name)):
+            if self.is_current(name, mat_path):
+                return self.open(name)
+            source = _source_info(mat_path)
+            rasters, attrs = mat_to_dataset(load_mat(mat_path))
+            dataset = self.write(name, rasters, attrs, source=source)
+            dataset.bytes_read += source['size']
+            return dataset
+
+
+def _source_info(path):
+    st = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def load_mat(path):
+    import scipy.io
+    data = scipy.io.loadmat(path)
+    return {k: v for k, v in data.items() if not k.startswith('__')}
+
+
+def mat_to_dataset(mat):
+    """
+    Split loadmat output into (rasters, attrs). Arrays with at least
+    MIN_RASTER_SIZE elements and two non-singleton dimensions become rasters
+    keyed by their struct path ('crop_health/ndvi_map'); everything else is
+    converted to JSON values. MATLAB objects scipy cannot decode (datetime)
+    become None.
+    """
+    from scipy.io.matlab import MatlabOpaque
+    rasters = {}
+
+    def convert(value, path):
+        if isinstance(value, MatlabOpaque):
+            return None
+        if isinstance(value, np.ndarray):
+            if value.dtype.names:
+                if value.size == 1:
+                    record = value.flat[0]
+                    return {f: convert(record[f], f'{path}/{f}') for f in value.dtype.names}
+                return [{f: convert(rec[f], f'{path}/{i}/{f}') for f in value.dtype.names}
+                        for i, rec in enumerate(value.flat)]
+            if value.dtype.kind == 'U':
+                strings = [str(s) for s in value.flat]
+                return strings[0] if len(strings) == 1 else strings
+            if value.dtype.kind == 'O':
+                return [convert(v, f'{path}/{i}') for i, v in enumerate(value.flat)]
+            if value.dtype.kind in 'biuf':
+                if value.size >= MIN_RASTER_SIZE and sum(d > 1 for d in value.shape) >= 2:
+                    rasters[path] = value
+                    return {'$raster': path}
+                if value.size == 1:
+                    return value.item()
+                return value.squeeze().tolist()
+            return None
+        if isinstance(value, (str, int, float, bool)) or value is None:
+            return value
+        return None
+
+    attrs = {key: convert(value, key) for key, value in mat.items()}
+    return rasters, attrs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert .mat files into the memory-mapped raster store.')
+    parser.add_argument('files', nargs='+', help='.mat files to convert')
+    parser.add_argument('--store', default='raster_store', help='store directory')
+    args = parser.parse_args()
+
+    store = RasterStore(args.store)
+    for path in args.files:
+        dataset = store.convert(path)
+        print(f'{path} -> {dataset.path} ({len(dataset.rasters)} rasters)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+"""
+Structured analysis results.
+
+Every backend (demo, MATLAB, NumPy) builds one AnalysisResult when a run
+finishes. The dashboards and the chat read its fields directly instead of
+recovering numbers from the console-style analysis text with regexes, and
+/chat refers to a result by id instead of posting the text back.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import asdict, dataclass, field
+
+INDEX_NAMES = ('ndvi', 'gndvi', 'ndre', 'savi', 'evi')
+SECTIONS = ('crop_health', 'soil', 'pest', 'recommendations')
+
+
+@dataclass
+class IndexStats:
+    mean: float = None
+    std: float = None
+    min: float = None
+    max: float = None
+    median: float = None
+    status: str = None
+
+
+@dataclass
+class CropHealth:
+    status: str = None
+    score: float = None
+    confidence: float = None
+    healthy_percentage: float = None
+    stressed_percentage: float = None
+    unhealthy_percentage: float = None
+
+
+@dataclass
+class SoilCondition:
+    status: str = None
+    score: float = None
+    moisture: float = None
+    temperature: float = None
+    ph: float = None
+    ec: float = None
+    parameter_status: dict = field(default_factory=dict)  # moisture/temperature/ph/ec -> label
+
+
+@dataclass
+class PestRisk:
+    level: str = None
+    score: float = None
+    confidence: float = None
+    pests: dict = field(default_factory=dict)  # pest name -> risk score
+
+
+@dataclass
+class AnalysisResult:
+    source: str
+    health: CropHealth = field(default_factory=CropHealth)
+    soil: SoilCondition = field(default_factory=SoilCondition)
+    pest: PestRisk = field(default_factory=PestRisk)
+    indices: dict = field(default_factory=dict)  # index name -> IndexStats
+    recommendations: dict = field(default_factory=dict)  # crop/soil/pest/integrated -> [str]
+    images: list = field(default_factory=list)
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    created_at: float = field(default_factory=time.time)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+# ------------------------------
+# Builders
+# ------------------------------
+def _get(data, *path):
+    """Walk nested dicts; None if any key is missing."""
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data
+
+
+def _number(value):
+    """MATLAB numeric field as float (first element of vectors), or None."""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    return float(value) if isinstance(value, (int, float)) else None
+
+
+def _text(value):
+    return value if isinstance(value, str) else None
+
+
+def _strings(value):
+    if isinstance(value, str):
+        return [value]
+    return [v for v in value if isinstance(v, str)] if isinstance(value, list) else []
+
+
+def from_matlab(combined, images=(), source='matlab'):
+    """
+    Build a result from combined_results converted to nested dicts (see raster_store),
+    or the same layout produced in Python (crop_health.py, source='numpy').
+    """
+    crop = _get(combined, 'crop_health') or {}
+    soil = _get(combined, 'soil_condition') or {}
+    pest = _get(combined, 'pest_risks') or {}
+
+    indices = {}
+    for name in INDEX_NAMES:
+        stats = _get(crop, f'{name}_analysis')
+        if stats:
+            indices[name] = IndexStats(*(_number(stats.get(k)) for k in ('mean', 'std', 'min', 'max', 'median')),
+                                       status=_text(stats.get('health_status')))
+
+    pests = {}
+    for name, info in (_get(pest, 'pest_detection') or {}).items():
+        score = _number(_get(info, 'risk_score'))
+        if score is not None:
+            pests[name] = score
+
+    return AnalysisResult(
+        source=source,
+        health=CropHealth(
+            status=_text(_get(crop, 'overall_health', 'status')),
+            score=_number(_get(crop, 'overall_health', 'score')),
+            confidence=_number(_get(crop, 'overall_health', 'confidence')),
+            healthy_percentage=_number(_get(crop, 'health_statistics', 'healthy_area_percentage')),
+            stressed_percentage=_number(_get(crop, 'health_statistics', 'stressed_area_percentage')),
+            unhealthy_percentage=_number(_get(crop, 'health_statistics', 'unhealthy_area_percentage')),
+        ),
+        soil=SoilCondition(
+            status=_text(_get(soil, 'health_assessment', 'status')),
+            score=_number(_get(soil, 'health_assessment', 'overall_score')),
+            moisture=_number(_get(soil, 'moisture_analysis', 'sensor_moisture_mean')),
+            temperature=_number(_get(soil, 'temperature_analysis', 'mean_temperature')),
+            ph=_number(_get(soil, 'ph_analysis', 'mean_ph')),
+            ec=_number(_get(soil, 'ec_analysis', 'mean_ec')),
+        ),
+        pest=PestRisk(
+            level=_text(_get(pest, 'overall_risk', 'level')),
+            score=_number(_get(pest, 'overall_risk', 'score')),
+            confidence=_number(_get(pest, 'overall_risk', 'confidence')),
+            pests=pests,
+        ),
+        indices=indices,
+        recommendations={
+            'soil': _strings(_get(soil, 'health_assessment', 'recommendations')),
+            'pest': _strings(_get(pest, 'recommendations')),
+        },
+        images=list(images),
+    )
+
+
+def demo_result(images=()):
+    """The fixed values the demo mode reports."""
+    return AnalysisResult(
+        source='demo',
+        health=CropHealth(status='Good', score=0.78, confidence=0.85,
+                          healthy_percentage=62.5, stressed_percentage=25.0, unhealthy_percentage=12.5),
+        soil=SoilCondition(status='Good', score=0.81, moisture=0.18, temperature=22.1, ph=6.7, ec=1.35,
+                           parameter_status={'moisture': 'Adequate', 'temperature': 'Optimal',
+                                             'ph': 'Optimal', 'ec': 'Normal'}),
+        pest=PestRisk(level='Medium', score=0.46, confidence=0.77,
+                      pests={'aphids': 0.42, 'whiteflies': 0.28, 'thrips': 0.31,
+                             'spider_mites': 0.22, 'caterpillars': 0.18}),
+        indices={
+            'ndvi': IndexStats(mean=0.612, status='Healthy'),
+            'gndvi': IndexStats(mean=0.488, status='Healthy'),
+            'ndre': IndexStats(mean=0.212, status='Moderate'),
+            'savi': IndexStats(mean=0.365, status='Moderate'),
+            'evi': IndexStats(mean=0.304, status='Moderate'),
+        },
+        recommendations={
+            'crop': ['Maintain current irrigation; spot-check yellow areas.'],
+            'soil': ['If moisture < 0.2, apply 10–20 mm irrigation.'],
+            'pest': ['Medium pest pressure; scout hotspots before spraying.'],
+            'integrated': ['Prioritize scouting in medium/high-risk patches, then re-check indices in 3 days.'],
+        },
+        images=list(images),
+    )
+
+
+def pest_label(score):
+    """Risk band used for individual pest scores."""
+    if score >= 0.6:
+        return 'High Risk'
+    return 'Medium Risk' if score >= 0.3 else 'Low Risk'
+
+
+# ------------------------------
+# Text for chat replies
+# ------------------------------
+def _fmt(value, digits=2):
+    return 'N/A' if value is None else f'{value:.{digits}f}'
+
+
+def section_text(result, section):
+    """Plain-text summary of one section of a result."""
+    if section == 'crop_health':
+        health = result.health
+        lines = [f'Overall Health: {health.status or "N/A"} (Score: {_fmt(health.score)})']
+        if health.healthy_percentage is not None:
+            lines.append(f'Healthy: {_fmt(health.healthy_percentage, 1)}%, Stressed: '
+                         f'{_fmt(health.stressed_percentage, 1)}%, Unhealthy: {_fmt(health.unhealthy_percentage, 1)}%')
+        for name, stats in result.indices.items():
+            status = f' ({stats.status})' if stats.status else ''
+            lines.append(f'{name.upper()}: {_fmt(stats.mean, 3)}{status}')
+        return '\n'.join(lines)
+    if section == 'soil':
+        soil = result.soil
+        if soil.score is None and soil.moisture is None:
+            return 'Soil analysis is not available for this result.'
+        return '\n'.join([
+            f'Overall Health: {soil.status or "N/A"} (Score: {_fmt(soil.score)})',
+            f'Moisture: {_fmt(soil.moisture)}',
+            f'Temperature: {_fmt(soil.temperature, 1)}°C',
+            f'pH: {_fmt(soil.ph, 1)}',
+            f'EC: {_fmt(soil.ec)} dS/m',
+        ])
+    if section == 'pest':
+        pest = result.pest
+        if pest.level is None and pest.score is None:
+            return 'Pest risk analysis is not available for this result.'
+        lines = [f'Overall Risk: {pest.level or "N/A"} (Score: {_fmt(pest.score)})']
+        lines += [f'{name.replace("_", " ").title()}: {_fmt(score)} ({pest_label(score)})'
+                  for name, score in pest.pests.items()]
+        return '\n'.join(lines)
+    if section == 'recommendations':
+        lines = [f'• {text}' for texts in result.recommendations.values() for text in texts]
+        return '\n'.join(lines) if lines else 'No specific recommendations for this result.'
+    raise ValueError(f"Unknown section '{section}'")
+
+
+# ------------------------------
+# In-memory store
+# ------------------------------
+class ResultStore:
+    """Recent results by id, oldest dropped beyond ``history``."""
+
+    def __init__(self, history=50):
+        self.history = history
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        with self._lock:
+            self._results[result.id] = result
+            while len(self._results) > self.history:
+                self._results.popitem(last=False)
+        return result
+
+    def get(self, result_id):
+        with self._lock:
+            return self._results.get(result_id)
+
+    def latest(self):
+        with self._lock:
+            return next(reversed(self._results.values()), None)
@@ -0,0 +1,216 @@
+"""
+Run history: summary metrics of every analysis in an embedded SQLite database.
+
+Each finished run is one row in ``runs`` and one row per summary number in
+``metrics`` (health/soil/pest scores, index statistics, pest risks, run and
+stage durations), stored long-form so new metrics need no schema change.
+``metrics`` is indexed on (field, name, time), so a trend over any window is
+one index range scan, and ``series`` downsamples it into fixed-width time
+buckets in SQL.
+
+Older timestamped result files (``crop_health_20250925_225909.mat``) can be
+backfilled with ``python run_history.py backfill *.mat``.
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import results_model
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    result_id TEXT UNIQUE,
+    field TEXT NOT NULL,
+    time REAL NOT NULL,
+    source TEXT,
+    duration REAL,
+    health_status TEXT,
+    soil_status TEXT,
+    pest_level TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_field_time ON runs (field, time);
+CREATE TABLE IF NOT EXISTS metrics (
+    run_id INTEGER NOT NULL REFERENCES runs (id) ON DELETE CASCADE,
+    field TEXT NOT NULL,
+    name TEXT NOT NULL,
+    time REAL NOT NULL,
+    value REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS metrics_field_name_time ON metrics (field, name, time);
+"""
+
+DEFAULT_FIELD = 'default'
+MAX_POINTS = 1000
+FILE_TIMESTAMP_RE = re.compile(r'_(\d{8}_\d{6})\.mat$')
+
+
+def result_metrics(result, duration=None, stages=()):
+    """Flatten an AnalysisResult (plus run timings) into {metric name: value}."""
+    values = {
+        'health_score': result.health.score,
+        'health_confidence': result.health.confidence,
+        'healthy_percentage': result.health.healthy_percentage,
+        'stressed_percentage': result.health.stressed_percentage,
+        'unhealthy_percentage': result.health.unhealthy_percentage,
+        'soil_score': result.soil.score,
+        'soil_moisture': result.soil.moisture,
+        'soil_temperature': result.soil.temperature,
+        'soil_ph': result.soil.ph,
+        'soil_ec': result.soil.ec,
+        'pest_score': result.pest.score,
+        'pest_confidence': result.pest.confidence,
+        'duration_seconds': duration,
+    }
+    for name, score in result.pest.pests.items():
+        values[f'pest_{name}'] = score
+    for name, stats in result.indices.items():
+        for stat in ('mean', 'std', 'min', 'max', 'median'):
+            values[f'{name}_{stat}'] = getattr(stats, stat)
+    for stage in stages:
+        if stage.get('duration') is not None:
+            values[f"stage_{stage['name']}_seconds"] = stage['duration']
+    return {name: float(value) for name, value in values.items() if value is not None}
+
+
+class RunHistory:
+    """SQLite-backed store of per-run summary metrics; safe to share between threads."""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if path != ':memory:':
+                self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.execute('PRAGMA foreign_keys=ON')
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def record(self, result, field=DEFAULT_FIELD, when=None, duration=None, stages=(), result_id=None):
+        """Store one run; returns its row id, or None if this result id is already stored."""
+        when = result.created_at if when is None else when
+        values = result_metrics(result, duration, stages)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'INSERT OR IGNORE INTO runs (result_id, field, time, source, duration, health_status, '
+                'soil_status, pest_level) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (result_id or result.id, field, when, result.source, duration, result.health.status,
+                 result.soil.status, result.pest.level))
+            if cursor.rowcount == 0:
+                return None
+            run_id = cursor.lastrowid
+            self._conn.executemany(
+                'INSERT INTO metrics (run_id, field, name, time, value) VALUES (?, ?, ?, ?, ?)',
+                [(run_id, field, name, when, value) for name, value in values.items()])
+        return run_id
+
+    def fields(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute('SELECT DISTINCT field FROM runs ORDER BY field')]
+
+    def metric_names(self, field=DEFAULT_FIELD):
+        with self._lock:
+            return [row[0] for row in self._conn.execute(
+                'SELECT DISTINCT name FROM metrics WHERE field = ? ORDER BY name', (field,))]
+
+    def runs(self, field=DEFAULT_FIELD, since=None, until=None, limit=100):
+        """Most recent runs first."""
+        since, until = _window(since, until)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT result_id, time, source, duration, health_status, soil_status, pest_level FROM runs '
+                'WHERE field = ? AND time >= ? AND time <= ? ORDER BY time DESC LIMIT ?',
+                (field, since, until, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def series(self, name, field=DEFAULT_FIELD, since=None, until=None, points=200):
+        """
+        Values of one metric between since and until (epoch seconds), averaged into
+        at most ``points`` equal time buckets (since defaults to the first value on
+        record, until to now). Each point has the bucket start time,
+        the mean/min/max of its values and the number of runs in it.
+        """
+        if since is None:
+            with self._lock:
+                since = self._conn.execute('SELECT MIN(time) FROM metrics WHERE field = ? AND name = ?',
+                                           (field, name)).fetchone()[0]
+        since, until = _window(since, until)
+        points = max(1, min(int(points), MAX_POINTS))
+        width = max((until - since) / points, 1e-6)
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT MIN(CAST((time - :since) / :width AS INTEGER), :last) AS bucket, AVG(value) AS mean, '
+                'MIN(value) AS min, MAX(value) AS max, COUNT(*) AS count, MIN(time) AS first, MAX(time) AS last '
+                'FROM metrics WHERE field = :field AND name = :name AND time >= :since AND time <= :until '
+                'GROUP BY bucket ORDER BY bucket',
+                {'since': since, 'until': until, 'width': width, 'last': points - 1, 'field': field, 'name': name}
+            ).fetchall()
+        return [{'time': since + row['bucket'] * width, 'mean': row['mean'], 'min': row['min'],
+                 'max': row['max'], 'count': row['count'], 'first': row['first'], 'last': row['last']}
+                for row in rows]
+
+
+def _window(since, until):
+    until = time.time() if until is None else float(until)
+    since = 0.0 if since is None else float(since)
+    return since, until
+
+
+# ------------------------------
+# Backfill from result files
+# ------------------------------
+def file_time(path):
+    """Run time encoded in a name like crop_health_20250925_225909.mat, else the file mtime."""
+    match = FILE_TIMESTAMP_RE.search(os.path.basename(path))
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d_%H%M%S').timestamp()
+    return os.path.getmtime(path)
+
+
+def result_from_mat(path):
+    """AnalysisResult from a combined_results or single-analyzer .mat file, or None."""
+    import raster_store
+    _, attrs = raster_store.mat_to_dataset(raster_store.load_mat(path))
+    combined = attrs.get('combined_results')
+    if not isinstance(combined, dict):
+        combined = {key: attrs[key] for key in ('crop_health', 'soil_condition', 'pest_risks')
+                    if isinstance(attrs.get(key), dict)}
+    return results_model.from_matlab(combined) if combined else None
+
+
+def backfill(history, paths, field=DEFAULT_FIELD):
+    """Record each result file once (keyed by file name); returns the number of runs added."""
+    added = 0
+    for path in paths:
+        result = result_from_mat(path)
+        if result is not None and history.record(result, field, when=file_time(path),
+                                                  result_id=f'file:{os.path.basename(path)}'):
+            added += 1
+    return added
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('command', choices=['backfill'])
+    parser.add_argument('paths', nargs='+', help='result .mat files')
+    parser.add_argument('--db', default=os.getenv('HISTORY_DB', 'run_history.sqlite3'))
+    parser.add_argument('--field', default=DEFAULT_FIELD)
+    args = parser.parse_args()
+    history = RunHistory(args.db)
+    print(f'{backfill(history, args.paths, args.field)} runs added to {args.db}')
+
+
+if __name__ == '__main__':
+    main()
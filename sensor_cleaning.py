@@ -0,0 +1,266 @@
+"""
+Sensor data cleaning: the sensor paths of RobustDataProcessor.m in NumPy.
+
+Works on {column: array} tables such as SensorStore.query() returns. All
+float columns are stacked into one (columns, rows) array and processed at
+once: readings more than ``z_threshold`` robust z-scores (median/MAD) from
+the column median are treated as missing, missing values are filled by
+linear interpolation with linear extrapolation at the ends
+(handleMissingSensorData), and a centered moving mean with shrinking edges
+smooths each column (reduceSensorNoise, MATLAB movmean). Other columns
+(timestamps, labels) pass through unchanged.
+
+The quality scores (completeness, temporal consistency, value range,
+overall score and status) follow assessSensorQuality.
+
+SlidingCleaner applies the same steps to a stream: outlier statistics come
+from the last ``window`` rows, and the few rows the moving mean still needs
+a following row for are held back until the next chunk (or ``flush``).
+"""
+
+import warnings
+from contextlib import contextmanager
+
+import numpy as np
+
+DEFAULT_Z_THRESHOLD = 3.5
+DEFAULT_SMOOTHING = 3
+DEFAULT_WINDOW = 10000
+MAD_SCALE = 1.4826  # MAD of a normal distribution -> standard deviation
+# Expected ranges from RobustDataProcessor.calculateValueRange; other columns use their own min..max
+EXPECTED_RANGES = {
+    'soil_moisture': (0, 1),
+    'soil_temperature': (-10, 50),
+    'ph': (0, 14),
+    'electrical_conductivity': (0, 10),
+}
+QUALITY_LEVELS = ((0.9, 'Excellent'), (0.7, 'Good'), (0.5, 'Fair'))
+
+
+@contextmanager
+def _quiet():
+    # nan-reductions over all-NaN columns warn; those columns simply stay NaN
+    with warnings.catch_warnings(), np.errstate(all='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        yield
+
+
+def numeric_names(columns):
+    """Names of the float columns of a table, in order."""
+    return [name for name, values in columns.items()
+            if np.issubdtype(np.asarray(values).dtype, np.floating)]
+
+
+def _stack(columns, names):
+    # One contiguous row per column: copying whole columns is far cheaper than interleaving them
+    return np.array([np.asarray(columns[name], dtype=np.float64) for name in names]).reshape(len(names), -1)
+
+
+# ------------------------------
+# Cleaning steps (arrays of shape (rows,) or (columns, rows))
+# ------------------------------
+def robust_zscores(values):
+    """
+    |x - median| / (1.4826 * MAD) per column; NaN stays NaN. Columns with MAD 0
+    (constant, or mostly constant like precipitation, where every rain event
+    would otherwise be an outlier) score 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    with _quiet():
+        median = np.nanmedian(values, axis=-1, keepdims=True)
+        deviation = np.abs(values - median)
+        scale = np.nanmedian(deviation, axis=-1, keepdims=True) * MAD_SCALE
+        z = deviation / scale
+    return np.where(scale > 0, z, np.where(np.isnan(values), np.nan, 0.0))
+
+
+def remove_outliers(values, z_threshold=DEFAULT_Z_THRESHOLD):
+    """Copy with readings beyond z_threshold robust z-scores set to NaN, and the outlier mask."""
+    values = np.array(values, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        outliers = robust_zscores(values) > z_threshold
+    values[outliers] = np.nan
+    return values, outliers
+
+
+def fill_missing(values):
+    """
+    Copy of a 1-D array with NaN/Inf filled by linear interpolation between the
+    neighbouring valid readings, extrapolated along the first/last segment at
+    the ends (interp1 'linear', 'extrap'). One valid reading fills everything;
+    an all-missing column is left as is.
+    """
+    values = np.array(values, dtype=np.float64)
+    missing = ~np.isfinite(values)
+    valid = np.flatnonzero(~missing)
+    if not missing.any() or len(valid) == 0:
+        return values
+    if len(valid) == 1:
+        values[missing] = values[valid[0]]
+        return values
+    gaps = np.flatnonzero(missing)
+    filled = np.interp(gaps, valid, values[valid])
+    # np.interp clamps past the ends; extend the first and last segments instead
+    for outside, (a, b) in ((gaps < valid[0], valid[:2]), (gaps > valid[-1], valid[-2:])):
+        if outside.any():
+            filled[outside] = values[a] + (values[b] - values[a]) / (b - a) * (gaps[outside] - a)
+    values[gaps] = filled
+    return values
+
+
+def smooth(values, window=DEFAULT_SMOOTHING):
+    """
+    Centered moving mean along the last axis with windows shrinking at the edges
+    (MATLAB movmean). Series of 3 rows or fewer are returned unchanged, as in
+    reduceSensorNoise. Sums shifted slices, so a NaN only affects the windows
+    containing it.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = values.shape[-1]
+    if window <= 1 or n <= 3:
+        return values.copy()
+    before = window // 2
+    after = window - before - 1
+    total = np.zeros_like(values)
+    count = np.zeros(n)
+    for shift in range(-before, after + 1):
+        lo, hi = max(0, -shift), min(n, n - shift)
+        total[..., lo:hi] += values[..., lo + shift:hi + shift]
+        count[lo:hi] += 1
+    return total / count
+
+
+def clean_columns(columns, z_threshold=DEFAULT_Z_THRESHOLD, smoothing=DEFAULT_SMOOTHING):
+    """
+    Cleaned copy of a table plus {column: {'outliers': n, 'filled': n}}.
+    Outliers are removed first so that they are interpolated over like missing readings.
+    """
+    names = numeric_names(columns)
+    cleaned = dict(columns)
+    if not names:
+        return cleaned, {}
+    values = _stack(columns, names)
+    missing = ~np.isfinite(values)
+    values, outliers = remove_outliers(values, z_threshold)
+    for row in values:
+        row[:] = fill_missing(row)
+    values = smooth(values, smoothing)
+    report = {}
+    for i, name in enumerate(names):
+        cleaned[name] = values[i]
+        report[name] = {'outliers': int(outliers[i].sum()), 'filled': int((missing[i] | outliers[i]).sum())}
+    return cleaned, report
+
+
+# ------------------------------
+# Quality scores
+# ------------------------------
+def completeness(columns):
+    """Mean fraction of finite readings per float column (0 without float columns)."""
+    names = numeric_names(columns)
+    values = _stack(columns, names)
+    if not names or values.size == 0:
+        return 0.0
+    return float(np.isfinite(values).mean(axis=-1).mean())
+
+
+def temporal_consistency(columns):
+    """
+    1 - largest step / (10 * mean step) per column, clipped to 0..1 and
+    averaged over the columns that change at all (1 if none do).
+    """
+    names = numeric_names(columns)
+    values = _stack(columns, names)
+    if values.shape[-1] < 2:
+        return 1.0
+    steps = np.abs(np.diff(values, axis=-1))
+    steps[~np.isfinite(steps)] = np.nan
+    with _quiet():
+        largest = np.nanmax(steps, axis=-1)
+        mean = np.nanmean(steps, axis=-1)
+    changing = mean > 0
+    if not changing.any():
+        return 1.0
+    return float(np.clip(1 - largest[changing] / (mean[changing] * 10), 0, 1).mean())
+
+
+def value_range(columns):
+    """Mean fraction of readings inside each column's expected range (finite readings only count)."""
+    names = [name for name in numeric_names(columns) if len(columns[name])]
+    if not names:
+        return 1.0
+    values = _stack(columns, names)
+    # A column's own min..max holds every finite reading
+    lo = np.array([EXPECTED_RANGES.get(name, (-np.inf, np.inf))[0] for name in names])[:, None]
+    hi = np.array([EXPECTED_RANGES.get(name, (-np.inf, np.inf))[1] for name in names])[:, None]
+    with np.errstate(invalid='ignore'):
+        inside = (values >= lo) & (values <= hi)
+    return float(inside.mean(axis=-1).mean())
+
+
+def assess_quality(columns):
+    """Quality scores of a table as in RobustDataProcessor.assessSensorQuality."""
+    quality = {'completeness': completeness(columns), 'temporal_consistency': temporal_consistency(columns),
+               'value_range': value_range(columns)}
+    quality['overall_score'] = float(np.mean(list(quality.values())))
+    quality['status'] = next((status for threshold, status in QUALITY_LEVELS
+                              if quality['overall_score'] >= threshold), 'Poor')
+    return quality
+
+
+def process(columns, z_threshold=DEFAULT_Z_THRESHOLD, smoothing=DEFAULT_SMOOTHING):
+    """Clean a table and score it before and after (the sensor path of processRobustData)."""
+    cleaned, report = clean_columns(columns, z_threshold, smoothing)
+    return {'columns': cleaned, 'report': report, 'quality': assess_quality(columns),
+            'final_quality': assess_quality(cleaned)}
+
+
+# ------------------------------
+# Streaming
+# ------------------------------
+class SlidingCleaner:
+    """
+    Clean a stream of tables chunk by chunk. Each chunk is cleaned together with
+    the previous ``window`` rows, which supply the outlier statistics and the
+    interpolation anchors; trailing gaps are extrapolated, since later readings
+    are not known yet. Rows come out in order, delayed by the rows the moving
+    mean still needs a following row for.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, z_threshold=DEFAULT_Z_THRESHOLD, smoothing=DEFAULT_SMOOTHING):
+        self.window = window
+        self.z_threshold = z_threshold
+        self.smoothing = smoothing
+        self.lag = max(0, smoothing - smoothing // 2 - 1)
+        self._tail = None
+        self._pending = 0  # rows at the end of the tail not yet returned
+
+    def _emit(self, buffer, start, stop):
+        cleaned, _ = clean_columns(buffer, self.z_threshold, self.smoothing)
+        return {name: values[start:stop] for name, values in cleaned.items()}
+
+    def update(self, chunk):
+        """Add a chunk; returns the cleaned rows that are final now."""
+        chunk = {name: np.asarray(values) for name, values in chunk.items()}
+        if self._tail is None:
+            buffer = chunk
+            start = 0
+        else:
+            buffer = {name: np.concatenate([self._tail[name], chunk[name]]) for name in chunk}
+            start = len(next(iter(self._tail.values()))) - self._pending
+        rows = len(next(iter(buffer.values()))) if buffer else 0
+        stop = max(start, rows - self.lag)
+        out = self._emit(buffer, start, stop)
+        keep = max(self.window, self.lag)
+        self._tail = {name: values[-keep:] if keep else values[:0] for name, values in buffer.items()}
+        self._pending = rows - stop
+        return out
+
+    def flush(self):
+        """Cleaned rows still held back at the end of the stream."""
+        if self._tail is None or self._pending == 0:
+            return {name: values[:0] for name, values in (self._tail or {}).items()}
+        rows = len(next(iter(self._tail.values())))
+        out = self._emit(self._tail, rows - self._pending, rows)
+        self._pending = 0
+        return out
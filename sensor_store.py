@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""
+Bulk ingestion of dataset.csv-style sensor rows into an append-only columnar store.
+
+Input is CSV (with a header row) or NDJSON, read as a stream and parsed in
+chunks of ``chunk_rows`` rows: each column of a chunk is converted to its
+dtype in a few NumPy calls (timestamps in any of the accepted formats, MATLAB
+datestr included, are rewritten to ISO 8601 with np.char string operations),
+with a per-value fallback only for chunks holding malformed numbers or
+timestamps. Rows without a readable timestamp are rejected; missing or
+malformed readings become NaN. Memory use depends on the chunk size, not on
+the size of the feed.
+
+The store is a directory with one raw little-endian file per column
+(timestamps as int64 milliseconds, readings as float64, image file names and
+labels dictionary-encoded as int32) and an index of appended blocks holding
+each block's row range and time range. Queries read the index, skip blocks
+outside the requested window and memory-map only the rows of the others.
+A block becomes visible once its index record is written, so an interrupted
+append is truncated away the next time the store is opened.
+
+Usage:
+    python sensor_store.py ingest dataset.csv [--store sensor_store] [--format csv|ndjson]
+    cat feed.ndjson | python sensor_store.py ingest - --format ndjson
+    python sensor_store.py query --since 2024-10-01 --until 2024-11-01 --columns soil_moisture ph
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+TIME = 'timestamp'
+# (column, type) in dataset.csv order; 'float' is float64, 'category' is dictionary-encoded text
+COLUMNS = (
+    (TIME, 'time'),
+    ('soil_moisture', 'float'),
+    ('soil_temperature', 'float'),
+    ('air_temperature', 'float'),
+    ('humidity', 'float'),
+    ('ph', 'float'),
+    ('electrical_conductivity', 'float'),
+    ('light_intensity', 'float'),
+    ('wind_speed', 'float'),
+    ('precipitation', 'float'),
+    ('atmospheric_pressure', 'float'),
+    ('image_filename', 'category'),
+    ('label', 'category'),
+)
+COLUMN_TYPES = dict(COLUMNS)
+DTYPES = {'time': np.dtype('<i8'), 'float': np.dtype('<f8'), 'category': np.dtype('<i4')}
+ALIASES = {'rainfall': 'precipitation', 'time': TIME, 'datetime': TIME, 'date': TIME}
+MISSING_CODE = -1  # category code of an empty value
+DEFAULT_CHUNK_ROWS = 20000
+INDEX_FILE = 'index.bin'
+INDEX_DTYPE = np.dtype([('start', '<i8'), ('count', '<i8'), ('tmin', '<i8'), ('tmax', '<i8')])
+MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+
+def _month_key(c0, c1, c2):
+    # Case-insensitive key of a three-letter month from its code points
+    return ((c0 | 32) << 16) | ((c1 | 32) << 8) | (c2 | 32)
+
+
+# Keys of the MATLAB datestr months, sorted for np.searchsorted, and the code points of their 'mm'
+MONTH_KEYS = np.array([_month_key(*map(ord, m)) for m in MONTHS], dtype=np.uint32)
+MONTH_ORDER = np.argsort(MONTH_KEYS)
+MONTH_KEYS = MONTH_KEYS[MONTH_ORDER]
+MONTH_DIGITS = np.array([[ord(c) for c in '%02d' % (i + 1)] for i in MONTH_ORDER], dtype=np.uint32)
+NUMBER_CHARS = np.array([ord(c) for c in '0123456789.eE+-'] + [0], dtype=np.uint32)
+
+
+class IngestError(Exception):
+    """Raised for input that cannot be ingested at all (e.g. no timestamp column)."""
+
+
+# ------------------------------
+# Vectorized conversion
+# ------------------------------
+def to_float(values):
+    """Strings -> float64; empty or malformed values become NaN."""
+    values = np.asarray(values, dtype=str)
+    values = np.where(values == '', 'nan', values)
+    try:
+        return values.astype(np.float64)
+    except ValueError:
+        # Slow path only for chunks with malformed values
+        out = np.empty(len(values))
+        for i, value in enumerate(values):
+            try:
+                out[i] = float(value)
+            except ValueError:
+                out[i] = np.nan
+        return out
+
+
+def _codes(text):
+    """Fixed-width strings as an (n, width) matrix of code points (0 pads the end)."""
+    text = np.ascontiguousarray(text)
+    return text.view(np.uint32).reshape(len(text), text.itemsize // 4)
+
+
+def matlab_to_iso(text):
+    """
+    'dd-mmm-yyyy HH:MM:SS' (MATLAB datestr) strings -> 'yyyy-mm-ddTHH:MM:SS',
+    rearranged as code points; other values are returned unchanged.
+    """
+    text = np.asarray(text, dtype=str)
+    width = max(text.itemsize // 4, 11) + 1
+    codes = _codes(text.astype(f'U{width}')).copy()
+    short = codes[:, 1] == ord('-')  # one-digit day
+    codes[short, 1:] = codes[short, :-1]
+    codes[short, 0] = ord('0')
+    key = _month_key(codes[:, 3], codes[:, 4], codes[:, 5])
+    index = np.minimum(np.searchsorted(MONTH_KEYS, key), len(MONTH_KEYS) - 1)
+    known = (MONTH_KEYS[index] == key) & (codes[:, 2] == ord('-')) & (codes[:, 6] == ord('-'))
+    iso = np.zeros_like(codes)
+    iso[:, 0:4] = codes[:, 7:11]
+    iso[:, 4] = iso[:, 7] = ord('-')
+    iso[:, 5:7] = MONTH_DIGITS[index]
+    iso[:, 8:10] = codes[:, 0:2]
+    iso[:, 10] = np.where(codes[:, 11] == ord(' '), ord('T'), 0)
+    iso[:, 11:width - 1] = codes[:, 12:]
+    return np.where(known, iso.view(f'U{width}').ravel(), text)
+
+
+def parse_times(values):
+    """
+    Timestamps as int64 milliseconds since the epoch (UTC), and a mask of the
+    parseable ones. Accepts ISO 8601, MATLAB datestr ('24-Oct-2024 08:58:46')
+    and epoch seconds.
+    """
+    values = np.asarray(values, dtype=str)
+    out = np.zeros(len(values), dtype=np.int64)
+    valid = np.zeros(len(values), dtype=bool)
+    if not len(values):
+        return out, valid
+    codes = _codes(values)
+    lengths = np.count_nonzero(codes, axis=1)
+    ends = codes[np.arange(len(values)), np.maximum(lengths - 1, 0)]
+    if (np.isin(codes[:, 0], (9, 32)) | np.isin(ends, (9, 32))).any():
+        values = np.char.strip(values)
+        codes = _codes(values)
+        lengths = np.count_nonzero(codes, axis=1)
+        ends = codes[np.arange(len(values)), np.maximum(lengths - 1, 0)]
+    # Epoch seconds: number characters only, with a sign only in front or after an exponent
+    signs = (codes[:, 1:] == ord('-')) & ~np.isin(codes[:, :-1], (ord('e'), ord('E')))
+    numeric = (lengths > 0) & np.isin(codes, NUMBER_CHARS).all(axis=1) & ~signs.any(axis=1)
+    if numeric.any():
+        seconds = to_float(values[numeric])
+        out[numeric] = np.round(np.nan_to_num(seconds) * 1000).astype(np.int64)
+        valid[numeric] = ~np.isnan(seconds)
+    rest = np.flatnonzero(~numeric & (lengths > 0))
+    if len(rest):
+        text = values[rest]
+        zulu = ends[rest] == ord('Z')
+        if zulu.any():
+            text = text.copy()
+            _codes(text)[np.flatnonzero(zulu), lengths[rest][zulu] - 1] = 0
+        matlab = (codes[rest, 1] == ord('-')) | (codes[rest, 2] == ord('-'))  # the day comes first
+        if matlab.any():
+            iso = matlab_to_iso(text[matlab])
+            text = text.astype(np.result_type(text, iso))  # '1-Oct-2024' grows by a character
+            text[matlab] = iso
+        try:
+            out[rest] = text.astype('datetime64[ms]').astype(np.int64)
+            valid[rest] = True
+        except ValueError:
+            # Slow path only for chunks with malformed timestamps
+            for i, t in zip(rest, text):
+                try:
+                    out[i] = np.datetime64(t, 'ms').astype(np.int64)
+                    valid[i] = True
+                except ValueError:
+                    pass
+    return out, valid
+
+
+def parse_time_arg(value):
+    """CLI/query time: epoch seconds or ISO 8601 -> int64 ms, None stays None."""
+    if value is None:
+        return None
+    times, valid = parse_times([str(value)])
+    if not valid[0]:
+        raise ValueError(f"Unrecognized time '{value}'")
+    return int(times[0])
+
+
+def canonical(name):
+    name = name.strip().lower().replace(' ', '_')
+    return ALIASES.get(name, name)
+
+
+def convert_chunk(columns):
+    """
+    {column: list of strings} -> ({column: typed array} for accepted rows,
+    number of rejected rows). Unknown columns are dropped.
+    """
+    if TIME not in columns:
+        raise IngestError(f"Input has no '{TIME}' column")
+    times, valid = parse_times(columns[TIME])
+    chunk = {TIME: times[valid]}
+    for name, kind in COLUMNS[1:]:
+        if name not in columns:
+            continue
+        values = np.asarray(columns[name], dtype=str)[valid]
+        chunk[name] = to_float(values) if kind == 'float' else values
+    return chunk, int((~valid).sum())
+
+
+# ------------------------------
+# Readers
+# ------------------------------
+def iter_csv_chunks(lines, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield {column: list of strings} for each chunk of CSV rows (the first line is the header)."""
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if header is None:
+        return
+    names = [canonical(h) for h in header]
+    width = len(names)
+    rows = []
+    for row in reader:
+        if row:
+            rows.append(row + [''] * (width - len(row)) if len(row) < width else row[:width])
+        if len(rows) >= chunk_rows:
+            yield dict(zip(names, map(list, zip(*rows))))
+            rows = []
+    if rows:
+        yield dict(zip(names, map(list, zip(*rows))))
+
+
+def iter_ndjson_chunks(lines, chunk_rows=DEFAULT_CHUNK_ROWS):
+    """Yield {column: list of strings} for each chunk of NDJSON objects; malformed lines get no timestamp."""
+    def flush(records):
+        keys = {key for record in records for key in record}
+        return {key: ['' if record.get(key) is None else str(record.get(key)) for record in records]
+                for key in keys | {TIME}}
+
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        records.append({canonical(k): v for k, v in record.items()} if isinstance(record, dict) else {})
+        if len(records) >= chunk_rows:
+            yield flush(records)
+            records = []
+    if records:
+        yield flush(records)
+
+
+READERS = {'csv': iter_csv_chunks, 'ndjson': iter_ndjson_chunks}
+
+
+# ------------------------------
+# Store
+# ------------------------------
+class SensorStore:
+    """Append-only columnar sensor table in ``root`` (one writer process)."""
+
+    def __init__(self, root):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._dicts = {}  # category column -> (list of values, {value: code})
+        for name, kind in COLUMNS:
+            if kind == 'category':
+                values = []
+                path = self._path(name, '.dict')
+                if os.path.exists(path):
+                    with open(path, encoding='utf-8') as f:
+                        values = [json.loads(line) for line in f if line.strip()]
+                self._dicts[name] = (values, {v: i for i, v in enumerate(values)})
+        self._recover()
+
+    def _path(self, name, suffix='.bin'):
+        return os.path.join(self.root, name + suffix)
+
+    def _index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        if not os.path.exists(path):
+            return np.zeros(0, dtype=INDEX_DTYPE)
+        data = np.fromfile(path, dtype=np.uint8)
+        whole = len(data) // INDEX_DTYPE.itemsize * INDEX_DTYPE.itemsize
+        return data[:whole].view(INDEX_DTYPE)
+
+    def _recover(self):
+        # Drop column bytes (and torn index records) written after the last complete append
+        index = self._index()
+        rows = int(index['count'].sum())
+        index_path = os.path.join(self.root, INDEX_FILE)
+        if os.path.exists(index_path) and os.path.getsize(index_path) != index.nbytes:
+            with open(index_path, 'r+b') as f:
+                f.truncate(index.nbytes)
+        for name, kind in COLUMNS:
+            path = self._path(name)
+            size = rows * DTYPES[kind].itemsize
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                with open(path, 'r+b') as f:
+                    f.truncate(size)
+        self.rows = rows
+
+    def _encode(self, name, values):
+        # Caller holds the lock; new dictionary entries are appended before the column data
+        dictionary, codes = self._dicts[name]
+        unique, inverse = np.unique(values, return_inverse=True)
+        new = [v for v in unique.tolist() if v != '' and v not in codes]
+        if new:
+            with open(self._path(name, '.dict'), 'a', encoding='utf-8') as f:
+                for value in new:
+                    codes[value] = len(dictionary)
+                    dictionary.append(value)
+                    f.write(json.dumps(value) + '\n')
+        table = np.array([codes.get(v, MISSING_CODE) for v in unique.tolist()], dtype=np.int32)
+        return table[inverse] if len(values) else np.zeros(0, dtype=np.int32)
+
+    def append(self, chunk):
+        """Append one converted chunk ({column: array}, see convert_chunk); returns the rows added."""
+        count = len(chunk[TIME])
+        if count == 0:
+            return 0
+        with self._lock:
+            for name, kind in COLUMNS:
+                values = chunk.get(name)
+                if values is None:
+                    values = (np.full(count, np.nan) if kind == 'float'
+                              else np.full(count, MISSING_CODE, dtype=np.int32))
+                elif kind == 'category':
+                    values = self._encode(name, values)
+                with open(self._path(name), 'ab') as f:
+                    f.write(np.ascontiguousarray(values, dtype=DTYPES[kind]).tobytes())
+            times = chunk[TIME]
+            record = np.array([(self.rows, count, times.min(), times.max())], dtype=INDEX_DTYPE)
+            with open(os.path.join(self.root, INDEX_FILE), 'ab') as f:
+                f.write(record.tobytes())
+            self.rows += count
+        return count
+
+    def ingest(self, lines, fmt='csv', chunk_rows=DEFAULT_CHUNK_ROWS, on_chunk=None):
+        """
+        Parse and append a stream of CSV/NDJSON lines chunk by chunk; returns counts.
+        ``on_chunk`` is called with each converted chunk after it is appended.
+        """
+        totals = {'rows': 0, 'rejected': 0, 'chunks': 0}
+        for columns in READERS[fmt](lines, chunk_rows):
+            chunk, rejected = convert_chunk(columns)
+            totals['rows'] += self.append(chunk)
+            if on_chunk is not None:
+                on_chunk(chunk)
+            totals['rejected'] += rejected
+            totals['chunks'] += 1
+        return totals
+
+    def query(self, since=None, until=None, columns=None, limit=None, newest=False):
+        """
+        Rows with since <= time <= until (int64 ms; None is unbounded) in insertion
+        order, as {column: array}; categories are decoded to strings. Only blocks
+        whose time range overlaps the window are read. ``limit`` keeps the first
+        rows; with ``newest`` it keeps the rows with the latest timestamps
+        instead (wherever they were ingested), returned in time order.
+        """
+        names = [TIME] + [c for c in (columns or [n for n, _ in COLUMNS[1:]]) if c != TIME]
+        for name in names:
+            if name not in COLUMN_TYPES:
+                raise KeyError(name)
+        with self._lock:
+            index = self._index()
+            dictionaries = {name: list(self._dicts[name][0]) for name in names if COLUMN_TYPES[name] == 'category'}
+        lo = np.iinfo(np.int64).min if since is None else since
+        hi = np.iinfo(np.int64).max if until is None else until
+        blocks = index[(index['tmax'] >= lo) & (index['tmin'] <= hi)]
+        parts = {name: [] for name in names}
+        if len(blocks):
+            maps = {name: np.memmap(self._path(name), dtype=DTYPES[COLUMN_TYPES[name]], mode='r')
+                    for name in names}
+            if newest:
+                positions = _newest_rows(maps[TIME], blocks, lo, hi, limit)
+                for name in names:
+                    parts[name].append(np.array(maps[name][positions]))
+            else:
+                found = 0
+                for start, count, _, _ in blocks.tolist():
+                    times = maps[TIME][start:start + count]
+                    rows = np.flatnonzero((times >= lo) & (times <= hi))
+                    if limit is not None:
+                        rows = rows[:limit - found]
+                    for name in names:
+                        parts[name].append(np.array(maps[name][start:start + count][rows]))
+                    found += len(rows)
+                    if limit is not None and found >= limit:
+                        break
+        result = {}
+        for name in names:
+            values = (np.concatenate(parts[name]) if parts[name]
+                      else np.zeros(0, dtype=DTYPES[COLUMN_TYPES[name]]))
+            if COLUMN_TYPES[name] == 'category':
+                lookup = np.array(dictionaries[name] + [''], dtype=object)
+                values = lookup[values]  # MISSING_CODE (-1) picks the trailing ''
+            result[name] = values
+        return result
+
+    def stats(self):
+        index = self._index()
+        return {'rows': self.rows, 'blocks': len(index),
+                'first': int(index['tmin'].min()) if len(index) else None,
+                'last': int(index['tmax'].max()) if len(index) else None}
+
+
+def _newest_rows(times, blocks, lo, hi, limit):
+    """
+    Positions of the (at most ``limit``) rows in [lo, hi] with the latest
+    timestamps, in time order (ties in insertion order). Blocks are read by
+    descending tmax and the scan stops once no unread block can beat the
+    current limit-th latest time, so a backfill costs only its own blocks.
+    """
+    found_times, found_positions = [], []
+    found = 0
+    cutoff = None
+    for start, count, _, tmax in blocks[np.argsort(-blocks['tmax'], kind='stable')].tolist():
+        if cutoff is not None and tmax < cutoff:
+            break
+        block = times[start:start + count]
+        rows = np.flatnonzero((block >= lo) & (block <= hi))
+        found_times.append(np.array(block[rows]))
+        found_positions.append(start + rows)
+        found += len(rows)
+        if limit is not None and 0 < limit <= found:
+            cutoff = np.partition(np.concatenate(found_times), found - limit)[found - limit]
+    if not found_times:
+        return np.zeros(0, dtype=np.int64)
+    found_times, found_positions = np.concatenate(found_times), np.concatenate(found_positions)
+    order = np.lexsort((found_positions, found_times))
+    if limit is not None:
+        order = order[max(len(order) - limit, 0):]
+    return found_positions[order]
+
+
+def iso(ms):
+    return datetime.fromtimestamp(ms / 1000, tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    sub = parser.add_subparsers(dest='command', required=True)
+    ingest = sub.add_parser('ingest', help='append CSV/NDJSON files ("-" for stdin)')
+    ingest.add_argument('paths', nargs='+')
+    ingest.add_argument('--format', choices=sorted(READERS))
+    ingest.add_argument('--chunk-rows', type=int, default=DEFAULT_CHUNK_ROWS)
+    query = sub.add_parser('query', help='print rows in a time window as CSV')
+    query.add_argument('--since')
+    query.add_argument('--until')
+    query.add_argument('--columns', nargs='+')
+    query.add_argument('--limit', type=int, default=100)
+    for p in (ingest, query):
+        p.add_argument('--store', default=os.getenv('SENSOR_STORE_DIR', 'sensor_store'))
+    args = parser.parse_args()
+
+    store = SensorStore(args.store)
+    if args.command == 'ingest':
+        for path in args.paths:
+            fmt = args.format or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+            if path == '-':
+                totals = store.ingest(io.TextIOWrapper(sys.stdin.buffer, encoding='utf-8'), fmt, args.chunk_rows)
+            else:
+                with open(path, encoding='utf-8', newline='') as f:
+                    totals = store.ingest(f, fmt, args.chunk_rows)
+            print(f"{path}: {totals['rows']} rows ingested, {totals['rejected']} rejected")
+        print(f'{store.rows} rows in {args.store}')
+    else:
+        rows = store.query(parse_time_arg(args.since), parse_time_arg(args.until), args.columns, args.limit)
+        writer = csv.writer(sys.stdout)
+        writer.writerow(list(rows))
+        for values in zip(*rows.values()):
+            writer.writerow([iso(values[0])] + list(values[1:]))
+
+
+if __name__ == '__main__':
+    main()
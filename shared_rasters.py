@@ -0,0 +1,166 @@
+"""
+Shared-memory hand-off of rasters to worker processes.
+
+Sending a cube to a process pool pickles it into every task, which for a
+512x512x8 (or larger) float cube costs more than most of the analyses run
+on it. A RasterShare copies a set of arrays once into
+``multiprocessing.shared_memory`` segments; tasks receive small picklable
+SharedRaster handles instead, and workers attach read-only NumPy views of
+the same pages (``attached`` / ``run_attached``), so nothing is copied per
+task.
+
+The segments are reference counted: a share starts with ``refs``
+references (one per consumer), ``acquire`` adds one and ``release`` drops
+one, and the segments are unlinked when the count reaches zero. ``close``
+unlinks them regardless (the owner's cleanup after a failed run); using a
+share as a context manager closes it on exit.
+
+Workers must be started from the publishing process (any pool it creates):
+before Python 3.13 an attaching process registers the segment with the
+resource tracker it shares with the publisher, which the publisher's
+unlink then clears.
+"""
+
+import threading
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Picklable reference to one published raster
+SharedRaster = namedtuple('SharedRaster', 'segment shape dtype')
+
+
+class SharedRasterError(Exception):
+    """Raised when a released share is used again."""
+
+
+def _open(segment):
+    try:
+        return shared_memory.SharedMemory(name=segment, track=False)
+    except TypeError:  # before Python 3.13
+        return shared_memory.SharedMemory(name=segment)
+
+
+def _close(segment):
+    try:
+        segment.close()
+    except BufferError:
+        pass  # a view escaped; the mapping goes away with it
+
+
+class RasterShare:
+    """Owner of a set of rasters published to shared memory."""
+
+    def __init__(self, arrays, refs=1):
+        self.handles = {}
+        self.refs = refs
+        self._segments = []
+        self._lock = threading.Lock()
+        try:
+            for key, values in arrays.items():
+                values = np.asarray(values)
+                segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+                self._segments.append(segment)
+                np.ndarray(values.shape, values.dtype, buffer=segment.buf)[...] = values
+                self.handles[key] = SharedRaster(segment.name, values.shape, values.dtype.str)
+        except Exception:
+            self.close()
+            raise
+
+    @property
+    def nbytes(self):
+        return sum(int(np.prod(h.shape)) * np.dtype(h.dtype).itemsize for h in self.handles.values())
+
+    @property
+    def closed(self):
+        return not self._segments
+
+    def acquire(self):
+        with self._lock:
+            if self.closed:
+                raise SharedRasterError('Raster share already released')
+            self.refs += 1
+
+    def release(self):
+        """Drop one reference; the last one unlinks the segments."""
+        with self._lock:
+            if self.closed:
+                return
+            self.refs -= 1
+            if self.refs > 0:
+                return
+        self.close()
+
+    def close(self):
+        """Unlink every segment now, whatever the reference count."""
+        with self._lock:
+            segments, self._segments = self._segments, []
+            self.refs = 0
+        for segment in segments:
+            _close(segment)
+            try:
+                segment.unlink()
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class attached:
+    """
+    Context manager giving read-only views of the handles in ``handles`` (a
+    SharedRaster or a dict of them; other values are passed through).
+    """
+
+    def __init__(self, handles):
+        self.handles = handles
+        self._segments = []
+
+    def _view(self, handle):
+        if not isinstance(handle, SharedRaster):
+            return handle
+        segment = _open(handle.segment)
+        self._segments.append(segment)
+        view = np.ndarray(handle.shape, np.dtype(handle.dtype), buffer=segment.buf)
+        view.flags.writeable = False
+        return view
+
+    def __enter__(self):
+        if isinstance(self.handles, dict):
+            return {key: self._view(value) for key, value in self.handles.items()}
+        return self._view(self.handles)
+
+    def __exit__(self, *exc):
+        for segment in self._segments:
+            _close(segment)
+        self._segments = []
+
+
+def run_attached(func, *args, **kwargs):
+    """
+    Worker task: call func with every SharedRaster in args/kwargs (directly
+    or as a dict value) replaced by an attached view. func must not return
+    the views themselves; its result is pickled back by copy.
+    """
+    views = []
+    try:
+        args = [_enter(value, views) for value in args]
+        kwargs = {key: _enter(value, views) for key, value in kwargs.items()}
+        return func(*args, **kwargs)
+    finally:
+        del args, kwargs
+        for view in views:
+            view.__exit__(None, None, None)
+
+
+def _enter(value, views):
+    if isinstance(value, SharedRaster) or (isinstance(value, dict) and
+                                           any(isinstance(v, SharedRaster) for v in value.values())):
+        views.append(attached(value))
+        return views[-1].__enter__()
+    return value
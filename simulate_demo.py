@@ -4,11 +4,18 @@ Simulation of the Training and Inference Demo
 Demonstrates what the MATLAB system would do when running
 """
 
+import functools
 import os
 import random
 import time
 from datetime import datetime
 
+@functools.lru_cache(maxsize=None)
+def measured_ms(case, size=256):
+    """p95 latency of a benchmark.py case, measured once per run of this script"""
+    import benchmark
+    return benchmark.measure(case, size, repeats=10, warmup=1)['p95_ms']
+
 def simulate_step(step_name, duration=1.0):
     """Simulate a processing step"""
     print(f"Step: {step_name}")
@@ -40,7 +47,7 @@ def simulate_training_pipeline():
     
     # Step 3: Test inference
     simulate_step("Testing trained model inference", 0.5)
-    print("  - Inference time: 0.234 seconds")
+    print(f"  - Inference time: {measured_ms('results_parsing_cold') / 1000:.3f} seconds (measured: results parsing)")
     print("  - Status: Normal")
     print("  - Risk level: Low")
     print("  - Confidence: 0.87\n")
@@ -53,7 +60,7 @@ def simulate_advanced_features():
     
     # Real-time processing
     simulate_step("Real-time clustering and detection", 0.3)
-    print("  - Processing time: 0.287 seconds")
+    print(f"  - Processing time: {measured_ms('numpy_backend') / 1000:.3f} seconds (measured: NumPy backend)")
     print("  - Clusters detected: 3")
     print("  - Anomalies found: 0\n")
     
@@ -123,22 +130,23 @@ def simulate_performance_analysis():
     """Simulate performance analysis"""
     print("=== Performance Analysis ===\n")
     
-    # Performance metrics
-    metrics = {
-        "Average inference time": "0.234 seconds",
-        "Min inference time": "0.187 seconds", 
-        "Max inference time": "0.312 seconds",
-        "Total inferences": "1",
-        "Cache hit rate": "0.0%",
-        "Performance target": "✅ Met (sub-500ms)"
-    }
-    
-    for metric, value in metrics.items():
-        print(f"  {metric}: {value}")
-    
-    print("\n✅ Performance target met (sub-500ms)\n")
-    
-    return True
+    # Performance metrics measured by benchmark.py on fixed-seed 256x256 inputs
+    import benchmark
+    rows = [benchmark.measure(case, 256, repeats=10, warmup=1)
+            for case in ('demo_maps', 'results_parsing_cold', 'results_parsing_cached', 'numpy_backend', 'chat_result_id')]
+    for row in rows:
+        print(f"  {benchmark.format_row(row)}")
+    
+    problems = benchmark.compare({'results': rows}, {}, target_ms=benchmark.TARGET_MS)
+    if problems:
+        print("\n❌ Performance target missed (sub-500ms):")
+        for problem in problems:
+            print(f"  - {problem}")
+        print()
+    else:
+        print("\n✅ Performance target met (sub-500ms)\n")
+    
+    return not problems
 
 def main():
     """Main simulation function"""
@@ -170,14 +178,14 @@ def main():
     
     print("3. ✅ Trained Model Inference")
     print("   - Inference success: True")
-    print("   - Inference time: 0.234 seconds")
+    print(f"   - Inference time: {measured_ms('results_parsing_cold') / 1000:.3f} seconds")
     print("   - Status: Normal")
     print("   - Risk level: Low")
     print("   - Confidence: 0.87\n")
     
     print("4. ✅ Performance Analysis")
-    print("   - Average inference time: 0.234 seconds")
-    print("   - Performance target: ✅ Met (sub-500ms)\n")
+    print(f"   - Inference time (p95): {measured_ms('results_parsing_cold') / 1000:.3f} seconds")
+    print(f"   - Performance target: {'✅ Met' if performance_success else '❌ Missed'} (sub-500ms)\n")
     
     print("5. ✅ System Integration")
     print("   - Integration success: True")
@@ -0,0 +1,411 @@
+"""
+NumPy port of SoilConditionAnalyzer.assessCondition.
+
+Takes the sensor time series (sensor_data.mat or rows of the sensor store),
+the radiometrically corrected cube and its NDWI, and returns the
+soil_condition struct main.m saves, as nested dicts in the layout
+raster_store produces for .mat files: moisture, temperature, pH and EC
+statistics with their classifications and adequacy scores, soil types from
+the red/NIR/SWIR bands, soil health and quality index, anomalies and the
+condition map.
+
+MATLAB paints the whole condition map with one level from the overall
+score. When point sensors with pixel positions are given (``stations``),
+their readings are interpolated across the raster by inverse distance
+weighting over each pixel's nearest stations (a KD-tree query, so the cost
+grows with pixels x neighbours rather than pixels x stations) and the map is
+classified per pixel instead.
+"""
+
+import csv
+import os
+
+import numpy as np
+import scipy.io
+from scipy.spatial import cKDTree
+
+from crop_health import spatial_anomalies
+
+# (upper bound, inclusive, level, score, recommendation); values above every bound get the last row
+MOISTURE_LEVELS = [
+    (0.2, False, 'Dry', 0.2, 'Irrigation needed'),
+    (0.4, False, 'Low', 0.4, 'Consider irrigation'),
+    (0.8, True, 'Optimal', 1.0, 'Moisture levels are adequate'),
+    (None, None, 'Wet', 0.6, 'Reduce irrigation'),
+]
+TEMPERATURE_LEVELS = [
+    (10, False, 'Cold', 0.2, 'Consider warming measures'),
+    (15, False, 'Cool', 0.5, 'Temperature is below optimal'),
+    (25, True, 'Optimal', 1.0, 'Temperature is optimal'),
+    (30, True, 'Warm', 0.7, 'Temperature is above optimal'),
+    (None, None, 'Hot', 0.3, 'Consider cooling measures'),
+]
+PH_LEVELS = [
+    (5.5, False, 'Very Acidic', 0.1, 'Lime application needed'),
+    (6.0, False, 'Acidic', 0.4, 'Consider lime application'),
+    (7.5, True, 'Optimal', 1.0, 'pH is optimal'),
+    (8.0, True, 'Alkaline', 0.6, 'Consider acidification'),
+    (None, None, 'Very Alkaline', 0.2, 'Acidification needed'),
+]
+EC_LEVELS = [
+    (0.5, False, 'Low', 0.4, 'Consider nutrient application'),
+    (1.5, True, 'Optimal', 1.0, 'EC is optimal'),
+    (3.0, True, 'High', 0.6, 'Monitor for salt accumulation'),
+    (None, None, 'Very High', 0.2, 'Leaching may be needed'),
+]
+# sensor column -> (levels, optimal range, max distance of assess*Adequacy, in-range status, health weight)
+SOIL_SENSORS = {
+    'soil_moisture': (MOISTURE_LEVELS, (0.4, 0.8), 0.5, 'Adequate', 0.3),
+    'soil_temperature': (TEMPERATURE_LEVELS, (15, 25), 15, 'Optimal', 0.2),
+    'ph': (PH_LEVELS, (6.0, 7.5), 2.5, 'Optimal', 0.3),
+    'electrical_conductivity': (EC_LEVELS, (0.5, 1.5), 2.0, 'Optimal', 0.2),
+}
+TEMP_EXTREMES = (10, 30)
+PH_EXTREMES = (5.5, 8.0)
+OUTLIER_SIGMAS = 2
+RAPID_MOISTURE_CHANGE = 0.1
+SOIL_TYPES = ['Clay', 'Silt', 'Sand', 'Loam', 'Organic']
+HEALTH_LEVELS = ((0.8, 'Excellent'), (0.6, 'Good'), (0.4, 'Fair'))
+CONDITION_LABELS = ['Poor', 'Good', 'Excellent']
+CONDITION_COLORS = [[1, 0, 0], [1, 1, 0], [0, 1, 0]]  # red, yellow, green
+IDW_NEIGHBOURS = 8
+IDW_POWER = 2
+IDW_BLOCK_PIXELS = 1 << 16
+# Where main.m looks for the sensor series
+DEFAULT_SENSOR_PATHS = ('data/sensor_data.mat', 'sensor_data.mat')
+
+
+# ------------------------------
+# Sensor inputs
+# ------------------------------
+def find_sensor_mat(base_dir):
+    """Return the first existing sensor_data.mat under base_dir, or None."""
+    for rel in DEFAULT_SENSOR_PATHS:
+        path = os.path.join(base_dir, rel)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_sensor_mat(path, variable='sensor_data'):
+    """Numeric fields of the sensor_data struct (the MATLAB datetime timestamps are skipped)."""
+    data = scipy.io.loadmat(path, squeeze_me=True, struct_as_record=False)[variable]
+    out = {}
+    for name in data._fieldnames:
+        value = getattr(data, name)
+        if isinstance(value, np.ndarray) and value.dtype.kind in 'fiu':
+            out[name] = np.atleast_1d(value).astype(np.float64)
+    return out
+
+
+def load_stations(path):
+    """
+    Point sensors from a CSV with ``row`` and ``col`` pixel positions and any
+    of the SOIL_SENSORS columns: (points (n, 2), {column: values}).
+    """
+    with open(path, newline='') as f:
+        rows = list(csv.DictReader(f))
+    points = np.array([[float(r['row']), float(r['col'])] for r in rows]).reshape(-1, 2)
+    values = {name: np.array([float(r[name]) for r in rows]) for name in SOIL_SENSORS if rows and name in rows[0]}
+    return points, values
+
+
+# ------------------------------
+# Classification
+# ------------------------------
+def level_index(values, levels):
+    """Row of ``levels`` each value falls in (works on scalars and arrays)."""
+    values = np.asarray(values, dtype=np.float64)
+    conditions = [values <= bound if inclusive else values < bound for bound, inclusive, *_ in levels[:-1]]
+    return np.select(conditions, np.arange(len(levels) - 1), default=len(levels) - 1)
+
+
+def classify(value, levels):
+    _, _, level, score, recommendation = levels[int(level_index(value, levels))]
+    return {'level': level, 'score': score, 'recommendation': recommendation}
+
+
+def level_scores(values, levels):
+    return np.array([row[3] for row in levels])[level_index(values, levels)]
+
+
+def adequacy(value, optimal, max_distance, in_range_status):
+    """assessMoistureAdequacy and friends: 1 inside the optimal range, falling off with distance from its centre."""
+    low, high = optimal
+    if low <= value <= high:
+        return {'score': 1.0, 'status': in_range_status}
+    score = max(0.0, 1 - abs(value - (low + high) / 2) / max_distance)
+    status = 'Good' if score >= 0.8 else 'Fair' if score >= 0.6 else 'Poor'
+    return {'score': score, 'status': status}
+
+
+# ------------------------------
+# Time series analyses
+# ------------------------------
+def _series(values):
+    values = np.asarray(values, dtype=np.float64).reshape(-1)
+    return values[np.isfinite(values)]
+
+
+def _std(values):
+    return float(values.std(ddof=1)) if len(values) > 1 else 0.0
+
+
+def _cv(stats):
+    """std / mean as MATLAB computes it: inf (or nan) for a zero mean."""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.divide(stats['std'], stats['mean']))
+
+
+def trend(values):
+    """Slope of polyfit(1:n, values, 1)."""
+    n = len(values)
+    if n < 2:
+        return 0.0
+    x = np.arange(n) - (n - 1) / 2
+    return float(x @ (values - values.mean()) / (x @ x))
+
+
+def sensor_analysis(values, name):
+    values = _series(values)
+    levels, optimal, max_distance, in_range_status, _ = SOIL_SENSORS[name]
+    mean = float(values.mean())
+    return {
+        'mean': mean, 'std': _std(values), 'min': float(values.min()), 'max': float(values.max()),
+        'classification': classify(mean, levels),
+        'adequacy_assessment': adequacy(mean, optimal, max_distance, in_range_status),
+    }
+
+
+def moisture_analysis(moisture, ndwi):
+    moisture = _series(moisture)
+    stats = sensor_analysis(moisture, 'soil_moisture')
+    cv = _cv(stats)
+    return {
+        'sensor_moisture': moisture,
+        'sensor_moisture_mean': stats['mean'],
+        'sensor_moisture_std': stats['std'],
+        'spectral_moisture_estimate': np.clip(0.5 + 0.3 * np.asarray(ndwi, dtype=np.float64), 0, 1),
+        'moisture_classification': stats['classification'],
+        'moisture_variability': {
+            'coefficient_of_variation': cv,
+            'range': stats['max'] - stats['min'],
+            'trend': trend(moisture),
+            'level': 'Low' if cv < 0.1 else 'Moderate' if cv < 0.3 else 'High',
+        },
+        'adequacy_assessment': stats['adequacy_assessment'],
+    }
+
+
+def temperature_analysis(temperature):
+    temperature = _series(temperature)
+    stats = sensor_analysis(temperature, 'soil_temperature')
+    daily_range = stats['max'] - stats['min']
+    return {
+        'sensor_temperature': temperature,
+        'mean_temperature': stats['mean'],
+        'temperature_std': stats['std'],
+        'min_temperature': stats['min'],
+        'max_temperature': stats['max'],
+        'temperature_classification': stats['classification'],
+        'temperature_variability': {
+            'daily_range': daily_range,
+            'coefficient_of_variation': _cv(stats),
+            'trend': trend(temperature),
+            'level': 'Low' if daily_range < 5 else 'Moderate' if daily_range < 15 else 'High',
+        },
+        'adequacy_assessment': stats['adequacy_assessment'],
+    }
+
+
+def ph_analysis(ph):
+    ph = _series(ph)
+    stats = sensor_analysis(ph, 'ph')
+    return {'sensor_ph': ph, 'mean_ph': stats['mean'], 'ph_std': stats['std'], 'min_ph': stats['min'],
+            'max_ph': stats['max'], 'ph_classification': stats['classification'],
+            'adequacy_assessment': stats['adequacy_assessment']}
+
+
+def ec_analysis(ec):
+    ec = _series(ec)
+    stats = sensor_analysis(ec, 'electrical_conductivity')
+    return {'sensor_ec': ec, 'mean_ec': stats['mean'], 'ec_std': stats['std'], 'min_ec': stats['min'],
+            'max_ec': stats['max'], 'ec_classification': stats['classification'],
+            'adequacy_assessment': stats['adequacy_assessment']}
+
+
+def _outliers(values):
+    outliers = np.abs(values - values.mean()) > OUTLIER_SIGMAS * _std(values)
+    count = int(outliers.sum())
+    return {'outlier_count': count, 'outlier_percentage': count / len(values) * 100}
+
+
+def series_anomalies(sensor_data):
+    moisture = _series(sensor_data['soil_moisture'])
+    temperature = _series(sensor_data['soil_temperature'])
+    ph = _series(sensor_data['ph'])
+    cold, hot = TEMP_EXTREMES
+    acidic, alkaline = PH_EXTREMES
+    return {
+        'moisture_anomalies': dict(_outliers(moisture),
+                                   rapid_change_count=int((np.abs(np.diff(moisture)) > RAPID_MOISTURE_CHANGE).sum())),
+        'temperature_anomalies': dict(_outliers(temperature),
+                                      extreme_count=int(((temperature < cold) | (temperature > hot)).sum())),
+        'ph_anomalies': dict(_outliers(ph), extreme_count=int(((ph < acidic) | (ph > alkaline)).sum())),
+    }
+
+
+# ------------------------------
+# Spectral analyses
+# ------------------------------
+def soil_type_map(cube):
+    """classifySoilPixels on a (height, width, bands) cube; later MATLAB assignments win, unclassified is loam."""
+    red, nir, swir = (np.asarray(cube[:, :, band], dtype=np.float64) for band in (2, 3, 7))
+    brightness = (red + nir + swir) / 3
+    wetness = (red + swir) / 2 - nir
+    clay = (brightness > 0.6) & (wetness > 0.1)
+    silt = (brightness > 0.4) & (brightness <= 0.6) & (wetness > -0.1) & (wetness <= 0.1)
+    sand = (brightness > 0.6) & (wetness <= -0.1)
+    loam = (brightness > 0.3) & (brightness <= 0.5) & (wetness > -0.05) & (wetness <= 0.05)
+    organic = (brightness <= 0.3) & (wetness > 0.05)
+    return np.select([organic, loam, sand, silt, clay], [5, 4, 3, 2, 1], default=4).astype(np.uint8)
+
+
+def soil_type_analysis(cube):
+    types = soil_type_map(cube)
+    percentages = np.bincount(types.reshape(-1), minlength=len(SOIL_TYPES) + 1)[1:] / types.size * 100
+    analysis = {'soil_type_map': types}
+    for name, percentage in zip(SOIL_TYPES, percentages):
+        analysis[f'percentage_{name.lower()}'] = float(percentage)
+    analysis['dominant_type'] = SOIL_TYPES[int(np.argmax(percentages))]
+    return analysis
+
+
+# ------------------------------
+# Spatial interpolation
+# ------------------------------
+def interpolate(points, values, shape, neighbours=IDW_NEIGHBOURS, power=IDW_POWER, block=IDW_BLOCK_PIXELS):
+    """
+    Inverse distance weighted maps of point readings over a (height, width)
+    pixel grid, using each pixel's ``neighbours`` nearest points. ``points``
+    are (row, col) pixel positions and ``values`` a dict of equally long
+    arrays; all columns share one KD-tree query.
+    """
+    points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    names = list(values)
+    stacked = np.column_stack([np.asarray(values[name], dtype=np.float64) for name in names])
+    k = min(neighbours, len(points))
+    tree = cKDTree(points)
+    height, width = shape
+    out = np.empty((height * width, len(names)))
+    rows_per_block = max(1, block // width)
+    cols = np.arange(width, dtype=np.float64)
+    for r0 in range(0, height, rows_per_block):
+        rows = np.arange(r0, min(height, r0 + rows_per_block), dtype=np.float64)
+        grid = np.column_stack([np.repeat(rows, width), np.tile(cols, len(rows))])
+        distance, nearest = tree.query(grid, k=k, workers=-1)
+        distance, nearest = distance.reshape(len(grid), k), nearest.reshape(len(grid), k)
+        with np.errstate(divide='ignore'):
+            weights = distance ** -power
+        # A pixel on a station takes its reading
+        exact = distance[:, 0] == 0
+        weights[exact] = 0
+        weights[exact, 0] = 1
+        weights /= weights.sum(axis=1, keepdims=True)
+        out[r0 * width:r0 * width + len(grid)] = np.einsum('pk,pkv->pv', weights, stacked[nearest])
+    return {name: out[:, i].reshape(shape) for i, name in enumerate(names)}
+
+
+# ------------------------------
+# Soil health and maps
+# ------------------------------
+def health_status(score):
+    return next((label for threshold, label in HEALTH_LEVELS if score >= threshold), 'Poor')
+
+
+def health_assessment(condition):
+    classifications = [condition['moisture_analysis']['moisture_classification'],
+                       condition['temperature_analysis']['temperature_classification'],
+                       condition['ph_analysis']['ph_classification'],
+                       condition['ec_analysis']['ec_classification']]
+    weights = [SOIL_SENSORS[name][4] for name in SOIL_SENSORS]
+    score = float(sum(w * c['score'] for w, c in zip(weights, classifications)))
+    recommendations = [c['recommendation'] for c in classifications if c['score'] < 0.6]
+    return {'overall_score': score, 'status': health_status(score),
+            'recommendations': recommendations or ['Soil conditions are optimal for crop growth']}
+
+
+def condition_levels(scores):
+    """1 poor, 2 good (>= 0.6), 3 excellent (>= 0.8)."""
+    scores = np.asarray(scores)
+    return (1 + (scores >= 0.6) + (scores >= 0.8)).astype(np.uint8)
+
+
+def condition_map(levels):
+    """generateSoilConditionMap from a level per pixel, with its uint8 RGB rendering."""
+    rgb = (np.array([[0, 0, 0]] + CONDITION_COLORS, dtype=np.uint8) * 255)[levels]
+    return {'data': levels, 'rgb': rgb, 'labels': CONDITION_LABELS, 'colors': CONDITION_COLORS}
+
+
+def spatial_scores(sensor_maps, condition):
+    """Per-pixel health score from interpolated readings; columns without stations use the series score."""
+    series = {'soil_moisture': condition['moisture_analysis']['moisture_classification'],
+              'soil_temperature': condition['temperature_analysis']['temperature_classification'],
+              'ph': condition['ph_analysis']['ph_classification'],
+              'electrical_conductivity': condition['ec_analysis']['ec_classification']}
+    score = 0
+    for name, (levels, _, _, _, weight) in SOIL_SENSORS.items():
+        if name in sensor_maps:
+            score = score + weight * level_scores(sensor_maps[name], levels)
+        else:
+            score = score + weight * series[name]['score']
+    return score
+
+
+def quality_index(condition):
+    value = condition['health_assessment']['overall_score']
+    return {
+        'value': value,
+        'level': 'High' if value >= 0.8 else 'Medium' if value >= 0.6 else 'Low',
+        'component_scores': {
+            'moisture': condition['moisture_analysis']['moisture_classification']['score'],
+            'temperature': condition['temperature_analysis']['temperature_classification']['score'],
+            'ph': condition['ph_analysis']['ph_classification']['score'],
+            'electrical_conductivity': condition['ec_analysis']['ec_classification']['score'],
+        },
+    }
+
+
+def assess_condition(cube, ndwi, sensor_data, stations=None, include_maps=True):
+    """
+    soil_condition struct for a corrected (height, width, bands) cube, its
+    NDWI and a dict of sensor series. ``stations`` is an optional (points,
+    values) pair of point sensors (see load_stations) to interpolate into
+    ``sensor_maps`` and a per-pixel condition map. ``include_maps`` keeps
+    the sensor series and per-pixel arrays other than the condition map.
+    """
+    shape = np.shape(ndwi)
+    condition = {'image_size': list(shape)}
+    condition['moisture_analysis'] = moisture_analysis(sensor_data['soil_moisture'], ndwi)
+    condition['temperature_analysis'] = temperature_analysis(sensor_data['soil_temperature'])
+    condition['ph_analysis'] = ph_analysis(sensor_data['ph'])
+    condition['ec_analysis'] = ec_analysis(sensor_data['electrical_conductivity'])
+    condition['soil_type_analysis'] = soil_type_analysis(cube)
+    condition['health_assessment'] = health_assessment(condition)
+    condition['anomalies'] = series_anomalies(sensor_data)
+    condition['anomalies']['spatial_anomalies'] = spatial_anomalies(cube[:, :, 7])
+    if stations is not None and len(stations[0]):
+        condition['sensor_maps'] = interpolate(*stations, shape)
+        levels = condition_levels(spatial_scores(condition['sensor_maps'], condition))
+    else:
+        levels = np.full(shape, condition_levels(condition['health_assessment']['overall_score']), dtype=np.uint8)
+    condition['moisture_map'] = condition_map(levels)
+    condition['quality_index'] = quality_index(condition)
+    if not include_maps:
+        for section, name in (('moisture_analysis', 'sensor_moisture'), ('temperature_analysis', 'sensor_temperature'),
+                              ('ph_analysis', 'sensor_ph'), ('ec_analysis', 'sensor_ec')):
+            condition[section].pop(name)
+        condition['moisture_analysis'].pop('spectral_moisture_estimate')
+        condition['soil_type_analysis'].pop('soil_type_map')
+        condition.pop('sensor_maps', None)
+    return condition
@@ -0,0 +1,186 @@
+"""
+NumPy port of SpectralImageProcessor.calculateVegetationIndices.
+
+Loads the 8-band multispectral cube and computes NDVI, GNDVI, NDRE, SAVI,
+EVI, NDWI, MSR and CI with float32 band math. The cube is processed in row
+tiles with reusable scratch buffers, so working memory depends on the tile
+size; the index outputs can be any writable arrays (e.g. np.memmap).
+"""
+
+import os
+
+import numpy as np
+
+# Band order used by SpectralImageProcessor (Blue, Green, Red, NIR, RedEdge1-3, SWIR1)
+BANDS = ('blue', 'green', 'red', 'nir', 'rededge1', 'rededge2', 'rededge3', 'swir1')
+INDEX_NAMES = ('ndvi', 'gndvi', 'ndre', 'savi', 'evi', 'ndwi', 'msr', 'ci')
+
+EPS = np.float32(np.finfo(np.float64).eps)  # MATLAB eps, added to every denominator
+SAVI_L = 0.5
+DEFAULT_TILE_ROWS = 256
+
+# Candidate locations of the cube, in the order main.m / the repo use them
+DEFAULT_CUBE_PATHS = ('data/multispectral_data.mat', 'multispectral_data.mat')
+
+
+def find_cube(base_dir):
+    """Return the first existing multispectral_data.mat under base_dir, or None."""
+    for rel in DEFAULT_CUBE_PATHS:
+        path = os.path.join(base_dir, rel)
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def load_cube(path, variable='multispectral_data'):
+    """Load an HxWxB cube from a .mat file as float32."""
+    import scipy.io
+    data = scipy.io.loadmat(path, variable_names=[variable])
+    if variable not in data:
+        raise KeyError(f"'{variable}' not found in {path}")
+    return np.asarray(data[variable], dtype=np.float32)
+
+
+def radiometric_correction(cube, clip_percentile=99.0, out=None):
+    """
+    Deterministic part of SpectralImageProcessor.applyRadiometricCorrection:
+    scale 16-bit DNs to reflectance, clip each band at its 99th percentile and
+    clamp to [0, 1]. The simulated random gain/offset of the MATLAB code is
+    not applied.
+    """
+    if out is None:
+        out = np.empty(cube.shape, dtype=np.float32)
+    scale = 1.0
+    if cube.dtype == np.uint16 or float(cube.max()) > 1 + np.finfo(np.float64).eps:
+        scale = 1.0 / 65535
+    for band in range(cube.shape[2]):
+        band_data = out[:, :, band]
+        np.multiply(cube[:, :, band], np.float32(scale), out=band_data, casting='unsafe')
+        # 'hazen' is the percentile definition MATLAB's prctile uses
+        threshold = np.percentile(band_data, clip_percentile, method='hazen')
+        np.clip(band_data, 0.0, min(float(threshold), 1.0), out=band_data)
+    return out
+
+
+class _Scratch:
+    """Reusable float32 buffers for one tile."""
+
+    def __init__(self, rows, width):
+        shape = (rows, width)
+        self.bands = {name: np.empty(shape, dtype=np.float32) for name in ('blue', 'green', 'red', 'nir', 'rededge1')}
+        self.a = np.empty(shape, dtype=np.float32)
+        self.b = np.empty(shape, dtype=np.float32)
+
+    def view(self, rows):
+        return {k: v[:rows] for k, v in self.bands.items()}, self.a[:rows], self.b[:rows]
+
+
+def _normalized_difference(x, y, a, b, out):
+    """out = (x - y) / (x + y + eps), using a and b as scratch."""
+    np.subtract(x, y, out=a)
+    np.add(x, y, out=b)
+    b += EPS
+    np.divide(a, b, out=out)
+
+
+def _zero_non_finite(x):
+    x[~np.isfinite(x)] = 0
+
+
+def _tile_indices(bands, a, b, out):
+    """Compute every index for one tile into the out views."""
+    blue, green, red = bands['blue'], bands['green'], bands['red']
+    nir, rededge1 = bands['nir'], bands['rededge1']
+
+    _normalized_difference(nir, red, a, b, out['ndvi'])
+    _normalized_difference(nir, green, a, b, out['gndvi'])
+    _normalized_difference(nir, rededge1, a, b, out['ndre'])
+
+    # SAVI = ((nir - red) / (nir + red + L)) * (1 + L)
+    np.subtract(nir, red, out=a)
+    np.add(nir, red, out=b)
+    b += np.float32(SAVI_L)
+    np.divide(a, b, out=out['savi'])
+    out['savi'] *= np.float32(1 + SAVI_L)
+
+    # EVI = 2.5 * (nir - red) / (nir + 6 red - 7.5 blue + 1 + eps); a still holds nir - red
+    a *= np.float32(2.5)
+    np.multiply(red, np.float32(6), out=b)
+    b += nir
+    np.multiply(blue, np.float32(7.5), out=out['evi'])
+    b -= out['evi']
+    b += np.float32(1)
+    b += EPS
+    np.divide(a, b, out=out['evi'])
+
+    # NDWI = (green - nir) / (green + nir + eps) is exactly -GNDVI
+    np.negative(out['gndvi'], out=out['ndwi'])
+
+    # MSR = (sr - 1) / sqrt(sr + 1 + eps), sr = nir / (red + eps)
+    np.add(red, EPS, out=b)
+    np.divide(nir, b, out=a)
+    np.add(a, np.float32(1), out=b)
+    b += EPS
+    np.sqrt(b, out=b)
+    a -= np.float32(1)
+    np.divide(a, b, out=out['msr'])
+
+    # CI = nir / (rededge1 + eps) - 1
+    np.add(rededge1, EPS, out=b)
+    np.divide(nir, b, out=out['ci'])
+    out['ci'] -= np.float32(1)
+
+    for name in INDEX_NAMES:
+        _zero_non_finite(out[name])
+
+
+def compute_indices(cube, out=None, tile_rows=DEFAULT_TILE_ROWS, names=INDEX_NAMES):
+    """
+    Compute vegetation indices for a corrected HxWxB reflectance cube.
+
+    ``out`` may map index names to preallocated HxW float32 arrays (e.g. memory
+    maps); missing ones are allocated. Returns the dict of index arrays
+    restricted to ``names``.
+    """
+    height, width = cube.shape[:2]
+    out = dict(out or {})
+    for name in INDEX_NAMES:
+        if name not in out:
+            # Indices that were not requested still need a tile-sized home
+            shape = (height, width) if name in names else (min(tile_rows, height), width)
+            out[name] = np.empty(shape, dtype=np.float32)
+
+    scratch = _Scratch(min(tile_rows, height), width)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for r0 in range(0, height, tile_rows):
+            r1 = min(r0 + tile_rows, height)
+            bands, a, b = scratch.view(r1 - r0)
+            for name, band in bands.items():
+                np.copyto(band, cube[r0:r1, :, BANDS.index(name)], casting='unsafe')
+            tile_out = {
+                name: (arr[r0:r1] if arr.shape[0] == height else arr[:r1 - r0])
+                for name, arr in out.items()
+            }
+            _tile_indices(bands, a, b, tile_out)
+    return {name: out[name] for name in names}
+
+
+def index_statistics(indices):
+    """Mean, std, min and max of each index map (float64 accumulation)."""
+    stats = {}
+    for name, values in indices.items():
+        stats[name] = {
+            'mean': float(values.mean(dtype=np.float64)),
+            'std': float(values.std(dtype=np.float64)),
+            'min': float(values.min()),
+            'max': float(values.max()),
+        }
+    return stats
+
+
+def analyze_cube(path, tile_rows=DEFAULT_TILE_ROWS):
+    """Load, correct and index a cube file; returns (indices, statistics)."""
+    cube = load_cube(path)
+    corrected = radiometric_correction(cube, out=cube)
+    indices = compute_indices(corrected, tile_rows=tile_rows)
+    return indices, index_statistics(indices)
@@ -9,7 +9,8 @@
   const toggleTTS = document.getElementById('toggle-tts');
   const userInput = document.getElementById('user-input');
 
-  let analysisContext = '';
+  let resultId = null;
+  let analysisContext = ''; // answers chat when the run has no stored result, or it expired
   let ttsEnabled = false;
 
   function setLoading(loading){
@@ -18,16 +19,160 @@
     loader.style.display = loading ? 'inline-block' : 'none';
   }
 
+  // Queue the analysis as a background job; resolves with the /run-matlab payload
+  async function runAnalysisJob(onLine){
+    const res = await fetch('/jobs', {method:'POST'});
+    const job = await res.json();
+    if(!job.id) return job;
+    return new Promise(resolve => {
+      let next = 0;
+      const poll = async () => {
+        try{
+          const response = await fetch(`/jobs/${job.id}?since=${next}`);
+          if(!response.ok){
+            // Unknown or expired job: stop polling and report it
+            const body = await response.json().catch(() => ({}));
+            resolve({error: body.error || `Job status failed (HTTP ${response.status})`});
+            return;
+          }
+          const status = await response.json();
+          (status.lines || []).forEach(onLine);
+          next = status.next || next;
+          if(status.result) resolve(status.result);
+          else setTimeout(poll, 1000);
+        }catch(e){ setTimeout(poll, 2000); }
+      };
+      if(!window.EventSource){ poll(); return; }
+      const source = new EventSource(job.stream_url);
+      source.addEventListener('line', e => {
+        const line = JSON.parse(e.data);
+        next = line.index + 1;
+        onLine(line.text);
+      });
+      source.addEventListener('done', e => {
+        source.close();
+        resolve(JSON.parse(e.data).result);
+      });
+      source.onerror = () => { source.close(); poll(); };
+    });
+  }
+
+  // Maps larger than one tile are shown from /tiles (only the visible 256px tiles are
+  // fetched; wheel to zoom, drag to pan); smaller maps load as a single image
+  function mapName(url){
+    return (url.split('/').pop() || '').replace(/(\.[0-9a-f]{16})?\.png$/i, '');
+  }
+
+  async function showMap(img, url){
+    const wrap = img.parentElement;
+    const previous = wrap.querySelector('.tile-view');
+    if(previous) previous.remove();
+    img.style.display = '';
+    img.src = url || '';
+    if(!url) return;
+    let info;
+    try{
+      const res = await fetch(`/tiles/${mapName(url)}`);
+      if(!res.ok) return;
+      info = await res.json();
+    }catch(e){ return; }
+    if(info.max_zoom === 0) return;
+    img.style.display = 'none';
+    wrap.appendChild(tileView(info));
+  }
+
+  function tileView(info){
+    const view = document.createElement('div');
+    view.className = 'tile-view';
+    view.style.cssText = 'position:relative;width:100%;height:100%;overflow:hidden;cursor:grab;touch-action:none';
+    const layer = document.createElement('div');
+    layer.style.cssText = 'position:absolute;left:0;top:0';
+    view.appendChild(layer);
+    const size = info.tile_size;
+    const tiles = new Map();
+    let z = 0, left = 0, top = 0;  // zoom level and view origin in level pixels
+
+    function levelSize(level){
+      const factor = 2 ** (info.max_zoom - level);
+      return [Math.ceil(info.width / factor), Math.ceil(info.height / factor)];
+    }
+    function clamp(offset, length, viewLength){
+      return length <= viewLength ? (length - viewLength) / 2 : Math.max(0, Math.min(offset, length - viewLength));
+    }
+    function draw(){
+      const [w, h] = levelSize(z);
+      const vw = view.clientWidth, vh = view.clientHeight;
+      left = clamp(left, w, vw);
+      top = clamp(top, h, vh);
+      const wanted = new Set();
+      const lastX = Math.min(Math.ceil(w / size), Math.ceil((left + vw) / size)) - 1;
+      const lastY = Math.min(Math.ceil(h / size), Math.ceil((top + vh) / size)) - 1;
+      for(let x = Math.max(0, Math.floor(left / size)); x <= lastX; x++){
+        for(let y = Math.max(0, Math.floor(top / size)); y <= lastY; y++){
+          const key = `${z}/${x}/${y}`;
+          wanted.add(key);
+          if(tiles.has(key)) continue;
+          const tile = document.createElement('img');
+          tile.src = `/tiles/${info.name}/${key}.png?v=${info.version}`;
+          tile.alt = '';
+          tile.style.cssText = `position:absolute;left:${x * size}px;top:${y * size}px;max-width:none`;
+          layer.appendChild(tile);
+          tiles.set(key, tile);
+        }
+      }
+      tiles.forEach((tile, key) => { if(!wanted.has(key)){ tile.remove(); tiles.delete(key); } });
+      layer.style.transform = `translate(${-left}px, ${-top}px)`;
+    }
+    function zoomTo(level, mx, my){
+      level = Math.max(0, Math.min(info.max_zoom, level));
+      if(level === z) return;
+      const scale = 2 ** (level - z);
+      left = (left + mx) * scale - mx;
+      top = (top + my) * scale - my;
+      z = level;
+      draw();
+    }
+
+    view.addEventListener('wheel', e => {
+      e.preventDefault();
+      const rect = view.getBoundingClientRect();
+      zoomTo(z + (e.deltaY < 0 ? 1 : -1), e.clientX - rect.left, e.clientY - rect.top);
+    }, {passive: false});
+    let drag = null;
+    view.addEventListener('pointerdown', e => {
+      drag = {x: e.clientX, y: e.clientY, left, top};
+      view.setPointerCapture(e.pointerId);
+      view.style.cursor = 'grabbing';
+    });
+    view.addEventListener('pointermove', e => {
+      if(!drag) return;
+      left = drag.left - (e.clientX - drag.x);
+      top = drag.top - (e.clientY - drag.y);
+      draw();
+    });
+    view.addEventListener('pointerup', () => { drag = null; view.style.cursor = 'grab'; });
+    window.addEventListener('resize', draw);
+
+    // Start at the smallest level that fills the card
+    requestAnimationFrame(() => {
+      while(z < info.max_zoom && levelSize(z)[0] < view.clientWidth) z++;
+      draw();
+    });
+    return view;
+  }
+
   async function runAnalysis(){
     setLoading(true);
     try{
-      const res = await fetch('/run-matlab', {method:'POST'});
-      const data = await res.json();
+      const status = document.getElementById('run-status');
+      const data = await runAnalysisJob(line => { if(status) status.textContent = line; });
+      if(status) status.textContent = '';
       if(data.error){
         alert('Analysis failed: '+ (data.details || data.error));
         return;
       }
 
+      resultId = data.result_id || null;
       analysisContext = data.full_context || '';
 
       // place images to 3 key slots: crop_health_map, ndvi_map, soil_condition_map
@@ -35,21 +180,22 @@
       function findImage(key){
         return imgs.find(u => u.toLowerCase().includes(key));
       }
-      document.getElementById('img-health').src = findImage('crop_health_map') || findImage('health') || imgs[0] || '';
-      document.getElementById('img-ndvi').src = findImage('ndvi_map') || findImage('ndvi') || '';
-  document.getElementById('img-soil').src = findImage('soil_condition_map') || findImage('soil') || '';
+      showMap(document.getElementById('img-health'), findImage('crop_health_map') || findImage('health') || imgs[0] || '');
+      showMap(document.getElementById('img-ndvi'), findImage('ndvi_map') || findImage('ndvi') || '');
+  showMap(document.getElementById('img-soil'), findImage('soil_condition_map') || findImage('soil') || '');
   const pestMap = findImage('pest_risk_map') || findImage('pest') || '';
   const pestScoreMap = findImage('pest_risk_score_map') || '';
   const pestImgEl = document.getElementById('img-pest');
-  if (pestImgEl) pestImgEl.src = pestMap || pestScoreMap;
+  if (pestImgEl) showMap(pestImgEl, pestMap || pestScoreMap);
 
-      // parse key KPIs from console output
-      const ctx = analysisContext;
-      const healthStatus = (ctx.match(/Overall Health:\s*(\w+)\s*\(Score:\s*([0-9.]+)\)/i) || [])[1];
-      const healthScore = (ctx.match(/Overall Health:\s*\w+\s*\(Score:\s*([0-9.]+)\)/i) || [])[1];
-      const pestLevel   = (ctx.match(/Overall Risk:\s*(\w+)\s*\(Score:\s*([0-9.]+)\)/i) || [])[1];
-      const pestScore   = (ctx.match(/Overall Risk:\s*\w+\s*\(Score:\s*([0-9.]+)\)/i) || [])[1];
-      const soilMoist   = (ctx.match(/Moisture:\s*([0-9.]+)/i) || [])[1];
+      // key KPIs from the structured result
+      const summary = data.summary || {};
+      const fixed = value => (typeof value === 'number' ? value.toFixed(2) : undefined);
+      const healthStatus = (summary.health || {}).status || undefined;
+      const healthScore = fixed((summary.health || {}).score);
+      const pestLevel   = (summary.pest || {}).level || undefined;
+      const pestScore   = fixed((summary.pest || {}).score);
+      const soilMoist   = fixed((summary.soil || {}).moisture);
 
       document.getElementById('kpi-health').textContent = healthStatus || '—';
       document.getElementById('kpi-health-score').textContent = healthScore ? `Score: ${healthScore}` : '';
@@ -132,7 +278,7 @@
     fetch('/chat', {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ message: userMessage, analysis_context: analysisContext })
+      body: JSON.stringify({ message: userMessage, result_id: resultId, analysis_context: analysisContext })
     })
     .then(r=>r.json())
     .then(data=>{
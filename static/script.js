@@ -9,7 +9,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const sendButton = document.getElementById('send-button');
     const toggleTTS = document.getElementById('toggle-tts');
     const userInput = document.getElementById('user-input');
-    let analysisContext = ''; // Variable to store the full analysis context
+    let analysisContext = ''; // Full analysis text, shown in the summary panel
+    let resultId = null; // Structured result the chatbot answers from
     let ttsEnabled = false;
 
     // --- Main Analysis Logic ---
@@ -19,9 +20,14 @@ document.addEventListener('DOMContentLoaded', () => {
         outputSummary.innerHTML = '<p>Executing MATLAB script, please wait...</p>';
         imageDashboard.innerHTML = '';
         analysisContext = '';
+        resultId = null;
 
-        fetch('/run-matlab', { method: 'POST' })
-            .then(response => response.json())
+        runAnalysisJob(line => {
+            outputSummary.innerHTML = '';
+            const p = document.createElement('p');
+            p.textContent = line;
+            outputSummary.appendChild(p);
+        })
             .then(data => {
                 if (data.error) {
                     let errorMsg = `<p>Error: ${data.error}</p>`;
@@ -32,6 +38,7 @@ document.addEventListener('DOMContentLoaded', () => {
                     imageDashboard.innerHTML = '<p>Analysis failed. No images to display.</p>';
                 } else {
                     analysisContext = data.full_context;
+                    resultId = data.result_id || null;
                     parseAndDisplaySummary(analysisContext);
                     
                     if (data.images && data.images.length > 0) {
@@ -40,7 +47,8 @@ document.addEventListener('DOMContentLoaded', () => {
                             imgContainer.className = 'image-container';
 
                             const fileName = url.split('/').pop();
-                            const cleanName = fileName.replace(/\.png$/i, '').replace(/_/g, ' ');
+                            // Drop the content-hash part of the name (ndvi_map.<hash>.png)
+                            const cleanName = fileName.replace(/(\.[0-9a-f]{16})?\.png$/i, '').replace(/_/g, ' ');
                             
                             const title = document.createElement('h3');
                             title.textContent = cleanName.replace(/(?:^|\s)\S/g, a => a.toUpperCase());
@@ -69,6 +77,50 @@ document.addEventListener('DOMContentLoaded', () => {
             });
     });
 
+    // Queue the analysis as a background job and follow its progress.
+    // Resolves with the same payload /run-matlab returns.
+    function runAnalysisJob(onLine) {
+        return fetch('/jobs', { method: 'POST' })
+            .then(response => response.json())
+            .then(job => {
+                if (!job.id) return job; // queue full or submit error
+                return new Promise(resolve => {
+                    let next = 0;
+                    const poll = () => {
+                        fetch(`/jobs/${job.id}?since=${next}`)
+                            .then(response => {
+                                if (response.ok) return response.json().then(status => {
+                                    (status.lines || []).forEach(onLine);
+                                    next = status.next || next;
+                                    if (status.result) resolve(status.result);
+                                    else setTimeout(poll, 1000);
+                                });
+                                // Unknown or expired job: stop polling and report it
+                                return response.json().catch(() => ({})).then(body =>
+                                    resolve({ error: body.error || `Job status failed (HTTP ${response.status})` }));
+                            })
+                            .catch(() => setTimeout(poll, 2000));
+                    };
+                    if (!window.EventSource) { poll(); return; }
+                    const source = new EventSource(job.stream_url);
+                    source.addEventListener('line', e => {
+                        const line = JSON.parse(e.data);
+                        next = line.index + 1;
+                        onLine(line.text);
+                    });
+                    source.addEventListener('done', e => {
+                        source.close();
+                        resolve(JSON.parse(e.data).result);
+                    });
+                    source.onerror = () => {
+                        // Stream dropped (proxy timeout, restart): continue by polling
+                        source.close();
+                        poll();
+                    };
+                });
+            });
+    }
+
     // --- Chatbot Interaction Logic ---
     chatbotFab.addEventListener('click', () => {
         chatbotContainer.classList.add('open');
@@ -117,6 +169,8 @@ document.addEventListener('DOMContentLoaded', () => {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
                 message: userMessage,
+                result_id: resultId,
+                // Answers runs without a stored result, or whose result has expired
                 analysis_context: analysisContext
             }),
         })
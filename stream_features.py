@@ -0,0 +1,225 @@
+"""
+Rolling features of many sensor streams, updated per reading without rescanning history.
+
+The per-stream statistics of RealTimeDetector.fastSensorFeatureExtraction and
+MultimodalFusion.extractSensorFeatures (mean, std, min, max, range, trend)
+over the last ``window`` readings, plus an EWMA of every reading. Each stream
+is one row of a set of flat arrays: a ring buffer of its window, the window
+mean and sum of squared deviations (sliding Welford), the sum of
+position-weighted readings for the least-squares slope, window min/max and
+the EWMA. A new reading updates these in O(1); readings of many streams that
+arrive together are applied in one vectorized step.
+
+Floating-point drift is bounded by recomputing a stream's sums exactly from
+its ring buffer each time the buffer wraps (O(1) amortized). Window min/max
+are rescanned from the buffer only when the current extreme is the reading
+that leaves the window.
+"""
+
+import threading
+
+import numpy as np
+
+DEFAULT_WINDOW = 256
+DEFAULT_ALPHA = 0.1
+DEFAULT_MAX_STREAMS = 10000
+FEATURES = ('count', 'mean', 'std', 'min', 'max', 'range', 'trend', 'ewma', 'last')
+# Prefixed like the MATLAB feature structs ('mean_soil_moisture', ...)
+STRUCT_FEATURES = ('mean', 'std', 'min', 'max', 'range', 'trend')
+
+
+class StreamLimitError(Exception):
+    """Raised when a new stream would exceed max_streams."""
+
+
+class StreamFeatures:
+    """Windowed features of up to ``max_streams`` named streams; safe to share between threads."""
+
+    def __init__(self, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA, max_streams=DEFAULT_MAX_STREAMS, capacity=64):
+        self.window = window
+        self.alpha = alpha
+        self.max_streams = max_streams
+        self.names = []
+        self._ids = {}
+        self._lock = threading.Lock()
+        self._grow(min(capacity, max_streams))
+
+    def _grow(self, capacity):
+        # Caller holds the lock (or is the constructor); existing rows are copied over
+        def resized(old, fill, shape=()):
+            new = np.full((capacity,) + shape, fill, dtype=np.asarray(fill).dtype)
+            if old is not None:
+                new[:len(old)] = old
+            return new
+
+        self.buffer = resized(getattr(self, 'buffer', None), np.nan, (self.window,))
+        for name in ('count', 'seen', 'head'):
+            setattr(self, name, resized(getattr(self, name, None), 0))
+        for name in ('mean', 'm2', 'sky', 'ewma', 'last'):
+            setattr(self, name, resized(getattr(self, name, None), 0.0))
+        for name in ('wmin', 'wmax'):
+            setattr(self, name, resized(getattr(self, name, None), np.nan))
+
+    def _stream_ids(self, streams):
+        # Caller holds the lock
+        ids = np.empty(len(streams), dtype=np.int64)
+        for k, stream in enumerate(streams):
+            i = self._ids.get(stream)
+            if i is None:
+                if len(self.names) >= self.max_streams:
+                    raise StreamLimitError(f'More than {self.max_streams} sensor streams')
+                i = self._ids[stream] = len(self.names)
+                self.names.append(stream)
+                if i >= len(self.count):
+                    self._grow(min(2 * len(self.count), self.max_streams))
+            ids[k] = i
+        return ids
+
+    # ------------------------------
+    # Updates
+    # ------------------------------
+    def update(self, streams, values):
+        """
+        Add one reading per entry of ``streams`` (NaN readings are skipped). A
+        stream listed several times gets its readings in order, one vectorized
+        round per repeat.
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        with self._lock:
+            ids = self._stream_ids(list(streams))
+            valid = np.isfinite(values)
+            ids, values = ids[valid], values[valid]
+            if not len(ids):
+                return
+            order = np.argsort(ids, kind='stable')
+            sorted_ids = ids[order]
+            rank = np.arange(len(ids)) - np.searchsorted(sorted_ids, sorted_ids)  # repeat number
+            for r in range(int(rank.max()) + 1):
+                rows = order[rank == r]
+                self._step(ids[rows], values[rows])
+
+    def _step(self, i, x):
+        # One reading for each of the distinct streams i; caller holds the lock
+        n = self.count[i]
+        full = n == self.window
+        slot = self.head[i]
+        old = np.where(full, self.buffer[i, slot], 0.0)
+        mean = self.mean[i]
+        count = np.where(full, n, n + 1)
+        new_mean = mean + np.where(full, x - old, x - mean) / count
+        # Welford: add x, or replace the oldest reading with x when the window is full
+        self.m2[i] = np.where(full, self.m2[i] + (x - old) * (x - new_mean + old - mean),
+                              self.m2[i] + (x - mean) * (x - new_mean))
+        # Sum of k * y over window positions k = 0..n-1; a full window shifts every k down by one
+        self.sky[i] = np.where(full, self.sky[i] - (mean * n - old) + (n - 1) * x, self.sky[i] + n * x)
+        self.mean[i] = new_mean
+        self.count[i] = count
+        wmin, wmax = self.wmin[i], self.wmax[i]
+        self.wmin[i] = np.where(n == 0, x, np.fmin(wmin, x))
+        self.wmax[i] = np.where(n == 0, x, np.fmax(wmax, x))
+        self.buffer[i, slot] = x
+        self.head[i] = (slot + 1) % self.window
+        self.ewma[i] = np.where(self.seen[i] == 0, x, self.alpha * x + (1 - self.alpha) * self.ewma[i])
+        self.last[i] = x
+        self.seen[i] += 1
+
+        rescan = i[full & ((old == wmin) & (x > old) | (old == wmax) & (x < old))]
+        if len(rescan):
+            self.wmin[rescan] = self.buffer[rescan].min(axis=1)
+            self.wmax[rescan] = self.buffer[rescan].max(axis=1)
+        wrapped = i[self.head[i] == 0]
+        if len(wrapped):
+            self._resync(wrapped)
+
+    def _resync(self, rows):
+        # Exact window sums of full streams whose oldest reading is in slot 0
+        window = self.buffer[rows]
+        mean = window.mean(axis=1)
+        self.mean[rows] = mean
+        self.m2[rows] = ((window - mean[:, None]) ** 2).sum(axis=1)
+        self.sky[rows] = window @ np.arange(self.window, dtype=np.float64)
+
+    def extend(self, stream, values):
+        """Add a run of readings of one stream at once (e.g. an ingested chunk)."""
+        values = np.asarray(values, dtype=np.float64).reshape(-1)
+        values = values[np.isfinite(values)]
+        if not len(values):
+            return
+        with self._lock:
+            i = self._stream_ids([stream])[0]
+            # Readings older than the window no longer matter except for the EWMA
+            tail = np.concatenate([self._ordered(i), values])[-self.window:]
+            n = len(tail)
+            if self.seen[i] == 0:
+                ewma, rest = values[0], values[1:]
+            else:
+                ewma, rest = self.ewma[i], values
+            decay = 1 - self.alpha
+            weights = self.alpha * decay ** np.arange(len(rest) - 1, -1, -1, dtype=np.float64)
+            self.ewma[i] = decay ** len(rest) * ewma + weights @ rest
+            self.buffer[i] = np.nan
+            self.buffer[i, :n] = tail
+            self.count[i] = n
+            self.head[i] = n % self.window
+            self.mean[i] = tail.mean()
+            self.m2[i] = ((tail - tail.mean()) ** 2).sum()
+            self.sky[i] = tail @ np.arange(n, dtype=np.float64)
+            self.wmin[i], self.wmax[i] = tail.min(), tail.max()
+            self.last[i] = values[-1]
+            self.seen[i] += len(values)
+
+    def _ordered(self, i):
+        # Window readings of stream i, oldest first
+        n = self.count[i]
+        if n < self.window:
+            return self.buffer[i, :n].copy()
+        return np.roll(self.buffer[i], -self.head[i])
+
+    # ------------------------------
+    # Features
+    # ------------------------------
+    def _features(self, rows):
+        # Feature arrays of the given rows (an index array, so every array is a copy); caller holds the lock
+        n = self.count[rows].astype(np.float64)
+        mean, m2, sky = self.mean[rows], self.m2[rows], self.sky[rows]
+        wmin, wmax = self.wmin[rows], self.wmax[rows]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            std = np.where(n > 1, np.sqrt(np.maximum(m2, 0) / (n - 1)), 0.0)
+            # Least-squares slope over positions 0..n-1 (polyfit(1:n, data, 1) in calculateTrend)
+            trend = np.where(n > 1, (sky - (n - 1) / 2 * n * mean) / (n * (n * n - 1) / 12), 0.0)
+        return {'count': self.count[rows], 'mean': mean, 'std': std, 'min': wmin, 'max': wmax,
+                'range': wmax - wmin, 'trend': trend, 'ewma': self.ewma[rows], 'last': self.last[rows]}
+
+    def snapshot(self):
+        """Current features of every stream as {'stream': names, feature: array}."""
+        with self._lock:
+            return dict(self._features(np.arange(len(self.names))), stream=list(self.names))
+
+    def features(self, stream):
+        """Features of one stream as a dict of floats, or None for an unknown stream."""
+        with self._lock:
+            i = self._ids.get(stream)
+            if i is None:
+                return None
+            row = self._features(np.array([i]))
+        return {name: float(row[name][0]) for name in FEATURES}
+
+    def per_stream(self):
+        """Features of every stream as {stream: features dict}, from one snapshot."""
+        snapshot = self.snapshot()
+        return {stream: {name: float(snapshot[name][i]) for name in FEATURES}
+                for i, stream in enumerate(snapshot['stream'])}
+
+    def as_struct(self, streams=None):
+        """
+        Flat {'mean_soil_moisture': ..., 'trend_ph': ...} dict as the MATLAB
+        detectors take it, for the given streams (default: all with readings).
+        """
+        snapshot = self.snapshot()
+        wanted = None if streams is None else set(streams)
+        out = {}
+        for i, stream in enumerate(snapshot['stream']):
+            if snapshot['count'][i] and (wanted is None or stream in wanted):
+                for name in STRUCT_FEATURES:
+                    out[f'{name}_{stream}'] = float(snapshot[name][i])
+        return out
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Tests for content-hash result artifacts and their cache headers.
+"""
+
+import os
+
+from artifact_store import ArtifactStore, file_digest
+
+
+def test_publish_dedupes_and_tracks_changes(tmp_path):
+    store = ArtifactStore(str(tmp_path / 'artifacts'))
+    a, b = tmp_path / 'ndvi_map.png', tmp_path / 'evi_map.png'
+    a.write_bytes(b'same')
+    b.write_bytes(b'same')
+    first = store.publish_all([str(a), str(b)])
+    digest = file_digest(str(a))[:16]
+    assert first == [f'ndvi_map.{digest}.png', f'evi_map.{digest}.png']
+    assert store.publish(str(a)) == first[0]
+
+    a.write_bytes(b'changed')
+    os.utime(a, ns=(1, 1))
+    changed = store.publish(str(a))
+    assert changed != first[0] and (tmp_path / 'artifacts' / changed).read_bytes() == b'changed'
+    # The old copy stays available within the retention period; the manifest survives a restart
+    assert store.resolve(first[0]) is not None
+    assert ArtifactStore(str(tmp_path / 'artifacts')).manifest['ndvi_map.png']['file'] == changed
+    assert store.resolve('ndvi_map.png') is None
+
+
+def test_hashed_results_are_immutable_and_conditional(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'ARTIFACTS', ArtifactStore(str(tmp_path / 'artifacts')))
+    source = tmp_path / 'crop_health_map.png'
+    source.write_bytes(b'\x89PNG fake')
+    url = app_module.publish_images(str(tmp_path), ['crop_health_map.png'])[0]
+    client = app_module.app.test_client()
+
+    response = client.get(url)
+    assert response.status_code == 200 and response.data == b'\x89PNG fake'
+    assert 'immutable' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert not etag.startswith('W/') and etag.strip('"') in url
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 304 and response.data == b''
+    assert client.get('/api/artifacts').get_json()['crop_health_map.png']['url'] == url
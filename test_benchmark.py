@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Tests for the benchmark harness and its baseline comparison.
+"""
+
+import csv
+
+import benchmark
+import results_model
+from run_history import RunHistory
+
+
+def test_measure_reports_percentiles_and_memory():
+    row = benchmark.measure('results_parsing_cold', 32, repeats=3, warmup=0)
+    assert row['case'] == 'results_parsing_cold' and row['size'] == 32 and row['repeats'] == 3
+    assert 0 < row['min_ms'] <= row['p50_ms'] <= row['p95_ms'] <= row['p99_ms'] <= row['max_ms']
+    assert row['peak_mem_mb'] > 0
+
+    chat = benchmark.measure('chat_result_id', 512, repeats=3, warmup=0)
+    assert chat['size'] is None  # not a raster case
+
+
+def test_compare_flags_regressions_and_target(tmp_path):
+    baseline = {'results': [{'case': 'demo_maps', 'size': 256, 'p95_ms': 100.0},
+                            {'case': 'chat_context', 'size': None, 'p95_ms': 0.01}]}
+    report = {'results': [{'case': 'demo_maps', 'size': 256, 'p95_ms': 140.0},
+                          {'case': 'chat_context', 'size': None, 'p95_ms': 0.05},  # below the noise floor
+                          {'case': 'numpy_backend', 'size': 512, 'p95_ms': 650.0}]}
+    problems = benchmark.compare(report, baseline, tolerance=0.25, target_ms=500)
+    assert len(problems) == 2
+    assert problems[0].startswith('demo_maps@256: p95 140.00 ms vs baseline 100.00 ms')
+    assert 'exceeds the 500 ms target' in problems[1]
+
+    row = dict.fromkeys(benchmark.FIELDS, 1)
+    benchmark.write_csv({'results': [row]}, str(tmp_path / 'bench.csv'))
+    with open(tmp_path / 'bench.csv', newline='') as f:
+        assert list(csv.DictReader(f))[0]['p95_ms'] == '1'
+
+
+def test_compare_matlab_uses_recorded_stage_times():
+    history = RunHistory(':memory:')
+    history.record(results_model.demo_result(), field='f', stages=[{'name': 'crop_health', 'duration': 2.0}])
+    reference = benchmark.matlab_reference(history, 'f')
+    assert reference == {'crop_health': 2000.0}
+    report = {'results': [{'case': 'crop_health', 'size': 256, 'p50_ms': 20.0},
+                          {'case': 'demo_maps', 'size': 256, 'p50_ms': 5.0}]}
+    assert benchmark.compare_matlab(report, reference) == [
+        'crop_health@256: Python p50 20.00 ms vs MATLAB 2000.00 ms (100.0x)']
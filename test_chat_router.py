@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Tests for the chat intent router and section index against the original regex chain.
+"""
+
+import app
+import bench_chat
+import chat_router
+
+
+def test_intent_priority_matches_keyword_chain():
+    assert chat_router.match_intent('Profit given the PEST risk?') == 'profit'
+    assert chat_router.match_intent('pest and soil') == 'soil'
+    assert chat_router.match_intent('Crop Health and recommendations') == 'crop_health'
+    assert chat_router.match_intent('pests?') == 'pest'
+    assert chat_router.match_intent('hello') is None
+
+
+def test_replies_match_original_implementation(tmp_path):
+    demo = app.generate_demo_results(str(tmp_path), size=8)
+    contexts = [
+        demo,
+        demo + '\nOverall Crop Health Status: Poor\nOverall Pest Risk Level: High\n',
+        demo.split('PEST RISK ANALYSIS')[0],  # truncated: pest and recommendations missing
+        'MATLAB script output without sections',
+        '',
+    ]
+    messages = bench_chat.MESSAGES + ('SOIL', 'pest recommendations', 'crop health profit')
+    for context in contexts:
+        for message in messages:
+            expected = bench_chat.legacy_response(message, context)
+            if not context and 'profit' in message.lower():
+                expected = ('I can only calculate potential profit after an analysis has been run. '
+                            'Please run the analysis first.')
+            assert app.get_ai_response(message, context) == expected, (message, context[:40])
+
+
+def test_section_index_is_built_once_per_text(tmp_path):
+    context = app.generate_demo_results(str(tmp_path), size=8)
+    app.SECTION_INDEXES.clear()
+    app.get_ai_response('soil', context)
+    app.get_ai_response('pest', context)
+    assert len(app.SECTION_INDEXES) == 1
+    index = app.SECTION_INDEXES.get(context)
+    start, end = index.offsets['soil']
+    assert context[start:end].startswith('Overall Health: Good (Score: 0.81)')
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Tests for the lookup-table colormaps.
+"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import colormaps
+
+
+def test_jet_image_matches_scalar_palette():
+    gray = Image.fromarray(np.arange(256, dtype=np.uint8).reshape(16, 16), 'L')
+    out = np.asarray(colormaps.get_colormap('jet').apply_image(gray))
+    for level in range(256):
+        r, g, b = (float(c) for c in colormaps.jet_channels(level / 255.0))
+        expected = [int(r * 255), int(g * 255), int(b * 255)]
+        assert out[level // 16, level % 16].tolist() == expected
+
+
+def test_float_raster_uses_full_range_and_masks_nan():
+    ndvi = np.array([[-1.0, 0.0, 1.0, np.nan]], dtype=np.float32)
+    rgb = colormaps.colorize(ndvi, 'jet', vmin=-1, vmax=1)
+    assert rgb.shape == (1, 4, 3)
+    assert rgb[0, 0].tolist() == [0, 0, 255]
+    assert rgb[0, 2].tolist() == [255, 0, 0]
+    assert rgb[0, 3].tolist() == [0, 0, 0]
+
+
+def test_unknown_colormap_is_rejected():
+    with pytest.raises(ValueError, match='viridis'):
+        colormaps.Colormap('viridis')
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy crop health analysis against the saved MATLAB results.
+"""
+
+import glob
+import os
+
+import numpy as np
+import pytest
+import scipy.io
+
+import crop_health
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SAVED = sorted(glob.glob(os.path.join(BASE_DIR, 'crop_health_2*.mat')))
+
+
+@pytest.mark.parametrize('path', SAVED, ids=os.path.basename)
+def test_matches_saved_matlab_results(path):
+    saved = scipy.io.loadmat(path, squeeze_me=True, struct_as_record=False)['crop_health']
+    # The saved index maps are the analyzer's inputs (ndwi/ci are not saved)
+    ours = crop_health.analyze_health({name: getattr(saved, f'{name}_map') for name in crop_health.THRESHOLDS})
+
+    assert ours['image_size'] == list(saved.image_size)
+    for name in crop_health.THRESHOLDS:
+        theirs = getattr(saved, f'{name}_analysis')
+        for field in theirs._fieldnames:
+            expected = getattr(theirs, field)
+            if isinstance(expected, str):
+                assert ours[f'{name}_analysis'][field] == expected, (name, field)
+            else:
+                assert ours[f'{name}_analysis'][field] == pytest.approx(expected, rel=1e-12), (name, field)
+    assert ours['overall_health']['score'] == pytest.approx(saved.overall_health.score.tolist())
+    assert ours['overall_health']['status'] == saved.overall_health.status
+    assert ours['overall_health']['confidence'] == pytest.approx(saved.overall_health.confidence)
+    assert ours['stress_patterns']['nutrient_stress_percentage'] == pytest.approx(
+        saved.stress_patterns.nutrient_stress_percentage)
+
+    spatial = saved.anomalies.spatial_anomalies
+    assert ours['anomalies']['ndvi_outliers_percentage'] == pytest.approx(saved.anomalies.ndvi_outliers_percentage)
+    assert ours['anomalies']['spatial_anomalies']['anomaly_percentage'] == pytest.approx(spatial.anomaly_percentage)
+    assert ours['anomalies']['spatial_anomalies']['anomaly_locations'] == np.atleast_1d(
+        spatial.anomaly_locations).tolist()
+    assert np.array_equal(ours['health_map']['data'], saved.health_map.data)
+    assert np.array_equal(ours['health_map']['rgb'], saved.health_map.rgb * 255)
+
+
+def test_overall_health_keeps_the_matlab_vector_score():
+    analyses = {name: {'health_score': score} for name, score in
+                zip(crop_health.THRESHOLDS, [0.6, 0.6, 0.2, 0.6, 0.2])}
+    overall = crop_health.overall_health(analyses)
+    assert overall['score'] == pytest.approx([0.66, 0.55, 0.44, 0.33, 0.22])
+    assert overall['status'] == 'Poor'  # 0.22 >= 0.2 is the only level every element reaches
+    assert overall['weighted_score'] == pytest.approx(0.48)
+
+
+def test_histogram_and_classes():
+    values = np.array([-3.0, -1.0, 0.0, 0.25, 0.3, 0.6, 0.95, 1.0, 4.0])
+    counts = crop_health.histogram(values, bins=4)['counts']
+    assert counts == [2, 0, 3, 4]
+    assert crop_health.health_classes(values, 0.6, 0.3).tolist() == [0, 0, 0, 0, 1, 2, 2, 2, 2]
+
+
+def test_numpy_backend_runs_the_full_analysis(numpy_app):
+    payload = numpy_app.run_analysis()
+
+    assert 'error' not in payload
+    assert 'Based on Python analysis results:' in payload['output']
+    assert any('crop_health_map' in url for url in payload['images'])
+    assert any('pest_risk_score_map' in url for url in payload['images'])
+    summary = payload['summary']
+    assert summary['source'] == 'numpy'
+    assert set(summary['indices']) == set(crop_health.THRESHOLDS)
+    assert summary['soil']['status'] == 'Excellent'  # sensor_data.mat scores 0.82, as in the saved MATLAB report
+    assert set(summary['pest']['pests']) == {'aphids', 'whiteflies', 'thrips', 'spider_mites', 'caterpillars'}
+    assert summary['pest']['level'] in ('Low', 'Medium', 'High')
+    assert 'Risk Level: N/A' not in payload['output']
+
+
+def test_failed_matlab_run_falls_back_to_numpy(numpy_app, monkeypatch):
+    app_module = numpy_app
+    monkeypatch.setenv('MATLAB_CMD', 'false')
+    monkeypatch.setattr(app_module, 'ANALYSIS_BACKEND', 'matlab')
+    payload = app_module.run_analysis()
+    assert 'MATLAB script execution failed' in payload['warning']
+    assert payload['summary']['source'] == 'numpy'
+
+    monkeypatch.setattr(app_module, 'ANALYSIS_FALLBACK', 'none')
+    assert app_module.run_analysis()['error'] == 'MATLAB script execution failed.'
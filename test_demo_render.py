@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Parity tests for the array-backed demo map renderer.
+
+The reference functions below are the original per-pixel loops from
+generate_demo_results, run on small rasters so the comparison stays fast.
+"""
+
+import math
+import os
+import random
+
+import numpy as np
+
+import demo_render
+
+
+def reference_colormap(name, seed, w, h):
+    rnd = random.Random(seed)
+    out = np.zeros((h, w, 3), dtype=np.uint8)
+    for y in range(h):
+        for x in range(w):
+            field_x = (x // 32) * 32 + 16
+            field_y = (y // 32) * 32 + 16
+            base_val = 0.3 + 0.4 * (field_x + field_y) / (w + h)
+            if name in ['ndvi_map', 'gndvi_map', 'ndre_map']:
+                row_pattern = 0.1 * abs(math.sin(y * 0.2)) if y % 8 < 4 else 0
+                base_val += row_pattern
+                if base_val > 0.6:
+                    color = (int(50 + base_val * 100), int(150 + base_val * 105), 50)
+                else:
+                    color = (int(150 + base_val * 105), int(100 + base_val * 100), 50)
+            elif name == 'soil_condition_map':
+                base_val += 0.1 * rnd.random()
+                color = (int(139 - base_val * 100), int(69 + base_val * 100), int(19 + base_val * 200))
+            elif name in ['evi_map', 'savi_map']:
+                base_val = base_val * 0.8 + 0.1
+                color = (int(34 + base_val * 150), int(139 + base_val * 116), int(34 + base_val * 50))
+            else:
+                risk_val = base_val + 0.2 * rnd.random()
+                if risk_val < 0.4:
+                    color = (50, int(100 + risk_val * 200), 200)
+                elif risk_val < 0.7:
+                    color = (int(100 + risk_val * 155), int(150 + risk_val * 105), 100)
+                else:
+                    color = (int(150 + risk_val * 105), int(50 + risk_val * 50), 50)
+            out[y, x] = [max(0, min(255, c)) for c in color]
+    return out
+
+
+def reference_discrete(name, w, h):
+    rnd = random.Random(42)
+    out = np.zeros((h, w, 3), dtype=np.uint8)
+    for y in range(h):
+        for x in range(w):
+            patch_x = (x // 40) * 40
+            patch_y = (y // 40) * 40
+            patch_val = ((patch_x + patch_y) % 120) / 120.0 + 0.1 * rnd.random()
+            palette = demo_render.DISCRETE_PALETTES[name]
+            if patch_val < 0.33:
+                color = palette[0]
+            elif patch_val < 0.66:
+                color = palette[1]
+            else:
+                color = palette[2]
+            texture = rnd.randint(-20, 20)
+            out[y, x] = [max(0, min(255, c + texture)) for c in color]
+    return out
+
+
+def test_seeded_random_matches_stdlib():
+    rnd = random.Random(7)
+    expected = [rnd.random() for _ in range(1000)]
+    assert demo_render.seeded_random(7, 1000).tolist() == expected
+
+
+def test_colormaps_match_reference():
+    for name, kind, seed in demo_render.DEMO_MAPS:
+        if kind == 'colormap':
+            rendered = demo_render.render_colormap(name, seed, 70, 50)
+            assert np.array_equal(rendered, reference_colormap(name, seed, 70, 50)), name
+
+
+def test_discrete_maps_match_reference():
+    for name in demo_render.DISCRETE_PALETTES:
+        rendered = demo_render.render_discrete(name, 42, 90, 60)
+        assert np.array_equal(rendered, reference_discrete(name, 90, 60)), name
+
+
+
+def test_pool_rendering_matches_serial(tmp_path):
+    (tmp_path / 'serial').mkdir()
+    (tmp_path / 'pooled').mkdir()
+    serial = demo_render.render_demo_maps(str(tmp_path / 'serial'), 48, workers=0)
+    pooled = demo_render.render_demo_maps(str(tmp_path / 'pooled'), 48, workers=3)
+    assert [os.path.basename(p) for p in pooled] == [f'{name}.png' for name, _, _ in demo_render.DEMO_MAPS]
+    for a, b in zip(serial, pooled):
+        with open(a, 'rb') as fa, open(b, 'rb') as fb:
+            assert fa.read() == fb.read()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the background analysis job queue.
+"""
+
+import threading
+import time
+
+import pytest
+
+from jobs import FAILED, SUCCEEDED, JobManager, JobQueueFull
+
+
+def test_job_streams_lines_then_result():
+    manager = JobManager(max_workers=1)
+
+    def analysis(emit):
+        emit('Processing multispectral data...\n')
+        emit('Analyzing crop health...')
+        return {'output': 'ok'}
+
+    job = manager.submit('demo', analysis)
+    events = list(job.events())
+    lines = [data['text'] for event, data in events if event == 'line']
+    assert lines == ['Processing multispectral data...', 'Analyzing crop health...']
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['result'] == {'output': 'ok'}
+    assert job.state == SUCCEEDED
+    assert manager.get(job.id).to_dict(since=1)['lines'] == ['Analyzing crop health...']
+
+
+def test_error_payload_and_exception_mark_job_failed():
+    manager = JobManager(max_workers=1)
+    errored = manager.submit('matlab', lambda emit: {'error': 'MATLAB script execution failed.'})
+    raised = manager.submit('matlab', lambda emit: 1 / 0)
+    assert errored.join(5) and raised.join(5)
+    assert errored.state == FAILED and errored.error == 'MATLAB script execution failed.'
+    assert raised.state == FAILED and 'division' in raised.result['error']
+
+
+def test_submit_rejects_when_queue_is_full():
+    manager = JobManager(max_workers=1, max_pending=1)
+    release = threading.Event()
+    blocking = manager.submit('demo', lambda emit: release.wait(5) and {})
+    with pytest.raises(JobQueueFull):
+        manager.submit('demo', lambda emit: {})
+    release.set()
+    assert blocking.join(5)
+    assert manager.submit('demo', lambda emit: {}).join(5)
+
+
+def test_stage_markers_produce_timed_stage_events():
+    manager = JobManager(max_workers=1, stage_markers={'Loading input data...': 'load',
+                                                      'Analyzing crop health...': 'crop'})
+
+    def analysis(emit):
+        emit('Loading input data...\n')
+        emit('Loaded 256x256x8')
+        time.sleep(0.05)
+        emit('Analyzing crop health...')
+        return {'output': 'ok'}
+
+    job = manager.submit('matlab', analysis)
+    events = [(event, data) for event, data in job.events() if event in ('line', 'stage')]
+    kinds = [(event, data.get('event'), data.get('name')) for event, data in events]
+    assert kinds == [
+        ('stage', 'start', 'load'), ('line', None, None), ('line', None, None),
+        ('stage', 'end', 'load'), ('stage', 'start', 'crop'), ('line', None, None),
+        ('stage', 'end', 'crop'),
+    ]
+    assert events[3][1]['duration'] >= 0.05
+    assert all('time' in data for event, data in events if event == 'line')
+
+    stages = job.to_dict()['stages']
+    assert [s['name'] for s in stages] == ['load', 'crop']
+    assert all(s['duration'] is not None for s in stages)
+    # Resuming a stream mid-job replays only what follows
+    resumed = [data['name'] for event, data in job.events(since=2) if event == 'stage']
+    assert resumed == ['load', 'crop', 'crop']
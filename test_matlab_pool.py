@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Tests for the warm MATLAB session pool, using a fake-MATLAB REPL stub.
+"""
+
+import sys
+import textwrap
+
+import pytest
+
+import matlab_pool
+
+FAKE_MATLAB = textwrap.dedent('''
+    import sys
+    runs = 0
+    for command in sys.stdin:
+        if 'exit' == command.strip():
+            break
+        if '__POOL_PING__' in command:
+            print('__POOL_PING__', flush=True)
+        elif 'runWarmAnalysis' in command:
+            runs += 1
+            print('Processing multispectral data...')
+            print('Analyzing crop health...')
+            if 'fail' in sys.argv:
+                print('Error using main: boom')
+                print('__POOL_DONE__ 1', flush=True)
+            elif 'hang' in sys.argv:
+                sys.stdout.flush()
+            else:
+                print(f'run {runs} completed')
+                print('__POOL_DONE__ 0', flush=True)
+''')
+
+
+@pytest.fixture
+def fake_matlab(tmp_path):
+    script = tmp_path / 'fake_matlab.py'
+    script.write_text(FAKE_MATLAB)
+
+    def factory(*flags):
+        command = ' '.join([sys.executable, str(script), *flags])
+        return lambda: matlab_pool.ProcessSession(command, str(tmp_path), startup_timeout=10)
+    return factory
+
+
+def test_sessions_are_reused_and_recycled(fake_matlab):
+    pool = matlab_pool.MatlabPool(fake_matlab(), size=1, max_jobs=2)
+    lines = []
+    outputs = [pool.run(lines.append, timeout=10) for _ in range(3)]
+    pool.close()
+
+    assert [code for code, _ in outputs] == [0, 0, 0]
+    # Second run reused the warm session; the third ran on a recycled one
+    assert 'run 2 completed' in outputs[1][1]
+    assert 'run 1 completed' in outputs[2][1]
+    assert pool.stats['started'] == 2 and pool.stats['recycled'] == 1
+    assert lines[:2] == ['Processing multispectral data...', 'Analyzing crop health...']
+
+
+def test_failed_analysis_returns_nonzero_status(fake_matlab):
+    pool = matlab_pool.MatlabPool(fake_matlab('fail'), size=1)
+    returncode, output = pool.run(lambda line: None, timeout=10)
+    pool.close()
+    assert returncode == 1
+    assert 'boom' in output
+
+
+def test_hung_session_times_out_and_is_replaced(fake_matlab):
+    pool = matlab_pool.MatlabPool(fake_matlab('hang'), size=1)
+    with pytest.raises(matlab_pool.SessionError, match='timed out'):
+        pool.run(lambda line: None, timeout=0.5)
+    with pytest.raises(matlab_pool.SessionError):
+        pool.run(lambda line: None, timeout=0.5)
+    pool.close()
+    assert pool.stats['started'] == 2
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the metrics registry and the /metrics endpoint.
+"""
+
+import time
+
+import metrics
+from artifact_store import ArtifactStore
+from run_history import RunHistory
+
+
+def test_histogram_buckets_and_exposition():
+    registry = metrics.Registry()
+    latency = registry.histogram('step_seconds', 'Step latency.', ('step',), buckets=(0.1, 1))
+    latency.observe(0.05, 'load')
+    latency.observe(0.1, 'load')  # upper bounds are inclusive
+    latency.observe(3, 'load')
+    registry.counter('runs_total', 'Runs.').inc(amount=2)
+    registry.collector('cache_bytes', 'gauge', 'Cache size.', ('cache',), lambda: {('results',): 512})
+
+    assert latency.snapshot('load') == ([2, 2, 3], 3.15, 3)
+    text = registry.render()
+    assert '# TYPE step_seconds histogram' in text
+    assert 'step_seconds_bucket{step="load",le="0.1"} 2' in text
+    assert 'step_seconds_bucket{step="load",le="+Inf"} 3' in text
+    assert 'step_seconds_count{step="load"} 3' in text
+    assert 'runs_total 2' in text
+    assert 'cache_bytes{cache="results"} 512' in text
+
+
+def test_disabled_metrics_record_nothing(monkeypatch):
+    monkeypatch.setattr(metrics, 'ENABLED', False)
+    histogram = metrics.Histogram('h', 'Help.', ('op',))
+    with histogram.time('chat'):
+        pass
+    histogram.observe(1.0, 'chat')
+    counter = metrics.Counter('c', 'Help.')
+    counter.inc()
+    assert histogram.samples() == [] and counter.value() == 0
+
+
+def test_metrics_endpoint_reports_jobs_and_chat(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setenv('DEMO_MODE', '1')
+    monkeypatch.setattr(app_module, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'ARTIFACTS', ArtifactStore(str(tmp_path / 'artifacts')))
+    monkeypatch.setattr(app_module, 'HISTORY', RunHistory(':memory:'))
+    monkeypatch.setenv('DEMO_MAP_SIZE', '8')
+    monkeypatch.setenv('DEMO_RENDER_WORKERS', '1')
+    client = app_module.app.test_client()
+
+    result_id = client.post('/run-matlab').get_json()['result_id']
+    client.post('/chat', json={'message': 'soil?', 'result_id': result_id})
+    client.post('/chat', json={'message': 'soil?', 'result_id': result_id})
+
+    # The job hook runs right after the job is marked finished
+    deadline = time.time() + 5
+    while app_module.ANALYSIS_STAGE_SECONDS.snapshot('demo', 'demo_maps')[2] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    assert 'analysis_stage_seconds_count{backend="demo",stage="demo_maps"}' in text
+    assert 'request_step_seconds_count{operation="generate_demo_results",step="render_maps"}' in text
+    assert 'request_step_seconds_count{operation="chat",step="reply_by_result_id"}' in text
+    assert 'cache_requests_total{cache="chat_replies",result="hit"}' in text
+    assert app_module.CHAT_REPLIES.stats['hits'] >= 1
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched pest risk engine.
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+import pest_risk
+from pest_risk import PestRiskEngine, PestRuleError
+
+
+def calculate_pest_risk(index1, index2, threshold1, threshold2):
+    # PestRiskDetector.calculatePestRisk
+    risk1 = max(0, (threshold1 - index1.mean()) / threshold1)
+    risk2 = max(0, (threshold2 - index2.mean()) / threshold2)
+    return (risk1 + risk2) / 2
+
+
+def random_indices(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    return {name: rng.uniform(-0.2, 0.6, shape).astype(np.float32)
+            for name in ('ndvi', 'gndvi', 'ndre', 'savi', 'ndwi', 'ci')}
+
+
+def test_matches_the_per_pest_detectors():
+    indices = random_indices((37, 53))
+    detection = PestRiskEngine(chunk_pixels=100).evaluate(indices)  # several chunks, last one partial
+
+    for rule in pest_risk.DEFAULT_RULES:
+        (first, t1), (second, t2) = rule['terms']
+        info = detection[pest_risk.field_name(rule['name'])]
+        a, b = indices[first].astype(np.float64), indices[second].astype(np.float64)
+        assert info['risk_score'] == pytest.approx(calculate_pest_risk(a, b, t1, t2), abs=1e-12)
+        assert info['affected_area_percentage'] == pytest.approx((a < t1).mean() * 100)
+        assert info['status'] == pest_risk.risk_status(info['risk_score'])
+        per_pixel = (np.maximum(0, (t1 - a) / t1) + np.maximum(0, (t2 - b) / t2)) / 2
+        np.testing.assert_allclose(info['risk_map'], per_pixel, atol=1e-6)
+        assert info['risk_map'].shape == (37, 53)
+
+    scores = [detection[pest_risk.field_name(rule['name'])]['risk_score'] for rule in pest_risk.DEFAULT_RULES]
+    presence = detection['overall_pest_presence']
+    assert presence['max_risk'] == pytest.approx(max(scores))
+    assert presence['mean_risk'] == pytest.approx(np.mean(scores))
+
+
+def generate_risk_map(indices, cube):
+    # PestRiskDetector.generateRiskMap, calculateSpectralAnomalies pixel by pixel
+    stress = sum(np.maximum(0, (t - indices[name].astype(np.float64)) / t)
+                 for name, t in (('ndvi', 0.35), ('gndvi', 0.30), ('ndre', 0.20))) / 3
+    reference = cube.reshape(-1, cube.shape[2]).mean(axis=0)
+    anomaly = np.zeros(cube.shape[:2])
+    for i in range(cube.shape[0]):
+        for j in range(cube.shape[1]):
+            pixel = cube[i, j].astype(np.float64)
+            if np.linalg.norm(pixel) > 0:
+                anomaly[i, j] = 1 - pixel @ reference / (np.linalg.norm(pixel) * np.linalg.norm(reference))
+    moisture = np.clip((indices['ndwi'] + 0.1) / 0.4, 0, 1)
+    light = np.clip((0.3 - cube[:, :, :3].mean(axis=2)) / 0.3, 0, 1)
+    return np.clip(0.4 * stress + 0.2 * np.clip(anomaly, 0, 1) + 0.2 * moisture + 0.2 * light, 0, 1)
+
+
+def test_risk_map_matches_generate_risk_map():
+    indices = random_indices((20, 30), seed=2)
+    cube = np.random.default_rng(3).uniform(0, 0.5, (20, 30, 8)).astype(np.float32)
+    cube[0, 0] = 0  # no spectrum, no anomaly
+    pest_risks = PestRiskEngine().analyze(indices, cube)
+
+    risk_map = pest_risks['risk_map']
+    np.testing.assert_allclose(risk_map['score'], generate_risk_map(indices, cube), atol=1e-5)
+    levels = np.where(risk_map['score'] >= 0.8, 3, np.where(risk_map['score'] >= 0.6, 2, 1))
+    np.testing.assert_array_equal(risk_map['data'], levels)
+    assert set(np.unique(risk_map['data'])) > {1}
+    assert risk_map['rgb'][risk_map['data'] == 2].tolist()[0] == [255, 255, 0]
+    assert pest_risk.spectral_anomalies(cube)[0, 0] == 0
+    assert 'risk_map' not in pest_risks['pest_detection']['aphids']
+
+
+def test_overall_risk_matches_calculate_overall_risk():
+    indices = random_indices((16, 16), seed=4)
+    cube = np.full((16, 16, 8), 0.1, dtype=np.float32)  # dim (light risk 0.8), 21 C (temperature risk 0.8)
+    indices['ndwi'][...] = 0.2  # humidity 56% (0.3), high moisture (0.7)
+    indices['ndvi'][...] = 0.7
+    indices['gndvi'][...] = 0.3
+    indices['ndre'][...] = 0.1
+    pest_risks = PestRiskEngine().analyze(indices, cube)
+
+    stress = pest_risks['spectral_analysis']['stress_indicators']
+    assert (stress['ndvi_stress'], stress['gndvi_stress'], stress['ndre_stress']) == (0.2, 0.6, 1.0)
+    environmental = pest_risks['environmental_analysis']['overall_risk']['score']
+    assert environmental == pytest.approx(0.3 * 0.8 + 0.3 * 0.3 + 0.2 * 0.7 + 0.2 * 0.8)
+    scores = [0.6, environmental, pest_risks['pest_detection']['overall_pest_presence']['mean_risk']]
+    overall = pest_risks['overall_risk']
+    assert overall['score'] == pytest.approx(0.3 * scores[0] + 0.3 * scores[1] + 0.4 * scores[2])
+    assert overall['confidence'] == pytest.approx(1 - np.std(scores, ddof=1) / np.mean(scores))
+    assert pest_risk.risk_level(0.8) == 'High'
+    assert pest_risk.risk_level(0.6) == 'Medium'
+    assert pest_risk.risk_level(0.59) == 'Low'
+
+
+def test_status_thresholds_are_strict():
+    assert pest_risk.risk_status(0.6) == 'Medium Risk'
+    assert pest_risk.risk_status(0.3) == 'Low Risk'
+    assert pest_risk.overall_presence([0.61, 0.0])['status'] == 'High Pest Pressure'
+    assert pest_risk.overall_presence([0.5, 0.2])['status'] == 'Medium Pest Pressure'
+    assert pest_risk.overall_presence([0.5, 0.2])['high_risk_pests'] == 0
+
+
+def test_rules_from_config(tmp_path):
+    path = tmp_path / 'pests.json'
+    path.write_text(json.dumps([
+        {'name': 'Leafhoppers', 'terms': [['ndre', 0.25], ['ci', 0.2], ['ndvi', 0.5]], 'confidence': 0.4},
+        {'name': 'Aphids', 'terms': [['ndvi', 0.5]], 'affected': ['gndvi', 0.1], 'confidence': 0.9},
+    ]))
+    rules = pest_risk.load_rules(str(path))
+    assert [rule['name'] for rule in rules] == ['Aphids', 'Whiteflies', 'Thrips', 'Spider Mites',
+                                                 'Caterpillars', 'Leafhoppers']
+
+    indices = random_indices((16, 16), seed=1)
+    detection = PestRiskEngine(rules).evaluate(indices, include_maps=False)
+    ndre, ci, ndvi = (indices[name].astype(np.float64).mean() for name in ('ndre', 'ci', 'ndvi'))
+    expected = (max(0, 1 - ndre / 0.25) + max(0, 1 - ci / 0.2) + max(0, 1 - ndvi / 0.5)) / 3
+    assert detection['leafhoppers']['risk_score'] == pytest.approx(expected)
+    assert detection['aphids']['risk_score'] == pytest.approx(max(0, 1 - ndvi / 0.5))
+    assert detection['aphids']['affected_area_percentage'] == pytest.approx((indices['gndvi'] < 0.1).mean() * 100)
+    assert 'risk_map' not in detection['aphids']
+
+    with pytest.raises(PestRuleError):
+        pest_risk.check_rule({'name': 'Bad', 'terms': [['nope', 0.3]]})
+    with pytest.raises(PestRuleError):
+        pest_risk.check_rule({'name': 'Bad', 'terms': [['ndvi', 0]]})
+    with pytest.raises(PestRuleError):
+        pest_risk.check_rule({'name': 'Bad'})
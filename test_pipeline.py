@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the DAG pipeline runner.
+"""
+
+import threading
+
+import numpy as np
+import pytest
+
+from pipeline import Pipeline, PipelineError, Stage, StageError
+
+
+def test_independent_stages_run_concurrently_on_shared_results():
+    raster = np.zeros((4, 4))
+    barrier = threading.Barrier(3, timeout=5)
+    seen = {}
+
+    def analyzer(name):
+        def run(shared):
+            seen[name] = shared
+            barrier.wait()  # only returns once all three analyzers are running
+            return name
+        return run
+
+    messages = []
+    results = Pipeline([
+        Stage('load', lambda: raster, message='Loading'),
+        Stage('crop', analyzer('crop'), ['load'], message='Analyzing'),
+        Stage('soil', analyzer('soil'), ['load']),
+        Stage('pest', analyzer('pest'), ['load']),
+        Stage('report', lambda *names: names, ['crop', 'soil', 'pest'], message='Reporting'),
+    ]).run(workers=3, emit=messages.append)
+
+    assert results['report'] == ('crop', 'soil', 'pest')
+    assert all(shared is raster for shared in seen.values())  # passed by reference
+    assert messages == ['Loading', 'Analyzing', 'Reporting']
+
+
+def test_single_worker_runs_in_topological_order():
+    order = []
+    pipeline = Pipeline([
+        Stage('report', lambda a, b: order.append('report'), ['a', 'b']),
+        Stage('b', lambda x: order.append('b'), ['x']),
+        Stage('a', lambda x: order.append('a'), ['x']),
+        Stage('x', lambda: order.append('x')),
+    ])
+    pipeline.run(workers=1)
+    assert order == ['x', 'a', 'b', 'report']  # dependencies first, in deps order
+    assert set(pipeline.durations) == {'x', 'a', 'b', 'report'}
+
+
+def test_invalid_graphs():
+    with pytest.raises(PipelineError, match="Stage cycle"):
+        Pipeline([Stage('a', None, ['b']), Stage('b', None, ['a'])])
+    with pytest.raises(PipelineError, match='unknown stage'):
+        Pipeline([Stage('a', None, ['missing'])])
+    with pytest.raises(PipelineError, match='Duplicate'):
+        Pipeline([Stage('a', None), Stage('a', None)])
+
+
+def test_failed_stage_skips_dependents():
+    ran = []
+
+    def fail():
+        raise ValueError('bad cube')
+
+    pipeline = Pipeline([
+        Stage('load', fail),
+        Stage('analyze', lambda cube: ran.append('analyze'), ['load']),
+    ])
+    with pytest.raises(StageError, match='load stage failed: bad cube') as info:
+        pipeline.run()
+    assert info.value.stage == 'load' and isinstance(info.value.__cause__, ValueError)
+    assert ran == []
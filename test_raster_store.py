@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the memory-mapped raster store and its .mat converter.
+"""
+
+import io
+import os
+import threading
+
+import numpy as np
+import scipy.io
+
+import raster_store
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CUBE_PATH = os.path.join(BASE_DIR, 'multispectral_data.mat')
+CROP_HEALTH_PATH = os.path.join(BASE_DIR, 'crop_health_20250925_225918.mat')
+
+
+def test_cube_is_band_major_and_memory_mapped(tmp_path):
+    store = raster_store.RasterStore(str(tmp_path))
+    dataset = store.convert(CUBE_PATH)
+    cube = scipy.io.loadmat(CUBE_PATH)['multispectral_data']
+
+    assert isinstance(dataset.array('multispectral_data'), np.memmap)
+    assert dataset.array('multispectral_data').shape == (8, 256, 256)
+    assert np.array_equal(dataset.raster('multispectral_data'), cube)
+    assert np.array_equal(dataset.band('multispectral_data', 3), cube[:, :, 3])
+    window = dataset.window('multispectral_data', 10, 20, 30, 35, bands=[0, 4])
+    assert np.array_equal(window, cube[10:20, 30:35][:, :, [0, 4]])
+
+
+def test_struct_fields_become_attrs_and_rasters(tmp_path):
+    dataset = raster_store.RasterStore(str(tmp_path)).convert(CROP_HEALTH_PATH)
+    crop_health = scipy.io.loadmat(CROP_HEALTH_PATH)['crop_health'][0, 0]
+
+    attrs = dataset.attrs['crop_health']
+    assert attrs['overall_health']['status'] == crop_health['overall_health'][0, 0]['status'][0]
+    assert attrs['ndvi_analysis']['mean'] == crop_health['ndvi_analysis'][0, 0]['mean'][0, 0]
+    assert attrs['image_size'] == [256, 256]
+    assert attrs['timestamp'] is None  # MATLAB datetime objects are not decodable
+    assert attrs['ndvi_map'] == {'$raster': 'crop_health/ndvi_map'}
+    assert np.array_equal(dataset.band('crop_health/ndvi_map', 0), crop_health['ndvi_map'])
+
+
+def test_convert_is_skipped_until_source_changes(tmp_path):
+    source = tmp_path / 'maps.mat'
+    scipy.io.savemat(source, {'ndvi_map': np.eye(16)})
+    store = raster_store.RasterStore(str(tmp_path / 'store'))
+    first = store.convert(str(source))
+    assert store.is_current('maps', str(source))
+    meta_size = os.path.getsize(tmp_path / 'store' / 'maps' / raster_store.META_FILE)
+    assert first.bytes_read == os.path.getsize(source) + meta_size
+    assert store.convert(str(source)).bytes_read == meta_size  # current: only meta.json is read
+
+    scipy.io.savemat(source, {'ndvi_map': 2 * np.eye(16), 'note': 'updated'})
+    os.utime(source, ns=(0, 0))
+    assert not store.is_current('maps', str(source))
+    dataset = store.convert(str(source))
+    assert dataset.band('ndvi_map', 0)[0, 0] == 2 and dataset.attrs['note'] == 'updated'
+    assert store.names() == ['maps']
+
+
+def test_concurrent_converts_and_rewrites_never_hide_the_dataset(tmp_path):
+    source = tmp_path / 'maps.mat'
+    scipy.io.savemat(source, {'ndvi_map': np.eye(16)})
+    store = raster_store.RasterStore(str(tmp_path / 'store'))
+    store.convert(str(source))
+    old = store.open('maps').array('ndvi_map')
+    errors = []
+
+    def run(task):
+        try:
+            for _ in range(20):
+                task()
+        except Exception as e:
+            errors.append(e)
+
+    tasks = [lambda: store.convert(str(source)), lambda: store.convert(str(source)),
+             lambda: store.write('maps', {'ndvi_map': np.eye(16)}),
+             lambda: store.open('maps').array('ndvi_map')]
+    threads = [threading.Thread(target=run, args=(task,)) for task in tasks]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert store.names() == ['maps'] and sorted(os.listdir(tmp_path / 'store')) == ['maps']
+    assert old[0, 0] == 1  # maps opened from a replaced version stay readable
+
+
+def test_raster_endpoint_serves_windows(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'RASTERS', raster_store.RasterStore(str(tmp_path)))
+    app_module.RASTERS.convert(CUBE_PATH, name='cube')
+    client = app_module.app.test_client()
+
+    data = client.get('/api/rasters/cube/multispectral_data?band=2&window=0,4,5,8').get_json()
+    cube = scipy.io.loadmat(CUBE_PATH)['multispectral_data']
+    assert np.array_equal(np.array(data['values']), cube[0:4, 5:8, 2])
+
+    raw = client.get('/api/rasters/cube/multispectral_data?format=npy').data
+    assert np.array_equal(np.load(io.BytesIO(raw)), cube)
+
+    assert client.get('/api/rasters/cube/multispectral_data').status_code == 413
+    assert client.get('/api/rasters/cube/multispectral_data?window=0,999,0,1').status_code == 400
+    assert client.get('/api/rasters/cube/missing').status_code == 404
+    assert client.get('/api/rasters/..').status_code == 404
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for the parsed-results LRU cache and its use in process_matlab_results.
+"""
+
+import os
+
+import numpy as np
+import scipy.io
+
+import raster_store
+from artifact_store import ArtifactStore
+from result_cache import ResultCache, estimate_size
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_lru_eviction_by_count_and_bytes():
+    cache = ResultCache(max_entries=2, max_bytes=100)
+    cache.put('a', 1, size=10)
+    cache.put('b', 2, size=10)
+    assert cache.get('a') == 1  # 'b' is now least recently used
+    cache.put('c', 3, size=10)
+    assert cache.get('b') is None and len(cache) == 2
+
+    cache.put('d', 4, size=95)  # over the byte cap: evicts until it fits
+    assert cache.get('d') == 4 and len(cache) == 1 and cache.bytes == 95
+    cache.put('huge', 5, size=1000)  # larger than the cap: never stored
+    assert cache.get('huge') is None and cache.get('d') == 4
+    assert cache.stats['evictions'] == 3
+
+
+def test_estimate_size_counts_arrays():
+    assert estimate_size({'map': np.zeros(1000)}) > 8000
+
+
+def test_process_matlab_results_is_cached_until_file_changes(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(app_module, 'RASTERS', raster_store.RasterStore(str(tmp_path / 'store')))
+    monkeypatch.setattr(app_module, 'RESULTS_CACHE', ResultCache())
+    monkeypatch.setattr(app_module, 'ARTIFACTS', ArtifactStore(str(tmp_path / 'artifacts')))
+    crop_health = scipy.io.loadmat(os.path.join(BASE_DIR, 'crop_health_20250925_225918.mat'))['crop_health']
+    os.makedirs('results')
+    path = os.path.join('results', 'combined_results_1.mat')
+    scipy.io.savemat(path, {'combined_results': {'crop_health': crop_health[0, 0]}})
+
+    output, images, struct = app_module.process_matlab_results()
+    assert 'Health Status: Poor' in output and images == []
+    assert struct['crop_health']['overall_health']['status'] == 'Poor'
+    calls = []
+    monkeypatch.setattr(app_module.RASTERS, 'convert', lambda *a, **k: calls.append(a))
+    assert app_module.process_matlab_results() == (output, images, struct)
+    assert calls == [] and app_module.RESULTS_CACHE.stats['hits'] == 1
+
+    # A PNG written after combined_results refreshes only the image list
+    open(os.path.join('results', 'ndvi_map.png'), 'wb').close()
+    output2, images2, _ = app_module.process_matlab_results()
+    assert output2 == output and calls == []
+    assert images2 == ['/results/ndvi_map.e3b0c44298fc1c14.png']  # sha256 of the empty file
+
+    # Rewriting the results file invalidates the entry
+    os.utime(path, ns=(0, 0))
+    app_module.process_matlab_results()
+    assert len(calls) == 1
+
+
+def test_each_run_replaces_the_combined_results_dataset(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.chdir(tmp_path)
+    store = raster_store.RasterStore(str(tmp_path / 'store'))
+    store.write('combined_results_0', {'ndvi': np.eye(16)})  # converted per run by older versions
+    monkeypatch.setattr(app_module, 'RASTERS', store)
+    monkeypatch.setattr(app_module, 'RESULTS_CACHE', ResultCache())
+    monkeypatch.setattr(app_module, 'ARTIFACTS', ArtifactStore(str(tmp_path / 'artifacts')))
+    crop_health = scipy.io.loadmat(os.path.join(BASE_DIR, 'crop_health_20250925_225918.mat'))['crop_health']
+    os.makedirs('results')
+    for run in (1, 2):
+        path = os.path.join('results', f'combined_results_{run}.mat')
+        scipy.io.savemat(path, {'combined_results': {'crop_health': crop_health[0, 0]}})
+        os.utime(path, ns=(run * 10**9, run * 10**9))
+        app_module.process_matlab_results()
+        assert store.names() == ['combined_results']
+        assert store.open('combined_results').source['path'].endswith(f'combined_results_{run}.mat')
+    assert sorted(os.listdir(tmp_path / 'store')) == ['combined_results']
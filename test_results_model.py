@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Tests for the structured results model, /api/results and result-id chat.
+"""
+
+import os
+
+import raster_store
+import results_model
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_from_matlab_reads_crop_health_struct(tmp_path):
+    dataset = raster_store.RasterStore(str(tmp_path)).convert(
+        os.path.join(BASE_DIR, 'crop_health_20250925_225918.mat'))
+    result = results_model.from_matlab({'crop_health': dataset.attrs['crop_health']}, ['/results/a.png'])
+
+    assert result.source == 'matlab'
+    assert result.health.status == 'Poor' and abs(result.health.score - 0.66) < 1e-9
+    assert result.indices['ndvi'].status == 'Stressed'
+    assert abs(result.indices['ndvi'].mean - 0.4935) < 1e-4
+    assert result.soil.score is None and result.pest.level is None
+    assert results_model.section_text(result, 'soil') == 'Soil analysis is not available for this result.'
+
+
+def test_demo_text_is_built_from_demo_result(tmp_path):
+    import app as app_module
+    text = app_module.generate_demo_results(str(tmp_path), size=8)
+    demo = results_model.demo_result()
+    assert f'Overall Health: {demo.health.status} (Score: {demo.health.score:.2f})' in text
+    assert '  Spider Mites: 0.22 (Low Risk)' in text
+    assert '  NDRE: 0.212 (Moderate)' in text
+
+
+def test_results_api_and_chat_by_id(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'RESULTS', results_model.ResultStore(history=2))
+    client = app_module.app.test_client()
+    assert client.get('/api/results/latest').status_code == 404
+
+    first = app_module.RESULTS.add(results_model.demo_result())
+    latest = client.get('/api/results/latest').get_json()
+    assert latest['id'] == first.id and latest['pest']['pests']['aphids'] == 0.42
+    assert client.get(f'/api/results/{first.id}').get_json()['health']['status'] == 'Good'
+
+    reply = client.post('/chat', json={'message': 'Estimate my profit', 'result_id': first.id}).get_json()['reply']
+    assert '$960' in reply  # good health (x1.2), medium pest risk (x0.8)
+    reply = client.post('/chat', json={'message': 'soil?', 'result_id': first.id}).get_json()['reply']
+    assert 'Moisture: 0.18' in reply
+
+    # Older results drop out of the bounded store
+    app_module.RESULTS.add(results_model.demo_result())
+    app_module.RESULTS.add(results_model.demo_result())
+    assert client.get(f'/api/results/{first.id}').status_code == 404
+    reply = client.post('/chat', json={'message': 'pest', 'result_id': first.id}).get_json()['reply']
+    assert 'expired' in reply
+    # ... unless the client also posts the analysis text
+    context = 'Pest Risk: Risk Level: Low (Score: 0.20)'
+    reply = client.post('/chat', json={'message': 'pest', 'result_id': first.id,
+                                       'analysis_context': context}).get_json()['reply']
+    assert 'expired' not in reply
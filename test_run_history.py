@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite run history and /api/history.
+"""
+
+import glob
+import os
+import time
+
+import results_model
+from run_history import RunHistory, backfill
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DAY = 86400.0
+
+
+def test_series_is_bucketed_by_time(tmp_path):
+    history = RunHistory(str(tmp_path / 'history.sqlite3'))
+    for day in range(30):
+        result = results_model.demo_result()
+        result.indices['ndvi'].mean = 0.5 + day / 100
+        history.record(result, 'north', when=day * DAY, duration=2.0 + day)
+    history.record(results_model.demo_result(), 'south', when=0.0)
+
+    points = history.series('ndvi_mean', 'north', since=0, until=30 * DAY, points=10)
+    assert len(points) == 10 and all(p['count'] == 3 for p in points)
+    assert abs(points[0]['mean'] - 0.51) < 1e-9 and points[0]['min'] == 0.5
+    assert points[-1]['time'] == 27 * DAY
+
+    last_week = history.series('duration_seconds', 'north', since=23 * DAY, until=30 * DAY, points=100)
+    assert [p['mean'] for p in last_week] == [25.0, 26.0, 27.0, 28.0, 29.0, 30.0, 31.0]
+    assert history.fields() == ['north', 'south']
+    assert 'pest_aphids' in history.metric_names('north')
+    assert history.runs('north', limit=1)[0]['time'] == 29 * DAY
+
+
+def test_backfill_reads_timestamped_mat_files_once(tmp_path):
+    history = RunHistory(str(tmp_path / 'history.sqlite3'))
+    paths = sorted(glob.glob(os.path.join(BASE_DIR, 'crop_health_2025*.mat')))
+    assert backfill(history, paths) == len(paths)
+    assert backfill(history, paths) == 0
+    runs = history.runs()
+    assert len(runs) == len(paths) and runs[0]['result_id'] == f'file:{os.path.basename(paths[-1])}'
+    assert history.series('ndvi_mean', points=1)[0]['count'] == len(paths)
+
+
+def test_history_endpoint_records_finished_jobs(tmp_path, monkeypatch):
+    import app as app_module
+    from artifact_store import ArtifactStore
+    monkeypatch.setenv('DEMO_MODE', '1')
+    monkeypatch.setenv('DEMO_MAP_SIZE', '8')
+    monkeypatch.setenv('DEMO_RENDER_WORKERS', '1')
+    monkeypatch.setattr(app_module, 'RESULTS_DIR', str(tmp_path))
+    monkeypatch.setattr(app_module, 'ARTIFACTS', ArtifactStore(str(tmp_path / 'artifacts')))
+    monkeypatch.setattr(app_module, 'HISTORY', RunHistory(str(tmp_path / 'history.sqlite3')))
+    monkeypatch.setattr(app_module, 'FIELD_ID', 'plot-7')
+    client = app_module.app.test_client()
+
+    app_module.JOBS.submit('demo', app_module.run_analysis).join()
+    # The JobManager hook records the run right after the job is marked finished
+    deadline = time.time() + 5
+    while not app_module.HISTORY.runs('plot-7') and time.time() < deadline:
+        time.sleep(0.01)
+
+    overview = client.get('/api/history').get_json()
+    assert overview['field'] == 'plot-7' and overview['fields'] == ['plot-7']
+    assert 'stage_demo_maps_seconds' in overview['metrics'] and len(overview['runs']) == 1
+    trend = client.get('/api/history?metric=health_score&days=30').get_json()
+    assert [p['mean'] for p in trend['points']] == [0.78]
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for sensor cleaning (the RobustDataProcessor sensor paths in NumPy).
+"""
+
+import os
+
+import numpy as np
+
+import sensor_cleaning
+from sensor_store import SensorStore
+
+
+def test_fill_missing_interpolates_and_extrapolates():
+    filled = sensor_cleaning.fill_missing([np.nan, 2, np.nan, 4, np.inf, 8, np.nan])
+    assert filled.tolist() == [1, 2, 3, 4, 6, 8, 10]
+    assert sensor_cleaning.fill_missing([np.nan, 5, np.nan]).tolist() == [5, 5, 5]
+    assert np.isnan(sensor_cleaning.fill_missing([np.nan, np.nan])).all()
+
+
+def test_outliers_use_robust_statistics():
+    values = np.array([[10, 11, 9, 10, 500, 10, np.nan], [0, 0, 0, 0, 0, 0, 0]], dtype=float)
+    cleaned, outliers = sensor_cleaning.remove_outliers(values)
+    assert outliers[0].tolist() == [False] * 4 + [True, False, False]
+    assert not outliers[1].any() and np.isnan(cleaned[0, 4])
+    # Mostly-zero columns (MAD 0) keep their rare non-zero readings
+    rain = np.zeros(30)
+    rain[[3, 17]] = [2.0, 2.5]
+    assert not sensor_cleaning.remove_outliers(rain)[1].any()
+
+
+def test_smooth_matches_movmean():
+    assert sensor_cleaning.smooth(np.arange(6.0)).tolist() == [0.5, 1, 2, 3, 4, 4.5]
+    assert sensor_cleaning.smooth(np.arange(6.0), window=4).tolist() == [0.5, 1, 1.5, 2.5, 3.5, 4]
+    assert sensor_cleaning.smooth([1.0, 5.0, 1.0]).tolist() == [1, 5, 1]  # too short, as in MATLAB
+
+
+def test_quality_scores():
+    table = {'timestamp': np.arange(4), 'ph': np.array([6.0, 6.5, np.nan, 20.0]), 'label': np.array(['a'] * 4)}
+    quality = sensor_cleaning.assess_quality(table)
+    assert quality['completeness'] == 0.75 and quality['value_range'] == 0.5
+    assert 0 <= quality['temporal_consistency'] <= 1
+    assert quality['status'] in ('Excellent', 'Good', 'Fair', 'Poor')
+
+
+def test_process_dataset_and_streaming_matches_batch(tmp_path):
+    store = SensorStore(str(tmp_path))
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset.csv'), newline='') as f:
+        store.ingest(f)
+    rows = store.query()
+    result = sensor_cleaning.process(rows)
+    assert result['final_quality']['completeness'] == 1.0
+    assert result['columns']['label'] is rows['label']
+
+    rng = np.random.default_rng(0)
+    table = {'timestamp': np.arange(1000), 'x': np.cumsum(rng.normal(size=1000)), 'y': rng.normal(size=1000)}
+    table['x'][[5, 300, 301, 640]] = np.nan
+    table['y'][[10, 700]] = [40, -40]
+    batch, _ = sensor_cleaning.clean_columns(table)
+    cleaner = sensor_cleaning.SlidingCleaner(window=1000)
+    parts = [cleaner.update({k: v[i:i + 97] for k, v in table.items()}) for i in range(0, 1000, 97)]
+    parts.append(cleaner.flush())
+    for name in ('timestamp', 'x', 'y'):
+        np.testing.assert_allclose(np.concatenate([p[name] for p in parts]), batch[name])
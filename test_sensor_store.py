@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Tests for bulk sensor ingestion and the columnar sensor store.
+"""
+
+import io
+import json
+import os
+
+import numpy as np
+
+import sensor_store
+from sensor_store import SensorStore
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_parse_times_formats():
+    times, valid = sensor_store.parse_times(
+        ['24-Oct-2024 08:58:46', '2024-10-24T08:58:46Z', '2024-10-24 08:58:46', '1729760326', 'soon', ''])
+    assert valid.tolist() == [True, True, True, True, False, False]
+    assert set(times[:4].tolist()) == {1729760326000}
+
+    times, valid = sensor_store.parse_times(['1-oct-2024', '5-Oct-2024 01:02:03', '5-Okt-2024', '1.729760326e9'])
+    assert valid.tolist() == [True, True, False, True]
+    assert times[[0, 1, 3]].tolist() == [1727740800000, 1728090123000, 1729760326000]
+
+
+def test_ingest_dataset_csv_round_trip(tmp_path):
+    store = SensorStore(str(tmp_path))
+    with open(os.path.join(BASE_DIR, 'dataset.csv'), newline='') as f:
+        totals = store.ingest(f, 'csv', chunk_rows=7)
+    assert totals == {'rows': 30, 'rejected': 0, 'chunks': 5}
+
+    rows = SensorStore(str(tmp_path)).query()  # reopened from disk
+    with open(os.path.join(BASE_DIR, 'dataset.csv'), newline='') as f:
+        lines = f.read().splitlines()[1:]
+    first = lines[0].split(',')
+    assert rows['soil_moisture'][0] == float(first[1])
+    assert rows['image_filename'][0] == first[11] and rows['label'][0] == first[12]
+    assert len(rows['timestamp']) == 30
+
+
+def test_ndjson_rejects_bad_rows_and_fills_missing_columns(tmp_path):
+    store = SensorStore(str(tmp_path))
+    feed = [json.dumps({'timestamp': '2024-10-01T00:00:00', 'rainfall': 2.5, 'ph': 'n/a', 'label': 'High'}),
+            '{not json',
+            json.dumps({'timestamp': 'yesterday', 'ph': 7}),
+            json.dumps({'timestamp': 1727740800.5, 'ph': 6.5})]
+    assert store.ingest(feed, 'ndjson') == {'rows': 2, 'rejected': 2, 'chunks': 1}
+    rows = store.query(columns=['precipitation', 'ph', 'label', 'humidity'])
+    assert rows['timestamp'].tolist() == [1727740800000, 1727740800500]
+    assert rows['precipitation'][0] == 2.5 and np.isnan(rows['ph'][0]) and rows['ph'][1] == 6.5
+    assert rows['label'].tolist() == ['High', ''] and np.isnan(rows['humidity']).all()
+
+
+def test_query_time_window_and_limit(tmp_path):
+    store = SensorStore(str(tmp_path))
+    lines = ['timestamp,ph'] + [f'{1700000000 + i * 3600},{i}' for i in range(100)]
+    store.ingest(lines, 'csv', chunk_rows=10)
+
+    rows = store.query(since=(1700000000 + 25 * 3600) * 1000, until=(1700000000 + 34 * 3600) * 1000,
+                       columns=['ph'])
+    assert rows['ph'].tolist() == list(range(25, 35))
+    assert store.query(columns=['ph'], limit=15)['ph'].tolist() == list(range(15))
+    assert store.query(columns=['ph'], limit=15, newest=True)['ph'].tolist() == list(range(85, 100))
+    assert store.query(since=0, until=1000)['ph'].size == 0
+    assert store.stats()['blocks'] == 10
+
+
+def test_newest_rows_are_the_latest_timestamps_after_a_backfill(tmp_path):
+    store = SensorStore(str(tmp_path))
+    store.ingest(['timestamp,ph'] + [f'{1700000000 + i * 3600},{i}' for i in range(50, 100)], 'csv', chunk_rows=10)
+    # Older readings ingested later, plus a late reading inside the recent window
+    store.ingest(['timestamp,ph'] + [f'{1700000000 + i * 3600},{i}' for i in range(50)], 'csv', chunk_rows=10)
+    store.ingest(['timestamp,ph', f'{1700000000 + 97 * 3600 + 1},97.5'], 'csv')
+
+    rows = store.query(columns=['ph'], limit=5, newest=True)
+    assert rows['ph'].tolist() == [96, 97, 97.5, 98, 99]
+    assert np.all(np.diff(rows['timestamp']) > 0)
+    assert store.query(until=(1700000000 + 49 * 3600) * 1000, columns=['ph'], limit=3,
+                       newest=True)['ph'].tolist() == [47, 48, 49]
+    assert store.query(columns=['ph'], limit=0, newest=True)['ph'].size == 0
+    assert store.query(columns=['ph'], newest=True)['ph'].size == 101
+
+
+def test_interrupted_append_is_truncated(tmp_path):
+    store = SensorStore(str(tmp_path))
+    store.ingest(['timestamp,ph', '1700000000,6.5'], 'csv')
+    # A crash after writing column data but before the index record
+    with open(tmp_path / 'ph.bin', 'ab') as f:
+        f.write(np.array([7.0, 7.5]).tobytes())
+    with open(tmp_path / 'index.bin', 'ab') as f:
+        f.write(b'\x01\x02')
+    reopened = SensorStore(str(tmp_path))
+    assert reopened.rows == 1 and os.path.getsize(tmp_path / 'ph.bin') == 8
+    reopened.ingest(['timestamp,ph', '1700000001,8'], 'csv')
+    assert SensorStore(str(tmp_path)).query()['ph'].tolist() == [6.5, 8.0]
+
+
+def test_ingest_and_query_endpoints(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'SENSORS', SensorStore(str(tmp_path)))
+    client = app_module.app.test_client()
+
+    with open(os.path.join(BASE_DIR, 'dataset.csv'), 'rb') as f:
+        body = f.read()
+    _, read_before, _ = app_module.BYTES_READ.snapshot('sensor_ingest')
+    # Chunked upload: no Content-Length, the bytes read are counted
+    response = client.post('/api/sensors/ingest', input_stream=io.BytesIO(body), content_type='text/csv',
+                           headers={'Transfer-Encoding': 'chunked'}, environ_overrides={'wsgi.input_terminated': True})
+    assert response.get_json() == {'rows': 30, 'rejected': 0, 'chunks': 1, 'total': 30}
+    assert app_module.BYTES_READ.snapshot('sensor_ingest')[1] - read_before == len(body)
+    response = client.post('/api/sensors/ingest', data='{"timestamp": "2030-01-01", "ph": 7}\n',
+                           content_type='application/x-ndjson')
+    assert response.get_json()['total'] == 31
+
+    data = client.get('/api/sensors?since=2030-01-01&columns=ph').get_json()
+    assert data['count'] == 1 and data['rows']['ph'] == [7.0]
+    assert client.get('/api/sensors?columns=nope').status_code == 400
+    cleaned = client.get('/api/sensors?clean=1&limit=30').get_json()
+    assert cleaned['final_quality']['completeness'] == 1.0 and 'soil_moisture' in cleaned['cleaning']
+    assert client.post('/api/sensors/ingest', data='ph\n7\n', content_type='text/csv').status_code == 400
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared-memory raster hand-off.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+import shared_rasters
+from shared_rasters import RasterShare, SharedRasterError
+
+
+def band_sums(cube, scale=1.0):
+    return cube.sum(axis=(0, 1)) * scale
+
+
+def segment_exists(handle):
+    try:
+        with shared_rasters.attached(handle):
+            return True
+    except FileNotFoundError:
+        return False
+
+
+def test_workers_attach_the_published_cube():
+    cube = np.random.default_rng(0).random((64, 48, 8)).astype(np.float32)
+    with RasterShare({'cube': cube, 'ndvi': cube[:, :, 0]}) as share:
+        assert share.nbytes == cube.nbytes + cube[:, :, 0].nbytes
+        pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context('spawn'))
+        with pool:
+            sums = pool.submit(shared_rasters.run_attached, band_sums, share.handles['cube'], scale=2.0).result()
+        np.testing.assert_allclose(sums, band_sums(cube, 2.0), rtol=1e-6)
+
+        with shared_rasters.attached(share.handles) as views:
+            assert np.array_equal(views['ndvi'], cube[:, :, 0])
+            with pytest.raises(ValueError):
+                views['cube'][0, 0, 0] = 1  # workers get read-only views
+            del views
+    assert share.closed and not segment_exists(share.handles['cube'])
+
+
+def test_last_release_unlinks_the_segments():
+    share = RasterShare({'cube': np.ones((4, 4, 2))}, refs=2)
+    handle = share.handles['cube']
+    share.acquire()
+    share.release()
+    share.release()
+    assert segment_exists(handle)
+    share.release()
+    assert share.closed and not segment_exists(handle)
+    with pytest.raises(SharedRasterError):
+        share.acquire()
+    share.release()  # releasing a closed share is a no-op
+
+
+def test_run_attached_resolves_handles_in_dicts():
+    indices = {'ndvi': np.full((3, 3), 0.5), 'ndwi': np.zeros((3, 3))}
+    with RasterShare(indices) as share:
+        means = shared_rasters.run_attached(lambda maps, offset: {k: float(v.mean()) + offset for k, v in maps.items()},
+                                            share.handles, 1)
+    assert means == {'ndvi': 1.5, 'ndwi': 1.0}
+
+
+def test_numpy_backend_analyzers_in_worker_processes(numpy_app, monkeypatch):
+    app_module = numpy_app
+    threaded = app_module.run_analysis()
+
+    published = []
+
+    def publish(*args, **kwargs):
+        published.append(RasterShare(*args, **kwargs))
+        return published[-1]
+
+    monkeypatch.setattr(app_module, 'ANALYZER_PROCESSES', 2)
+    monkeypatch.setattr(app_module, 'ANALYZER_POOL', None)
+    monkeypatch.setattr(shared_rasters, 'RasterShare', publish)
+    try:
+        pooled = app_module.run_analysis()
+    finally:
+        app_module.ANALYZER_POOL.shutdown()
+    for payload in (threaded, pooled):
+        del payload['summary']['id'], payload['summary']['created_at']
+    assert pooled['summary'] == threaded['summary']
+    assert len(published) == 1 and published[0].closed  # released by the three analyzers
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Tests for the NumPy soil condition analysis and sensor interpolation.
+"""
+
+import os
+
+import numpy as np
+import pytest
+import scipy.io
+
+import soil_condition
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def report_section(name):
+    # The soil section of a saved report is built from the sensor_data.mat series
+    report = scipy.io.loadmat(os.path.join(BASE_DIR, 'comprehensive_report_20250925_225918.mat'),
+                              squeeze_me=True, struct_as_record=False)['report']
+    return getattr(report.soil_condition_section, name)
+
+
+def assert_struct_equal(ours, theirs, fields=None):
+    for field in fields or theirs._fieldnames:
+        expected = getattr(theirs, field)
+        if hasattr(expected, '_fieldnames'):
+            assert_struct_equal(ours[field], expected)
+        elif isinstance(expected, str):
+            assert ours[field] == expected, field
+        else:
+            assert np.allclose(ours[field], expected, rtol=1e-12), field
+
+
+def test_sensor_analyses_match_saved_matlab_report():
+    sensor_data = soil_condition.load_sensor_mat(os.path.join(BASE_DIR, 'sensor_data.mat'))
+    ndwi = np.zeros((32, 32))
+    cube = np.full((32, 32, 8), 0.2)
+    condition = soil_condition.assess_condition(cube, ndwi, sensor_data)
+
+    parameters = report_section('parameters')
+    # spectral_moisture_estimate comes from the denoised cube MATLAB saw
+    assert_struct_equal(condition['moisture_analysis'], parameters.moisture,
+                        [f for f in parameters.moisture._fieldnames if f != 'spectral_moisture_estimate'])
+    for ours, theirs in (('temperature_analysis', parameters.temperature), ('ph_analysis', parameters.ph),
+                         ('ec_analysis', parameters.electrical_conductivity)):
+        assert_struct_equal(condition[ours], theirs)
+    assert_struct_equal(condition['quality_index'], report_section('quality_index'))
+
+    anomalies = report_section('anomalies')
+    for name in ('moisture_anomalies', 'temperature_anomalies', 'ph_anomalies'):
+        assert_struct_equal(condition['anomalies'][name], getattr(anomalies, name))
+    assert condition['health_assessment']['recommendations'] == ['Consider irrigation']
+    # One level from the overall score (0.82) everywhere, as in generateSoilConditionMap
+    assert (condition['moisture_map']['data'] == 3).all()
+
+
+def test_classification_bounds_and_soil_types():
+    assert soil_condition.classify(0.4, soil_condition.MOISTURE_LEVELS)['level'] == 'Optimal'
+    assert soil_condition.classify(0.8, soil_condition.MOISTURE_LEVELS)['level'] == 'Optimal'
+    assert soil_condition.classify(0.81, soil_condition.MOISTURE_LEVELS)['level'] == 'Wet'
+    assert soil_condition.level_scores([5.4, 5.5, 7.5, 8.1], soil_condition.PH_LEVELS).tolist() == [0.1, 0.4, 1.0, 0.2]
+    assert soil_condition.adequacy(0.2, (0.4, 0.8), 0.5, 'Adequate') == {'score': pytest.approx(0.2), 'status': 'Poor'}
+
+    # (red, nir, swir) -> brightness, wetness: loam wins over silt where both match
+    pixels = {(0.9, 0.5, 0.9): 1, (0.9, 0.9, 0.6): 3, (0.5, 0.45, 0.4): 4, (0.55, 0.5, 0.6): 2,
+              (0.2, 0.05, 0.2): 5, (0.0, 0.9, 0.0): 4}
+    cube = np.zeros((1, len(pixels), 8))
+    cube[0, :, [2, 3, 7]] = np.array(list(pixels)).T
+    assert soil_condition.soil_type_map(cube)[0].tolist() == list(pixels.values())
+
+
+def test_interpolation_matches_brute_force_idw():
+    rng = np.random.default_rng(5)
+    points = rng.uniform(0, 24, (40, 2))
+    points[0] = [3, 7]  # on a pixel centre
+    values = {'ph': rng.uniform(5, 8, 40), 'soil_moisture': rng.uniform(0, 1, 40)}
+    maps = soil_condition.interpolate(points, values, (24, 30), neighbours=6, block=100)
+
+    grid = np.stack(np.meshgrid(np.arange(24.0), np.arange(30.0), indexing='ij'), -1).reshape(-1, 2)
+    distance = np.linalg.norm(grid[:, None] - points[None], axis=2)
+    nearest = np.argsort(distance, axis=1)[:, :6]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = np.take_along_axis(distance, nearest, 1) ** -2.0
+        expected = {name: (weights * v[nearest]).sum(1) / weights.sum(1) for name, v in values.items()}
+    for name, v in values.items():
+        expected[name][3 * 30 + 7] = v[0]
+        np.testing.assert_allclose(maps[name].reshape(-1), expected[name], rtol=1e-12)
+
+
+def test_stations_give_a_per_pixel_condition_map(tmp_path):
+    path = tmp_path / 'stations.csv'
+    path.write_text('row,col,soil_moisture,ph\n0,0,0.5,6.5\n0,19,0.1,5.0\n')
+    stations = soil_condition.load_stations(str(path))
+    sensor_data = {'soil_moisture': [0.5, 0.6], 'soil_temperature': [20, 21], 'ph': [6.5, 6.6],
+                   'electrical_conductivity': [1.0, np.nan]}
+    condition = soil_condition.assess_condition(np.full((4, 20, 8), 0.2), np.zeros((4, 20)), sensor_data,
+                                                stations, include_maps=False)
+
+    levels = condition['moisture_map']['data']
+    assert levels[0, 0] == 3 and levels[0, 19] == 1  # wet, neutral corner vs dry, acidic corner
+    assert condition['ec_analysis']['mean_ec'] == 1.0  # missing readings are skipped
+    assert 'sensor_maps' not in condition and 'sensor_ph' not in condition['ph_analysis']
+
+
+def test_zero_mean_series_give_an_infinite_coefficient_of_variation():
+    sensor_data = {'soil_moisture': np.zeros(5), 'soil_temperature': [-1, 1, 0, 0, 0],
+                   'ph': [6.5] * 5, 'electrical_conductivity': [1.0] * 5}
+    condition = soil_condition.assess_condition(np.full((4, 4, 8), 0.2), np.zeros((4, 4)), sensor_data)
+
+    moisture = condition['moisture_analysis']['moisture_variability']
+    assert np.isnan(moisture['coefficient_of_variation']) and moisture['level'] == 'High'  # 0 / 0, as in MATLAB
+    temperature = condition['temperature_analysis']['temperature_variability']
+    assert temperature['coefficient_of_variation'] == np.inf
+
+
+def test_numpy_backend_reports_soil_from_ingested_rows(numpy_app):
+    numpy_app.SENSORS.ingest(['timestamp,soil_moisture,soil_temperature,ph,electrical_conductivity\n',
+                              '2024-10-01T00:00:00Z,0.1,20,6.5,1.0\n', '2024-10-02T00:00:00Z,0.2,22,6.7,1.2\n'])
+    payload = numpy_app.run_analysis()
+
+    soil = payload['summary']['soil']
+    assert soil['moisture'] == pytest.approx(0.15) and soil['ph'] == pytest.approx(6.6)
+    assert soil['status'] == 'Good'  # dry moisture, optimal temperature, pH and EC: 0.76
+    assert any('soil_condition_map' in url for url in payload['images'])
+    assert 'Soil Moisture: 0.15' in payload['output']
+
+
+def test_soil_analysis_uses_the_newest_readings_beyond_the_query_limit(numpy_app, tmp_path, monkeypatch):
+    lines = ['timestamp,soil_moisture,soil_temperature,ph,electrical_conductivity']
+    lines += [f'{1700000000 + i * 60},{0.1 if i < 30 else 0.5},20,6.5,1.0' for i in range(50)]
+    numpy_app.SENSORS.ingest(lines, 'csv', chunk_rows=8)
+    monkeypatch.setattr(numpy_app, 'SENSOR_QUERY_MAX_ROWS', 20)
+
+    rows = numpy_app.soil_sensor_data(str(tmp_path))
+    assert rows['soil_moisture'].tolist() == [0.5] * 20
+    assert rows['timestamp'][-1] == (1700000000 + 49 * 60) * 1000
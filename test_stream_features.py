@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Tests for the incremental per-stream sensor features.
+"""
+
+import io
+import os
+
+import numpy as np
+import pytest
+
+import stream_features
+from sensor_store import SensorStore
+from stream_features import StreamFeatures
+
+
+def expected(values, window, alpha):
+    recent = np.asarray(values[-window:])
+    ewma = values[0]
+    for value in values[1:]:
+        ewma = alpha * value + (1 - alpha) * ewma
+    return {'count': len(recent), 'mean': recent.mean(), 'std': recent.std(ddof=1), 'min': recent.min(),
+            'max': recent.max(), 'range': np.ptp(recent), 'ewma': ewma, 'last': recent[-1],
+            'trend': np.polyfit(np.arange(len(recent)), recent, 1)[0]}
+
+
+def test_incremental_features_match_a_full_recompute():
+    rng = np.random.default_rng(3)
+    features = StreamFeatures(window=20, alpha=0.3, capacity=1)  # grows past the initial capacity
+    history = {name: [] for name in ('moisture', 'ph', 'ec')}
+    for _ in range(137):
+        values = 50 + rng.normal(size=3) * 5
+        features.update(list(history), values)
+        for name, value in zip(history, values):
+            history[name].append(value)
+    # Repeated streams are applied in order; NaN readings are skipped
+    features.update(['ph', 'ph', 'ec'], [1.0, 99.0, np.nan])
+    history['ph'] += [1.0, 99.0]
+    for name, values in history.items():
+        got = features.features(name)
+        for key, value in expected(values, 20, 0.3).items():
+            assert got[key] == pytest.approx(value, rel=1e-9, abs=1e-9), (name, key)
+    assert features.features('unknown') is None
+    assert features.per_stream() == {name: features.features(name) for name in history}
+
+
+def test_extend_matches_single_updates():
+    values = np.cumsum(np.random.default_rng(4).normal(size=500))
+    one_by_one = StreamFeatures(window=64)
+    for value in values:
+        one_by_one.update(['x'], [value])
+    bulk = StreamFeatures(window=64)
+    bulk.extend('x', values[:10])
+    bulk.extend('x', values[10:])
+    for key, value in one_by_one.features('x').items():
+        assert bulk.features('x')[key] == pytest.approx(value, rel=1e-9, abs=1e-9)
+    struct = bulk.as_struct()
+    assert set(struct) == {f'{name}_x' for name in stream_features.STRUCT_FEATURES}
+
+
+def test_stream_limit():
+    features = StreamFeatures(max_streams=2)
+    features.update(['a', 'b'], [1, 2])
+    with pytest.raises(stream_features.StreamLimitError):
+        features.update(['c'], [3])
+
+
+def test_ingest_updates_features_endpoint(tmp_path, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module, 'SENSORS', SensorStore(str(tmp_path)))
+    monkeypatch.setattr(app_module, 'SENSOR_FEATURES', StreamFeatures(window=8))
+    client = app_module.app.test_client()
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dataset.csv'), 'rb') as f:
+        client.post('/api/sensors/ingest', data=io.BytesIO(f.read()), content_type='text/csv')
+
+    data = client.get('/api/sensors/features').get_json()
+    assert data['soil_moisture']['count'] == 8
+    struct = client.get('/api/sensors/features?format=struct').get_json()
+    assert struct['mean_ph'] == pytest.approx(data['ph']['mean'])
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Tests for the XYZ tile pyramid and the /tiles endpoints.
+"""
+
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import tile_pyramid
+from result_cache import ResultCache
+
+
+def write_map(path, width, height, seed=0):
+    rgb = np.random.default_rng(seed).integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    Image.fromarray(rgb, 'RGB').save(path)
+    return rgb
+
+
+def tile_image(data):
+    return np.asarray(Image.open(io.BytesIO(data)))
+
+
+def test_levels_and_edge_tiles(tmp_path):
+    rgb = write_map(tmp_path / 'ndvi_map.png', 600, 300)
+    tiles = tile_pyramid.TilePyramid(str(tmp_path), str(tmp_path / 'tiles'))
+    info = tiles.info('ndvi_map')
+    assert info['max_zoom'] == 2 and (info['width'], info['height']) == (600, 300)
+    assert tile_pyramid.level_size(600, 300, 0, 2) == (150, 75)
+
+    # Full resolution: tiles are exact crops, edge tiles are cropped to the map
+    data, _ = tiles.tile('ndvi_map', 2, 1, 0)
+    assert np.array_equal(tile_image(data), rgb[0:256, 256:512])
+    assert tile_image(tiles.tile('ndvi_map', 2, 2, 1)[0]).shape == (44, 88, 3)
+    assert tile_image(tiles.tile('ndvi_map', 0, 0, 0)[0]).shape == (75, 150, 3)
+
+    for z, x, y in ((3, 0, 0), (2, 3, 0), (0, 0, 1)):
+        with pytest.raises(tile_pyramid.TileNotFound):
+            tiles.tile('ndvi_map', z, x, y)
+    with pytest.raises(tile_pyramid.TileNotFound):
+        tiles.info('../ndvi_map')
+
+
+def test_generate_writes_pyramid_and_follows_rewrites(tmp_path):
+    write_map(tmp_path / 'pest_risk_map.png', 600, 300)
+    tiles = tile_pyramid.TilePyramid(str(tmp_path), str(tmp_path / 'tiles'), cache=ResultCache())
+    assert tiles.generate('pest_risk_map') == 1 + 2 + 6
+    assert tiles.generate('pest_risk_map') == 0
+    version = tiles.info('pest_risk_map')['version']
+    assert os.path.exists(tmp_path / 'tiles' / 'pest_risk_map' / version / '2' / '2' / '1.png')
+
+    first, _ = tiles.tile('pest_risk_map', 1, 0, 0)
+    write_map(tmp_path / 'pest_risk_map.png', 600, 300, seed=1)
+    os.utime(tmp_path / 'pest_risk_map.png', ns=(1, 1))
+    second, new_version = tiles.tile('pest_risk_map', 1, 0, 0)
+    assert new_version != version and second != first
+    tiles.generate('pest_risk_map')
+    assert os.listdir(tmp_path / 'tiles' / 'pest_risk_map') == [new_version]
+
+
+def test_generate_decodes_the_map_once(tmp_path, monkeypatch):
+    rgb = write_map(tmp_path / 'ndvi_map.png', 600, 300)
+    # Level cache too small to hold the map
+    tiles = tile_pyramid.TilePyramid(str(tmp_path), str(tmp_path / 'tiles'), level_cache=ResultCache(max_bytes=1))
+    opened = []
+    real_open = Image.open
+    monkeypatch.setattr(tile_pyramid.Image, 'open', lambda *args: opened.append(args) or real_open(*args))
+    assert tiles.generate('ndvi_map') == 1 + 2 + 6
+    assert len(opened) == 1
+
+    monkeypatch.undo()
+    version = tiles.info('ndvi_map')['version']
+    with open(tmp_path / 'tiles' / 'ndvi_map' / version / '2' / '1' / '0.png', 'rb') as f:
+        assert np.array_equal(tile_image(f.read()), rgb[0:256, 256:512])
+    with open(tmp_path / 'tiles' / 'ndvi_map' / version / '0' / '0' / '0.png', 'rb') as f:
+        top = f.read()
+    fresh = tile_pyramid.TilePyramid(str(tmp_path), str(tmp_path / 'fresh'))
+    assert np.array_equal(tile_image(top), tile_image(fresh.tile('ndvi_map', 0, 0, 0)[0]))
+
+
+def test_tile_endpoints(tmp_path, monkeypatch):
+    import app as app_module
+    write_map(tmp_path / 'crop_health_map.png', 300, 300)
+    monkeypatch.setattr(app_module, 'TILES', tile_pyramid.TilePyramid(str(tmp_path), str(tmp_path / 'tiles')))
+    client = app_module.app.test_client()
+
+    info = client.get('/tiles/crop_health_map').get_json()
+    assert info['max_zoom'] == 1
+    response = client.get('/tiles/crop_health_map/1/1/1.png')
+    assert response.mimetype == 'image/png' and tile_image(response.data).shape == (44, 44, 3)
+    assert 'no-cache' in response.headers['Cache-Control']
+    assert client.get('/tiles/crop_health_map/1/1/1.png',
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    versioned = client.get(f"/tiles/crop_health_map/1/1/1.png?v={info['version']}")
+    assert 'immutable' in versioned.headers['Cache-Control']
+    assert client.get('/tiles/crop_health_map/2/0/0.png').status_code == 404
+    assert client.get('/tiles/missing_map').status_code == 404
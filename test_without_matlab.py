@@ -9,6 +9,23 @@ import json
 import random
 from datetime import datetime
 
+# Timings are benchmarked when this file runs as a script (or with MEASURE_TIMINGS=1), not under pytest
+MEASURE_TIMINGS = os.getenv('MEASURE_TIMINGS') == '1'
+
+def measured_seconds(case):
+    """Measured p95 seconds of a benchmark.py case, or None when timings are not measured."""
+    if not MEASURE_TIMINGS:
+        return None
+    import benchmark
+    return round(benchmark.measure(case, 256, repeats=5, warmup=1)['p95_ms'] / 1000, 3)
+
+def print_timing(label, seconds, what):
+    if seconds is None:
+        print(f"   - {label}: not measured (run this script or set MEASURE_TIMINGS=1)")
+        return
+    print(f"   - {label}: {seconds} seconds (measured p95, {what})")
+    print(f"   - Performance target: {'✅ MET' if seconds < 0.5 else '❌ NOT MET'} (sub-500ms)")
+
 def test_data_generation():
     """Test data generation functions"""
     print("=== Testing Data Generation Functions ===\n")
@@ -187,9 +204,8 @@ def test_advanced_features():
     print("=== Testing Advanced Features ===\n")
     
     print("1. Testing Real-Time Processing...")
-    processing_time = round(random.uniform(0.15, 0.45), 3)
-    print(f"   - Processing time: {processing_time} seconds")
-    print(f"   - Performance target: {'✅ MET' if processing_time < 0.5 else '❌ NOT MET'} (sub-500ms)")
+    processing_time = measured_seconds('numpy_backend')
+    print_timing('Processing time', processing_time, 'NumPy backend, 256x256 cube')
     print("   - Clusters detected: 3")
     print("   - Anomalies found: 0")
     print("   - ✅ Real-time processing: SUCCESS\n")
@@ -270,9 +286,8 @@ def test_training_pipeline():
     print("   - ✅ Model training: SUCCESS\n")
     
     print("5. Testing Model Inference...")
-    inference_time = round(random.uniform(0.18, 0.35), 3)
-    print(f"   - Inference time: {inference_time} seconds")
-    print(f"   - Performance target: {'✅ MET' if inference_time < 0.5 else '❌ NOT MET'} (sub-500ms)")
+    inference_time = measured_seconds('results_parsing_cold')
+    print_timing('Inference time', inference_time, 'parsing uncached MATLAB results')
     print("   - Status: Normal")
     print("   - Risk level: Low")
     print("   - Confidence: 0.87")
@@ -286,6 +301,8 @@ def test_training_pipeline():
 
 def main():
     """Main test function"""
+    global MEASURE_TIMINGS
+    MEASURE_TIMINGS = True
     print("=== AI-Powered Agricultural Monitoring System Test ===\n")
     print("Testing system components without MATLAB...\n")
     print("Note: This demonstrates the system structure and validates implementation.\n")
@@ -0,0 +1,173 @@
+"""
+XYZ tile pyramid over the result maps.
+
+Each map PNG in the results directory is served as 256x256 tiles at zoom
+levels 0 (the whole map in one tile) to max_zoom (full resolution); every
+level halves the one above it with a box filter. Tiles are addressed as
+``z/x/y`` with ``x`` counting columns and ``y`` rows from the top-left;
+edge tiles are cropped to the map instead of padded.
+
+Tiles are rendered on demand and kept in an in-memory LRU; ``generate``
+writes a map's whole pyramid to disk ahead of time (the server does so in the
+background after each run), and tiles already on disk are read from there.
+Both are keyed by the source file's size and mtime, so a map rewritten by
+the next run never serves tiles of the previous one.
+"""
+
+import io
+import math
+import os
+import re
+import shutil
+
+from result_cache import ResultCache
+
+try:
+    from PIL import Image
+except Exception:
+    Image = None  # Pillow optional; required to cut tiles
+
+TILE_SIZE = 256
+MAP_NAME_RE = re.compile(r'^[A-Za-z0-9_\-]+$')
+COMPLETE_MARKER = '.complete'
+
+
+class TileNotFound(Exception):
+    """Raised for unknown maps and tile coordinates outside the pyramid."""
+
+
+def max_zoom(width, height, tile_size=TILE_SIZE):
+    """Deepest zoom level: the one at which the map is shown at full resolution."""
+    return max(0, math.ceil(math.log2(max(width, height) / tile_size)))
+
+
+def level_size(width, height, z, zmax):
+    """Map size in pixels at zoom level z (each level up halves it, rounding up)."""
+    factor = 2 ** (zmax - z)
+    return -(-width // factor), -(-height // factor)
+
+
+class TilePyramid:
+    """On-demand and pregenerated tiles for the maps in ``source_dir``."""
+
+    def __init__(self, source_dir, cache_dir, tile_size=TILE_SIZE, cache=None, level_cache=None):
+        self.source_dir = source_dir
+        self.cache_dir = cache_dir
+        self.tile_size = tile_size
+        self.cache = cache if cache is not None else ResultCache(max_entries=4096, max_bytes=64 * 1024 * 1024)
+        self.levels = level_cache if level_cache is not None else ResultCache(max_entries=64,
+                                                                              max_bytes=256 * 1024 * 1024)
+
+    def _source(self, name):
+        """(path, version) of a map; version changes whenever the file is rewritten."""
+        if not MAP_NAME_RE.match(name):
+            raise TileNotFound(f"Unknown map '{name}'")
+        path = os.path.join(self.source_dir, f'{name}.png')
+        try:
+            st = os.stat(path)
+        except OSError:
+            raise TileNotFound(f"Unknown map '{name}'")
+        return path, f'{st.st_mtime_ns:x}-{st.st_size:x}'
+
+    def _full(self, name, path, version):
+        key = (name, version, 'full')
+        image = self.levels.get(key)
+        if image is None:
+            with Image.open(path) as source:
+                image = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+            self.levels.put(key, image, size=image.width * image.height * len(image.getbands()))
+        return image
+
+    def info(self, name):
+        """Size, zoom range and tile size of one map."""
+        path, version = self._source(name)
+        width, height = self._full(name, path, version).size
+        return {'name': name, 'width': width, 'height': height, 'tile_size': self.tile_size,
+                'min_zoom': 0, 'max_zoom': max_zoom(width, height, self.tile_size), 'version': version}
+
+    def _level(self, name, path, version, z):
+        full = self._full(name, path, version)
+        zmax = max_zoom(full.width, full.height, self.tile_size)
+        if not 0 <= z <= zmax:
+            raise TileNotFound(f'Zoom {z} outside 0..{zmax}')
+        if z == zmax:
+            return full
+        key = (name, version, z)
+        image = self.levels.get(key)
+        if image is None:
+            image = self._level(name, path, version, z + 1).reduce(2)  # box filter, sizes round up
+            self.levels.put(key, image, size=image.width * image.height * len(image.getbands()))
+        return image
+
+    def _tile_path(self, name, version, z, x, y):
+        return os.path.join(self.cache_dir, name, version, str(z), str(x), f'{y}.png')
+
+    def _crop(self, level, x, y):
+        """PNG bytes of tile x, y of a level image."""
+        size = self.tile_size
+        buf = io.BytesIO()
+        level.crop((x * size, y * size, min(level.width, (x + 1) * size),
+                    min(level.height, (y + 1) * size))).save(buf, format='PNG')
+        return buf.getvalue()
+
+    def _render(self, name, path, version, z, x, y):
+        level = self._level(name, path, version, z)
+        size = self.tile_size
+        if not (0 <= x < -(-level.width // size) and 0 <= y < -(-level.height // size)):
+            raise TileNotFound(f'Tile {z}/{x}/{y} outside the map')
+        return self._crop(level, x, y)
+
+    def tile(self, name, z, x, y):
+        """(PNG bytes, version) of one tile: memory cache, then disk, then rendered."""
+        path, version = self._source(name)
+        key = (name, version, z, x, y)
+        data = self.cache.get(key)
+        if data is None:
+            tile_path = self._tile_path(name, version, z, x, y)
+            try:
+                with open(tile_path, 'rb') as f:
+                    data = f.read()
+            except OSError:
+                data = self._render(name, path, version, z, x, y)
+            self.cache.put(key, data, size=len(data))
+        return data, version
+
+    def generate(self, name):
+        """Write every tile of a map to disk (skipped if already done); returns the tile count."""
+        path, version = self._source(name)
+        version_dir = os.path.join(self.cache_dir, name, version)
+        if os.path.exists(os.path.join(version_dir, COMPLETE_MARKER)):
+            return 0
+        # One decode and one reduction per level, outside the level cache: a map too
+        # large for it would otherwise be decoded again for every tile
+        with Image.open(path) as source:
+            level = source.convert('RGBA' if 'A' in source.getbands() else 'RGB')
+        zmax = max_zoom(level.width, level.height, self.tile_size)
+        count = 0
+        for z in range(zmax, -1, -1):
+            if z < zmax:
+                level = level.reduce(2)  # box filter, sizes round up
+            for x in range(-(-level.width // self.tile_size)):
+                os.makedirs(os.path.join(version_dir, str(z), str(x)), exist_ok=True)
+                for y in range(-(-level.height // self.tile_size)):
+                    tile_path = self._tile_path(name, version, z, x, y)
+                    with open(tile_path + '.tmp', 'wb') as f:
+                        f.write(self._crop(level, x, y))
+                    os.replace(tile_path + '.tmp', tile_path)
+                    count += 1
+        open(os.path.join(version_dir, COMPLETE_MARKER), 'w').close()
+        # Tiles of earlier versions of this map are never requested again
+        for old in os.listdir(os.path.join(self.cache_dir, name)):
+            if old != version:
+                shutil.rmtree(os.path.join(self.cache_dir, name, old), ignore_errors=True)
+        return count
+
+    def generate_all(self, names):
+        """Pregenerate several maps; maps missing from source_dir are skipped."""
+        total = 0
+        for name in names:
+            try:
+                total += self.generate(name)
+            except TileNotFound:
+                pass
+        return total
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Tiled processing of large multispectral cubes.
+
+Runs the SpectralImageProcessor stages (radiometric correction, vegetation
+indices, atmospheric correction, 3x3 median noise reduction) over
+overlapping tiles on a process pool and stitches the results. Peak memory
+depends on the tile size, not the scene size:
+
+- Inputs are read a window at a time (``.npy`` files are memory-mapped).
+  In-memory cubes (arrays and ``.mat`` files) are published once to shared
+  memory (shared_rasters.py) for the workers instead of pickling every
+  tile's window into its task.
+- The per-band statistics the corrections need (99th/1st percentiles and
+  the dark-object mean) come from per-tile histograms merged in a first
+  pass. The histograms have one bin per 16-bit level, so the statistics are
+  exact for 16-bit data.
+- Tiles carry a halo of ``DENOISE_KERNEL // 2`` pixels so the median filter
+  sees the same neighbourhood as a whole-scene pass.
+- Outputs can be written to ``.npy`` memory maps instead of RAM.
+
+Usage:
+    python tiled_pipeline.py cube.npy out_dir [--tile 1024] [--workers N]
+"""
+
+import argparse
+import os
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+import shared_rasters
+import spectral_indices
+
+DEFAULT_TILE_SIZE = 1024
+DENOISE_KERNEL = 3  # applyNoiseReduction: medfilt2(band, [3, 3])
+HALO = DENOISE_KERNEL // 2
+LEVELS = 65535  # histogram resolution: one bin per 16-bit level
+
+# Core region [r0:r1, c0:c1] plus the halo-padded window actually read
+Tile = namedtuple('Tile', 'r0 r1 c0 c1 wr0 wr1 wc0 wc1')
+
+
+def plan_tiles(height, width, tile_size=DEFAULT_TILE_SIZE, halo=HALO):
+    """Split a scene into tile_size squares, each with a halo clipped to the scene."""
+    tiles = []
+    for r0 in range(0, height, tile_size):
+        for c0 in range(0, width, tile_size):
+            r1, c1 = min(r0 + tile_size, height), min(c0 + tile_size, width)
+            tiles.append(Tile(r0, r1, c0, c1,
+                              max(r0 - halo, 0), min(r1 + halo, height),
+                              max(c0 - halo, 0), min(c1 + halo, width)))
+    return tiles
+
+
+def open_cube(path):
+    """Open a cube without loading it: .npy is memory-mapped, .mat is loaded (it cannot be mapped)."""
+    if path.endswith('.npy'):
+        return np.load(path, mmap_mode='r')
+    return spectral_indices.load_cube(path)
+
+
+def _read(source, r0, r1, c0, c1):
+    """
+    Copy a window as float32 from a path (memory-mapped in the worker), a
+    shared raster or an array. Always a copy: the tile stages work in place.
+    """
+    if isinstance(source, shared_rasters.SharedRaster):
+        with shared_rasters.attached(source) as cube:
+            return np.array(cube[r0:r1, c0:c1], dtype=np.float32)
+    cube = open_cube(source) if isinstance(source, str) else source
+    return np.array(cube[r0:r1, c0:c1], dtype=np.float32)
+
+
+# ------------------------------
+# Pass 1: per-band statistics
+# ------------------------------
+def _tile_max(source, window):
+    return float(_read(source, *window).max())
+
+
+def _tile_histogram(source, window, scale):
+    """Per-band counts of reflectance quantized to LEVELS steps."""
+    data = _read(source, *window)
+    counts = np.zeros((data.shape[2], LEVELS + 1), dtype=np.int64)
+    for band in range(data.shape[2]):
+        levels = np.rint(np.clip(data[:, :, band] * (scale * LEVELS), 0, LEVELS)).astype(np.int64)
+        counts[band] = np.bincount(levels.ravel(), minlength=LEVELS + 1)
+    return counts
+
+
+def percentile_from_counts(counts, values, pct):
+    """Percentile of a histogram, with MATLAB prctile (hazen) interpolation."""
+    cum = np.cumsum(counts)
+    n = cum[-1]
+    rank = min(max(pct / 100.0 * n + 0.5, 1), n)
+    lo, hi = int(np.floor(rank)), int(np.ceil(rank))
+    v_lo = values[np.searchsorted(cum, lo)]
+    v_hi = values[np.searchsorted(cum, hi)]
+    return float(v_lo + (rank - lo) * (v_hi - v_lo))
+
+
+def band_statistics(counts):
+    """
+    Clip thresholds (applyRadiometricCorrection) and dark-object values
+    (applyAtmosphericCorrection) per band from merged histograms.
+    """
+    reflectance = np.arange(LEVELS + 1) / LEVELS
+    thresholds, dark = [], []
+    for band_counts in counts:
+        threshold = min(percentile_from_counts(band_counts, reflectance, 99), 1.0)
+        corrected = np.clip(reflectance, 0, threshold)
+        dark_threshold = percentile_from_counts(band_counts, corrected, 1)
+        below = corrected <= dark_threshold
+        dark.append(float((band_counts[below] * corrected[below]).sum() / band_counts[below].sum()))
+        thresholds.append(threshold)
+    return np.array(thresholds, dtype=np.float32), np.array(dark, dtype=np.float32)
+
+
+# ------------------------------
+# Pass 2: per-tile processing
+# ------------------------------
+def process_tile(source, read_window, tile, scale, thresholds, dark, keep_denoised=True):
+    """
+    Run the corrections, indices and median filter on one halo-padded window
+    (``read_window`` locates tile's window inside ``source``).
+    Returns (tile, index arrays for the core, denoised core cube or None).
+    """
+    from scipy.ndimage import median_filter
+
+    window = _read(source, *read_window)
+    window *= np.float32(scale)
+    for band in range(window.shape[2]):
+        np.clip(window[:, :, band], 0, thresholds[band], out=window[:, :, band])
+
+    core = (slice(tile.r0 - tile.wr0, tile.r1 - tile.wr0), slice(tile.c0 - tile.wc0, tile.c1 - tile.wc0))
+    indices = spectral_indices.compute_indices(np.ascontiguousarray(window[core]))
+
+    denoised = None
+    if keep_denoised:
+        window -= dark
+        np.maximum(window, 0, out=window)
+        denoised = np.empty(window[core].shape, dtype=np.float32)
+        for band in range(window.shape[2]):
+            # medfilt2 pads with zeros; only true scene edges lack a halo
+            denoised[:, :, band] = median_filter(window[:, :, band], size=DENOISE_KERNEL,
+                                                 mode='constant', cval=0.0)[core]
+    return tile, indices, denoised
+
+
+def _map_bounded(executor, fn, arg_list, max_in_flight):
+    """Yield fn results as they finish, keeping at most max_in_flight tasks queued."""
+    if executor is None:
+        for args in arg_list:
+            yield fn(*args)
+        return
+    pending = set()
+    for args in arg_list:
+        pending.add(executor.submit(fn, *args))
+        if len(pending) >= max_in_flight:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    for future in pending:
+        yield future.result()
+
+
+def _allocate(shape, out_dir, name):
+    if out_dir is None:
+        return np.empty(shape, dtype=np.float32)
+    return np.lib.format.open_memmap(os.path.join(out_dir, f'{name}.npy'), mode='w+',
+                                     dtype=np.float32, shape=shape)
+
+
+def run_tiled(source, tile_size=DEFAULT_TILE_SIZE, workers=None, out_dir=None, keep_denoised=True):
+    """
+    Process a cube (a .npy/.mat path or an HxWxB array) tile by tile.
+
+    workers=None uses one process per core, 0 runs in this process. With
+    out_dir, outputs are .npy memory maps written there. Returns a dict of
+    index maps plus 'denoised' (HxWxB) when keep_denoised.
+    """
+    cube = open_cube(source) if isinstance(source, str) else source
+    height, width, bands = cube.shape
+    tiles = plan_tiles(height, width, tile_size)
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+
+    workers = os.cpu_count() if workers is None else workers
+    use_pool = bool(workers) and len(tiles) > 1
+    # Workers reopen .npy paths memory-mapped; other cubes are published to shared memory once
+    # (before the pool starts, so its workers share this process's resource tracker)
+    share = None
+    if use_pool and not (isinstance(source, str) and source.endswith('.npy')):
+        share = shared_rasters.RasterShare({'cube': cube})
+        source = share.handles['cube']
+
+    def payload(tile, with_halo):
+        """(source, read window); in-process runs read the cube directly."""
+        window = (tile.wr0, tile.wr1, tile.wc0, tile.wc1) if with_halo else tile[:4]
+        return (source if use_pool else cube), window
+
+    executor = ProcessPoolExecutor(max_workers=workers) if use_pool else None
+    in_flight = 2 * max(workers or 1, 1)
+    try:
+        # Pass 1: reflectance scale, then merged histograms -> per-band statistics
+        if np.issubdtype(cube.dtype, np.integer):
+            scale = 1.0 / LEVELS
+        else:
+            peak = max(_map_bounded(executor, _tile_max, (payload(t, False) for t in tiles), in_flight))
+            scale = 1.0 / LEVELS if peak > 1 + np.finfo(np.float64).eps else 1.0
+        counts = np.zeros((bands, LEVELS + 1), dtype=np.int64)
+        for tile_counts in _map_bounded(executor, _tile_histogram,
+                                        (payload(t, False) + (scale,) for t in tiles), in_flight):
+            counts += tile_counts
+        thresholds, dark = band_statistics(counts)
+
+        # Pass 2: process tiles and stitch cores into the outputs
+        outputs = {name: _allocate((height, width), out_dir, name) for name in spectral_indices.INDEX_NAMES}
+        if keep_denoised:
+            outputs['denoised'] = _allocate((height, width, bands), out_dir, 'denoised')
+        args = (payload(t, True) + (t, scale, thresholds, dark, keep_denoised) for t in tiles)
+        for tile, indices, denoised in _map_bounded(executor, process_tile, args, in_flight):
+            for name, values in indices.items():
+                outputs[name][tile.r0:tile.r1, tile.c0:tile.c1] = values
+            if denoised is not None:
+                outputs['denoised'][tile.r0:tile.r1, tile.c0:tile.c1] = denoised
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if share is not None:
+            share.close()
+    for values in outputs.values():
+        if isinstance(values, np.memmap):
+            values.flush()
+    return outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tiled multispectral processing (indices + denoised cube).')
+    parser.add_argument('cube', help='HxWxB cube as .npy (memory-mapped) or .mat')
+    parser.add_argument('out_dir', help='directory for the output .npy maps')
+    parser.add_argument('--tile', type=int, default=DEFAULT_TILE_SIZE, help='tile side in pixels')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: one per core, 0: in-process)')
+    parser.add_argument('--no-denoised', action='store_true', help='skip the denoised cube output')
+    args = parser.parse_args()
+
+    outputs = run_tiled(args.cube, args.tile, args.workers, args.out_dir, keep_denoised=not args.no_denoised)
+    for name in spectral_indices.INDEX_NAMES:
+        print(f'{name.upper()} mean: {float(outputs[name].mean(dtype=np.float64)):.4f}')
+    print(f'Outputs written to: {args.out_dir}')
+
+
+if __name__ == '__main__':
+    main()